@@ -0,0 +1,79 @@
+"""htmlの抽出処理のベンチマーク.
+
+以前の実装 (BeautifulSoup + html5lib で木を組み立てて探索する) と htmlscan を、
+テスト用に保存したページと、それを大きくしたページで比較する。
+
+    python benchmarks/bench_extract.py
+"""
+import os
+import sys
+import timeit
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'src'))
+
+from pycoder import htmlscan  # noqa: E402
+from benchutil import enlarge_prob_page  # noqa: E402
+
+SOURCE_DIR = os.path.join(ROOT_DIR, 'src', 'pycoder', 'tests', 'scrape', 'source')
+
+
+def _read_source(name):
+    with open(os.path.join(SOURCE_DIR, name)) as f:
+        return f.read()
+
+
+def html5lib_sample_io(html):
+    from bs4 import BeautifulSoup as bs
+    soup = bs(html, 'html5lib')
+    while soup.find('span', class_='lang-en'):
+        soup.find('span', class_='lang-en').extract()
+    while soup.find('div', class_='io-style'):
+        soup.find('div', class_='io-style').extract()
+    io_samples = []
+    for sec in soup.find_all('section'):
+        if sec.find('h3').get_text() == '問題文':
+            continue
+        pre = sec.find('pre')
+        if pre is None:
+            continue
+        io_samples.append(pre.get_text())
+    return io_samples
+
+
+def html5lib_prob_paths(html):
+    from bs4 import BeautifulSoup as bs
+    soup = bs(html, 'html5lib')
+    prob_paths = {}
+    for tr in soup.find('tbody').find_all('tr'):
+        item = tr.find('td').find('a')
+        prob_paths[item.contents[0].lower()] = item.get('href')
+    return prob_paths
+
+
+def _bench(func, html, number):
+    return min(timeit.repeat(lambda: func(html), number=number, repeat=3)) / number
+
+
+def main():
+    prob = _read_source('prob.html')
+    cases = [
+        ('prob.html', prob, html5lib_sample_io, htmlscan.scan_sample_io),
+        ('prob.html x50 samples', enlarge_prob_page(prob, 50),
+         html5lib_sample_io, htmlscan.scan_sample_io),
+        ('tasks.html', _read_source('tasks.html'),
+         html5lib_prob_paths, htmlscan.scan_prob_paths),
+    ]
+    print('{:<24} {:>14} {:>14} {:>9}'.format(
+        'page', 'html5lib [ms]', 'htmlscan [ms]', 'speedup'))
+    for name, html, before, after in cases:
+        assert before(html) == after(html)
+        number = 5 if len(html) > 100000 else 50
+        t_before = _bench(before, html, number)
+        t_after = _bench(after, html, number)
+        print('{:<24} {:>14.3f} {:>14.3f} {:>8.1f}x'.format(
+            name, t_before * 1000, t_after * 1000, t_before / t_after))
+
+
+if __name__ == '__main__':
+    main()
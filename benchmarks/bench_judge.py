@@ -0,0 +1,66 @@
+"""テスト実行のオーバーヘッドのベンチマーク.
+
+何もしない解答と、大きな入出力を読み書きする解答を1ケース実行するのにかかる時間を、
+実行方式 (subprocess, fork) ごとに計る。解答自体の処理時間を除いた、judge 側の1ケースあたりの
+コストの目安になる。
+
+    python benchmarks/bench_judge.py
+"""
+import os
+import tempfile
+
+import benchutil
+from benchutil import Results, measure_each
+
+from pycoder import judge
+from pycoder import runner as runners
+
+TRIVIAL_SRC = 'print(input())\n'
+LARGE_IO_SRC = '''import sys
+a = sys.stdin.buffer.read().split()
+sys.stdout.write('\\n'.join(x.decode() for x in a))
+sys.stdout.write('\\n')
+'''
+# 大きな入出力のケースの値の数
+LARGE_IO_SIZE = 200000
+
+REPEAT = 10
+
+
+def _write(dir_path, name, content):
+    path = os.path.join(dir_path, name)
+    with open(path, 'w') as f:
+        f.write(content)
+    return path
+
+
+def run() -> Results:
+    results = {}
+    limits = judge.Limits(10.0, None)
+    with tempfile.TemporaryDirectory() as tmp:
+        values = '\n'.join(str(i) for i in range(LARGE_IO_SIZE)) + '\n'
+        cases = [
+            ('trivial', _write(tmp, 'trivial.py', TRIVIAL_SRC),
+             _write(tmp, 'trivial_in.txt', '1\n'),
+             _write(tmp, 'trivial_out.txt', '1\n')),
+            ('large-io', _write(tmp, 'large_io.py', LARGE_IO_SRC),
+             _write(tmp, 'large_in.txt', values),
+             _write(tmp, 'large_out.txt', values)),
+        ]
+        runner_names = ['subprocess'] + (['fork'] if hasattr(os, 'fork') else [])
+        for runner_name in runner_names:
+            case_runner = runners.create_runner(runner_name)
+            for case_name, src, input_path, output_path in cases:
+                def run_case():
+                    res = judge.run_test(src, input_path, output_path,
+                                         runner=case_runner, limits=limits)
+                    assert res.result == judge.TestResult.OK, res.result
+                # 1回目はファイルのキャッシュなどが温まっていないので捨てる
+                run_case()
+                name = 'judge.run_test[{},{}]'.format(runner_name, case_name)
+                results[name] = measure_each(run_case, repeat=REPEAT)
+    return results
+
+
+if __name__ == '__main__':
+    benchutil.print_results(run())
@@ -0,0 +1,35 @@
+"""ページの解析処理のベンチマーク.
+
+テスト用に保存したページ (問題一覧ページ、問題ページ、ログインページ) と、それを大きくしたページで
+問題へのパス、サンプルケース、csrfトークンの抽出にかかる時間を計る。ネットワークは使わない。
+
+    python benchmarks/bench_parse.py
+"""
+import benchutil
+from benchutil import Results, enlarge_prob_page, measure, read_fixture
+
+from pycoder import auth
+from pycoder import scrape
+
+
+def run() -> Results:
+    prob = read_fixture('scrape', 'source', 'prob.html')
+    tasks = read_fixture('scrape', 'source', 'tasks.html')
+    csrf = read_fixture('auth', 'source', 'csrf.html')
+    cases = [
+        ('extract_prob_paths[tasks.html]', scrape.extract_prob_paths, tasks),
+        ('extract_sample_test_cases[prob.html]',
+         scrape.extract_sample_test_cases_from_prob_page, prob),
+        ('extract_sample_test_cases[prob.html x50]',
+         scrape.extract_sample_test_cases_from_prob_page,
+         enlarge_prob_page(prob, 50)),
+        ('extract_problem_spec[prob.html]',
+         scrape.extract_problem_spec_from_prob_page, prob),
+        ('extract_csrf_token[csrf.html]', auth.extract_csrf_token, csrf),
+    ]
+    return {'parse.' + name: measure(lambda func=func, html=html: func(html))
+            for name, func, html in cases}
+
+
+if __name__ == '__main__':
+    benchutil.print_results(run())
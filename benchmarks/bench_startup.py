@@ -0,0 +1,65 @@
+"""pc コマンドの起動時間のベンチマーク.
+
+pycoder.main の読み込みにかかる時間を計り、python -X importtime の結果から
+時間のかかっているモジュールを表示する。
+
+    python benchmarks/bench_startup.py
+"""
+import os
+import subprocess
+import sys
+
+import benchutil
+from benchutil import Results, SRC_DIR, Stat, measure_each
+
+ENV = dict(os.environ, PYTHONPATH=SRC_DIR)
+
+REPEAT = 10
+TOP = 15
+
+
+def wall_time(code) -> Stat:
+    """pythonを起動してcodeを実行するまでの時間 (REPEAT回)"""
+    return measure_each(
+        lambda: subprocess.run([sys.executable, '-c', code], env=ENV,
+                               check=True),
+        repeat=REPEAT)
+
+
+def run() -> Results:
+    return {
+        'startup.python': wall_time('pass'),
+        'startup.import_pycoder_main': wall_time('import pycoder.main'),
+    }
+
+
+def import_times(module):
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+        stderr=subprocess.PIPE, env=ENV, check=True)
+    rows = []
+    for line in proc.stderr.decode().splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((name.rstrip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main():
+    results = run()
+    base = results['startup.python'].min_ms
+    total = results['startup.import_pycoder_main'].min_ms
+    print('python startup:       {:7.1f} ms'.format(base))
+    print('import pycoder.main:  {:7.1f} ms (+{:.1f} ms)'.format(
+        total, total - base))
+    print()
+    print('top imports by cumulative time:')
+    rows = sorted(import_times('pycoder.main'), key=lambda r: -r[2])
+    for name, self_us, cumulative_us in rows[:TOP]:
+        print('{:>9.1f} ms {:>9.1f} ms  {}'.format(
+            cumulative_us / 1000, self_us / 1000, name))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""ベンチマークの計測と結果の保存 (各 bench_*.py と run_all.py から使う).
+
+結果は {名前: Stat} のdictで扱い、実行環境と合わせてjsonに保存する。
+保存した結果を渡すと、今回の結果との比を表示する。
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+from typing import Callable, Dict, NamedTuple, Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(ROOT_DIR, 'src')
+TESTS_DIR = os.path.join(SRC_DIR, 'pycoder', 'tests')
+
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+# 比がこの値を超えたら遅くなったとみなす
+REGRESSION_RATIO = 1.2
+
+
+class Stat(NamedTuple):
+    min_ms: float  # 1回あたりの時間の最小値 [ms]
+    median_ms: float  # 1回あたりの時間の中央値 [ms]
+    runs: int  # 計測した回数 (repeat)
+
+
+Results = Dict[str, Stat]
+
+
+def read_fixture(*path: str) -> str:
+    """テスト用に保存したページを読み込む (ex: read_fixture('scrape', 'source', 'prob.html'))"""
+    with open(os.path.join(TESTS_DIR, *path)) as f:
+        return f.read()
+
+
+def enlarge_prob_page(html: str, times: int) -> str:
+    """入出力例のsectionを増やしたページを作る"""
+    head, sep, tail = html.partition('<span class="lang-en">')
+    samples = head[head.index('<hr />\n<div class="part">\n<section>\n<h3>入力例 1'):]
+    return head + samples * times + sep + tail
+
+
+def measure(func: Callable[[], object], repeat: int = 5,
+            number: Optional[int] = None) -> Stat:
+    """funcの1回あたりの実行時間を計る
+    :param number: 1回の計測でfuncを呼ぶ回数 (省略時は0.2秒以上かかる回数)
+    """
+    timer = timeit.Timer(func)
+    if number is None:
+        number, _ = timer.autorange()
+    times = [t / number * 1000
+             for t in timer.repeat(repeat=repeat, number=number)]
+    return Stat(min(times), statistics.median(times), repeat)
+
+
+def measure_each(func: Callable[[], object], repeat: int = 5) -> Stat:
+    """子プロセスの起動など、1回が長い処理の実行時間を1回ずつ計る"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return Stat(min(times), statistics.median(times), repeat)
+
+
+def environment() -> Dict[str, object]:
+    """結果を比べる際に確認する実行環境"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            check=True).stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'commit': commit,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def save_results(path: str, results: Results) -> None:
+    with open(path, 'w') as f:
+        json.dump({'environment': environment(),
+                   'results': {name: stat._asdict()
+                               for name, stat in results.items()}},
+                  f, indent=2, sort_keys=True)
+
+
+def load_results(path: str) -> Results:
+    with open(path) as f:
+        data = json.load(f)
+    return {name: Stat(**stat) for name, stat in data['results'].items()}
+
+
+def print_results(results: Results, baseline: Results = None) -> None:
+    """結果を表示する
+    :param baseline: 比べる結果 (指定した場合は最小値の比を表示する)
+    """
+    width = max([len('benchmark')] + [len(name) for name in results])
+    header = '{:<{}} {:>10} {:>11}'.format('benchmark', width, 'min [ms]',
+                                           'median [ms]')
+    if baseline is not None:
+        header += ' {:>10} {:>7}'.format('base [ms]', 'ratio')
+    print(header)
+    for name, stat in results.items():
+        line = '{:<{}} {:>10.3f} {:>11.3f}'.format(name, width, stat.min_ms,
+                                                   stat.median_ms)
+        base = baseline.get(name) if baseline is not None else None
+        if base is not None:
+            ratio = stat.min_ms / base.min_ms
+            mark = ' !' if ratio > REGRESSION_RATIO else ''
+            line += ' {:>10.3f} {:>6.2f}x{}'.format(base.min_ms, ratio, mark)
+        print(line)
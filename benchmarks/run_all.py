@@ -0,0 +1,44 @@
+"""すべてのベンチマークを実行し、結果をjsonに保存する.
+
+保存した結果を --compare に渡すと、今回の結果との比を表示する (1.2倍を超えたものに '!' を付ける)。
+ネットワークは使わないため、オフラインで実行できる。
+
+    python benchmarks/run_all.py --output before.json
+    (変更後)
+    python benchmarks/run_all.py --output after.json --compare before.json
+"""
+import argparse
+
+import benchutil
+import bench_judge
+import bench_parse
+import bench_startup
+
+SUITES = {
+    'parse': bench_parse.run,
+    'judge': bench_judge.run,
+    'startup': bench_startup.run,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', help='path of the JSON file to write')
+    parser.add_argument('--compare', help='JSON file of a previous run')
+    parser.add_argument('--only', help='comma separated suites ({})'.format(
+        ','.join(SUITES)))
+    args = parser.parse_args()
+
+    names = args.only.split(',') if args.only else list(SUITES)
+    results = {}
+    for name in names:
+        results.update(SUITES[name]())
+    baseline = (benchutil.load_results(args.compare)
+                if args.compare else None)
+    benchutil.print_results(results, baseline)
+    if args.output:
+        benchutil.save_results(args.output, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""過去のコンテストのページをローカルに保存しておき、オフラインでコンテストを用意する.
+
+問題一覧ページと問題ページのhtmlを、内容のハッシュ値を名前とするファイルとして
+atcoder/archive/objects/ に圧縮して保存し、どのページがどのファイルかをデータベース (store) に記録する。
+問題ページは task_screen_name ごとに1つだけ保存するため、abc123のc問題がarc012_cの場合のように
+複数のコンテストで出題された問題は1回しか取得しない。
+ページは取得するたびに保存するので、中断しても次回は続きから取得する。
+レスポンスの ETag, Last-Modified も記録しておき、取得し直す際は条件付きでリクエストする
+(変わっていないページは本文を受け取らずに済む)。
+"""
+import hashlib
+import os
+import re
+import zlib
+from typing import Dict, Iterable, List, Mapping, Optional
+
+from . import scrape
+from . import store
+
+# atcoderディレクトリ直下に置く、保存したページのディレクトリ
+ARCHIVE_DIR_NAME = 'archive'
+
+# '/contests/abc160/tasks' または '/contests/abc160/tasks/arc012_c'
+_PAGE_URL = re.compile(r'/contests/([^/?#]+)/tasks(?:/([^/?#]+))?/?$')
+
+
+def _page_key(url: str) -> Optional[str]:
+    """ページのurlから、保存する際のキーを求める
+    :return 問題一覧ページは 'contest/abc160'、問題ページは 'task/arc012_c'
+        (どちらでもない場合はNone)
+    """
+    m = _PAGE_URL.search(url)
+    if m is None:
+        return None
+    contest, task_screen_name = m.groups()
+    if task_screen_name is None:
+        return 'contest/' + contest
+    return 'task/' + task_screen_name
+
+
+class PageArchive:
+    """保存したページを読み書きする (scrape.PageCache)
+    複数のスレッドから使える。
+    """
+
+    def __init__(self, atcoder_dir: str, revalidate: bool = False):
+        """
+        :param revalidate: 保存済みのページも、変わっていないかサーバーに確かめるかどうか
+        """
+        self.atcoder_dir = atcoder_dir
+        self.revalidate = revalidate
+        self.objects_dir = os.path.join(atcoder_dir, ARCHIVE_DIR_NAME,
+                                        'objects')
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def get(self, url: str) -> Optional[str]:
+        """保存したページのhtmlを返す (保存されていない場合はNone)
+        """
+        key = _page_key(url)
+        if key is None:
+            return None
+        digest = store.load_page_digest(self.atcoder_dir, key)
+        if digest is None:
+            return None
+        try:
+            with open(self._object_path(digest), 'rb') as f:
+                return zlib.decompress(f.read()).decode()
+        except (FileNotFoundError, zlib.error):
+            return None
+
+    def put(self, url: str, html: str,
+            headers: Mapping[str, str] = None) -> None:
+        """ページのhtmlを保存する
+        他のプロセスが読み込み中でも壊れないよう、一時ファイルに書いてから置き換える。
+        :param headers: レスポンスのヘッダ (ETag, Last-Modified を記録する)
+        """
+        key = _page_key(url)
+        if key is None:
+            return
+        # 開催前のコンテストなど、問題が無い問題一覧ページは保存しない (次回取得し直す)
+        if key.startswith('contest/') and not scrape.extract_prob_paths(
+                scrape.ContestTasksPage(html)):
+            return
+        data = html.encode()
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        # 同じ内容のページは既に保存してある
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+            with open(tmp_path, 'wb') as f:
+                f.write(zlib.compress(data, 9))
+            os.replace(tmp_path, path)
+        headers = headers or {}
+        store.save_page(self.atcoder_dir, key, digest,
+                        etag=headers.get('ETag'),
+                        last_modified=headers.get('Last-Modified'))
+
+    def revalidation_headers(self, url: str) -> Optional[Dict[str, str]]:
+        """保存済みのページを取得し直す際に付けるヘッダ
+        :return Noneの場合は取得し直さない。ETag, Last-Modified が記録されていないページは
+            条件を付けずに取得し直す (空のdict)。
+        """
+        if not self.revalidate:
+            return None
+        key = _page_key(url)
+        if key is None:
+            return None
+        etag, last_modified = store.load_page_validators(self.atcoder_dir, key)
+        headers = {}
+        if etag is not None:
+            headers['If-None-Match'] = etag
+        if last_modified is not None:
+            headers['If-Modified-Since'] = last_modified
+        return headers
+
+    def forget(self, url: str) -> None:
+        """ページを保存していないことにする (次回は取得し直す)
+        """
+        key = _page_key(url)
+        if key is not None:
+            store.delete_page(self.atcoder_dir, key)
+
+
+def load_contest(pages: PageArchive, contest: str) -> Optional[scrape.Contest]:
+    """保存したページだけからコンテストの情報を作る
+    :return コンテストの情報 (問題一覧ページか、いずれかの問題ページが保存されていない場合はNone)
+    """
+    html = pages.get(scrape._get_tasks_url(contest))
+    if html is None:
+        return None
+    prob_paths = scrape.extract_prob_paths(scrape.ContestTasksPage(html))
+    if not prob_paths:
+        return None
+    problems = {}
+    for prob_type, prob_url in scrape.prob_paths_to_urls(prob_paths).items():
+        prob_html = pages.get(prob_url)
+        if prob_html is None:
+            return None
+        problems[prob_type] = scrape.parse_problem(prob_html)
+    return scrape.Contest(prob_paths, problems)
+
+
+def load_archived_contests(pages: PageArchive, contests: Iterable[str]
+                           ) -> Dict[str, scrape.Contest]:
+    """保存したページだけで用意できるコンテストの情報を返す
+    """
+    archived = {}
+    for contest in contests:
+        result = load_contest(pages, contest)
+        if result is not None:
+            archived[contest] = result
+    return archived
+
+
+def archive_contests(atcoder_dir: str, contests: List[str],
+                     callback: scrape.ContestCallback,
+                     max_workers: int = scrape.MAX_CONCURRENT_FETCHES,
+                     requests_per_second: float = scrape.REQUESTS_PER_SECOND
+                     ) -> None:
+    """コンテストのページを取得して保存する
+    保存済みのページは取得しない。すべて保存済みのコンテストはログインせずに済ませる。
+    :param contests: コンテストの名前 (ex: ['abc300', 'abc301'])
+    :param callback: コンテストのページが揃うたびに callback(コンテスト名, Contest) を呼ぶ
+        (取得に失敗した場合は例外を渡す)
+    """
+    pages = PageArchive(atcoder_dir)
+    archived = load_archived_contests(pages, contests)
+    for contest in contests:
+        if contest in archived:
+            callback(contest, archived[contest])
+
+    missing = [contest for contest in contests if contest not in archived]
+    if missing:
+        scrape.fetch_contests(missing, callback, max_workers=max_workers,
+                              requests_per_second=requests_per_second,
+                              pages=pages)
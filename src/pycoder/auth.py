@@ -1,23 +1,40 @@
+from __future__ import annotations
+
 from getpass import getpass
-from bs4 import BeautifulSoup as bs
-import requests
-from requests import Session
+import atexit
 import pickle
 import os
-from typing import Optional
+import threading
+from typing import TYPE_CHECKING, Optional, Tuple
 import datetime
 
-from requests.sessions import RequestsCookieJar
+# requestsの読み込みには時間がかかるため、ネットワークを使う処理の中で読み込む
+if TYPE_CHECKING:
+    from requests import Session
+    from requests.sessions import RequestsCookieJar
+
 
 LOGIN_URL = 'https://atcoder.jp/login'
 PYCODER_DIR = os.environ['HOME'] + '/.pycoder'
 COOKIES_PATH = PYCODER_DIR + '/cookies.jar'
+CSRF_TOKEN_PATH = PYCODER_DIR + '/csrf_token'
+ATCODER_URL = 'https://atcoder.jp'
+
+# 共有セッションで保持するkeep-alive接続の数 (問題ページを同時に取得する数)
+SESSION_POOL_SIZE = 8
+
+# プロセス内で共有するログイン済みのセッションと、読み込んだ時点のcookie
+_session: Optional[Session] = None
+_loaded_cookies: Optional[Tuple] = None
+_session_lock = threading.Lock()
 
 
 def login():
     """ログインを行う
     ログインに成功した場合、cookieをローカルに保存する。
     """
+    import requests
+
     username, password = input_username_and_password()
     session = requests.session()
     csrf_token = get_csrf_token(LOGIN_URL, session)
@@ -33,12 +50,18 @@ def login():
         exit(1)
     print('Login success!')
     save_cookies_in_local(res.cookies)
+    # csrfトークンはセッションに紐づくため、提出時に再利用できるよう保存しておく
+    save_csrf_token_in_local(csrf_token)
 
 
 def logout():
     """ログアウトする。
     ローカルに保存したcookieを削除する
     """
+    # 終了時に共有セッションのcookieを保存し直さないよう、先に破棄する
+    reset_session()
+    if os.path.exists(CSRF_TOKEN_PATH):
+        os.remove(CSRF_TOKEN_PATH)
     if os.path.exists(COOKIES_PATH):
         os.remove(COOKIES_PATH)
         print('You logout successfuly.')
@@ -73,8 +96,10 @@ def extract_csrf_token(html: str) -> str:
     :param html: csrfトークンを取得したいページ
     :return csrf_token
     """
-    soup = bs(html, 'html5lib')
-    csrf_token = soup.find(attrs={'name': 'csrf_token'}).get('value')
+    from . import htmlscan
+    csrf_token = htmlscan.scan_csrf_token(html)
+    if csrf_token is None:
+        raise ValueError('csrf_token is not found.')
     return csrf_token
 
 
@@ -91,6 +116,29 @@ def save_cookies_in_local(cookies: RequestsCookieJar) -> None:
         pickle.dump(cookies, f)
 
 
+def save_csrf_token_in_local(csrf_token: str) -> None:
+    """csrfトークンをローカルに保存する
+    :param csrf_token
+    """
+    if not os.path.isdir(PYCODER_DIR):
+        os.mkdir(PYCODER_DIR)
+
+    with open(CSRF_TOKEN_PATH, 'w') as f:
+        f.write(csrf_token)
+
+
+def load_csrf_token_in_local() -> Optional[str]:
+    """保存済みのcsrfトークンを取り出す
+    :return csrf_token 保存されていない場合はNone
+    """
+    try:
+        with open(CSRF_TOKEN_PATH, 'r') as f:
+            csrf_token = f.read().strip()
+        return csrf_token or None
+    except FileNotFoundError:
+        return None
+
+
 def load_cookies_in_local() -> Optional[RequestsCookieJar]:
     """ログイン済みのcookiesを取り出す
     :return cookies_stored ログイン済みのcookies
@@ -138,6 +186,7 @@ def check_cookies() -> Optional[Session]:
             return None
 
         # Set cookies
+        import requests
         session = requests.session()
         session.cookies.update(cookies_stored)
         return session
@@ -156,6 +205,7 @@ def check_login() -> Optional[Session]:
         return None
 
     # Set cookies
+    import requests
     session = requests.session()
     session.cookies.update(cookies_stored)
 
@@ -173,19 +223,68 @@ def check_login() -> Optional[Session]:
         return None
 
 
+def _cookies_state(cookies: RequestsCookieJar) -> Tuple:
+    return tuple(sorted((c.domain, c.path, c.name, c.value or '', c.expires or 0)
+                        for c in cookies))
+
+
+def get_session() -> Optional[Session]:
+    """プロセス内で共有するログイン済みのセッションを返す
+    最初の呼び出しでだけcookieを読み込み、以降は同じセッション(keep-alive接続)を使い回す。
+    cookieが変わっていれば、プロセスの終了時に一度だけ保存する。
+    :return セッション (ログインしていない場合はNone)
+    """
+    global _session, _loaded_cookies
+    from requests.adapters import HTTPAdapter
+
+    with _session_lock:
+        if _session is None:
+            session = check_cookies()
+            if session is None:
+                return None
+            adapter = HTTPAdapter(pool_connections=1,
+                                  pool_maxsize=SESSION_POOL_SIZE)
+            session.mount(ATCODER_URL, adapter)
+            _session = session
+            _loaded_cookies = _cookies_state(session.cookies)
+            atexit.register(save_session)
+        return _session
+
+
+def save_session() -> None:
+    """共有セッションのcookieが読み込んだ時点から変わっていれば保存する
+    """
+    global _loaded_cookies
+    with _session_lock:
+        if _session is None:
+            return
+        state = _cookies_state(_session.cookies)
+        if state != _loaded_cookies:
+            save_cookies_in_local(_session.cookies)
+            _loaded_cookies = state
+
+
+def reset_session() -> None:
+    """共有セッションを保存せずに破棄する (次のget_sessionで読み込み直す)
+    """
+    global _session, _loaded_cookies
+    with _session_lock:
+        if _session is not None:
+            atexit.unregister(save_session)
+            _session.close()
+        _session = None
+        _loaded_cookies = None
+
+
 def auth(func):
     """認証チェックを行うデコレータ
-    デコレートした関数の第一引数にログイン済みのセッションを渡す
+    デコレートした関数の第一引数にログイン済みのセッション (プロセス内で共有) を渡す
     """
     def decorator(*args, **kargs):
-        print('auth decorator called.')
-        session_logined = check_cookies()
+        session_logined = get_session()
 
         if session_logined:
-            ret = func(session_logined, *args, **kargs)
-            # update cookies
-            save_cookies_in_local(session_logined.cookies)
-            return ret
+            return func(session_logined, *args, **kargs)
         else:
             print('Please login.')
             exit(1)
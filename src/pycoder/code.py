@@ -1,11 +1,18 @@
-from typing import Dict
+import re
+from typing import Dict, Iterable, List
 from . import scrape
-from .scrape import SampleTestCases
 import os
 import pathlib
-import shutil
 import runpy
 from . import loader
+from . import taskinfo
+from . import compare
+from . import store
+from . import archive
+from .pycolor import pprint
+
+# 'abc300-abc310' または 'abc300-310'
+_CONTEST_RANGE = re.compile(r'([a-z]+)(\d+)-([a-z]*)(\d+)')
 
 
 def read_file(filepath: str) -> str:
@@ -18,17 +25,51 @@ def read_file(filepath: str) -> str:
     return content
 
 
-def fetch_contest_test_cases(contest) -> Dict[str, SampleTestCases]:
-    """指定されたコンテストの各問題のサンプルテストケースを取得する。
-    :param contest: コンテストの名前 (ex: 'abc123')
-    :return 各問題のテストケース
+def parse_contests(contests: Iterable[str]) -> List[str]:
+    """コンテストの指定を展開する
+    :param contests: コンテスト名または範囲 (ex: ['abc300', 'abc310-abc312', 'arc150-152'])
+    :return コンテスト名 (ex: ['abc300', 'abc310', 'abc311', 'abc312', 'arc150', ...])
     """
-    contest_tasks_page = scrape.fetch_contest_tasks_page(contest)
-    prob_paths = scrape.extract_prob_paths(contest_tasks_page)
-    prob_urls = scrape.prob_paths_to_urls(prob_paths)
+    names: List[str] = []
+    for spec in contests:
+        spec = str(spec)
+        m = _CONTEST_RANGE.fullmatch(spec)
+        if m is None:
+            names.append(spec)
+            continue
+        prefix, first, last_prefix, last = m.groups()
+        if last_prefix not in ('', prefix):
+            raise ValueError('Invalid contest range: {}'.format(spec))
+        width = len(first)
+        for number in range(int(first), int(last) + 1):
+            names.append('{}{:0{}d}'.format(prefix, number, width))
+    # 重複は最初の1つだけ残す
+    return list(dict.fromkeys(names))
+
+
+def _load_directories():
+    """設定ファイルからAtCoder用のディレクトリとテンプレートファイルのパスを読み込む
+    :return atcoder_dir, template_path
+    """
+    user_home_dir = os.path.expanduser('~')
+    settings_file = user_home_dir + '/.pycoder/settings.py'
+    settings = loader.load_module_from_path('settings', settings_file)
+
+    config = loader.load_module_from_path(
+        'config', settings.atcoder_dir + 'config.py')
+    return settings.atcoder_dir, config.template
+
 
-    contest_test_cases = scrape.fetch_sample_test_cases(prob_urls)
-    return contest_test_cases
+def export_contest(contest, task: str = None) -> Dict[str, List[str]]:
+    """データベースに保存したサンプルケースを tests/ に書き出す
+    :param task: 問題 (省略時はコンテストの全問題)
+    :return 問題ごとの書き出したケース名
+    """
+    atcoder_dir, _ = _load_directories()
+    contest_dir = atcoder_dir + 'contests/' + contest + '/'
+    tasks = [task] if task is not None else list(
+        taskinfo.load_task_info(contest_dir))
+    return {t: store.export_cases(contest_dir, t) for t in tasks}
 
 
 def prepare_contest(contest):
@@ -45,47 +86,188 @@ def prepare_contest(contest):
         - abc456/
             ...
     """
-    user_home_dir = os.path.expanduser('~')
-    settings_file = user_home_dir + '/.pycoder/settings.py'
-    settings = loader.load_module_from_path('settings', settings_file)
+    prepare_contests([contest])
 
-    contest_dir = settings.atcoder_dir + 'contests/' + contest + '/'
 
-    config = loader.load_module_from_path(
-        'config', settings.atcoder_dir + 'config.py')
-    template_path = config.template
+def prepare_contests(contests: Iterable[str],
+                     max_workers: int = scrape.MAX_CONCURRENT_FETCHES,
+                     requests_per_second: float = scrape.REQUESTS_PER_SECOND,
+                     export: bool = True, at_start: bool = False,
+                     refresh: bool = False) -> List[str]:
+    """複数のコンテストをまとめて用意する (prepare_contestを参照)
+    1つのセッションで各コンテストのページを並行に取得し、揃ったコンテストから順に書き出す。
+    取得したページは1つずつ保存しておき (archiveを参照)、次回は保存していないページだけを取得する。
+    途中で失敗しても、やり直す際は残りのページだけを取得すれば済む。
+    既に用意したコンテストを用意し直しても、main.py と書き出し済みの変わっていないケースはそのまま残す。
+    :param contests: コンテスト名または範囲 (parse_contestsを参照)
+    :param max_workers: 同時に取得するページの最大数
+    :param requests_per_second: 1秒あたりのリクエスト数の上限
+    :param export: サンプルケースを tests/ に書き出すかどうか
+    :param at_start: 開始前のコンテストは開始を待ち、問題が公開されたらすぐに用意する
+        (指定した順に1つずつ待つ)
+    :param refresh: 保存済みのページも、変わっていないかサーバーに確かめる
+        (ETag, Last-Modified による条件付きのリクエストで、変わったページだけを取得し直す)
+    :return 用意できなかったコンテスト
+    """
+    contest_names = parse_contests(contests)
+    atcoder_dir, template_path = _load_directories()
+    prepared = []
+    failed = []
 
+    def on_fetched(contest, result):
+        if isinstance(result, Exception):
+            failed.append(contest)
+            pprint('{}: failed ({})'.format(contest, result), color='red')
+            return
+        if not result.prob_paths:
+            failed.append(contest)
+            pprint('{}: no tasks found'.format(contest), color='red')
+            return
+        contest_dir = atcoder_dir + 'contests/' + contest + '/'
+        try:
+            _write_contest(contest_dir, template_path, result, export)
+        except OSError as e:
+            failed.append(contest)
+            pprint('{}: failed ({})'.format(contest, e), color='red')
+            return
+        prepared.append(contest)
+        if len(contest_names) > 1:
+            print('[{}/{}] {}: {} tasks'.format(
+                len(prepared) + len(failed), len(contest_names), contest,
+                len(result.prob_paths)))
+
+    if at_start:
+        for contest in contest_names:
+            try:
+                result = scrape.fetch_contest_at_start(
+                    contest, max_workers=max_workers,
+                    progress=lambda remaining, contest=contest: print(
+                        '{} starts in {}'.format(
+                            contest, _format_remaining(remaining))))
+            except (ValueError, TimeoutError, OSError) as e:
+                result = e
+            on_fetched(contest, result)
+        return failed
+
+    pages = archive.PageArchive(atcoder_dir, revalidate=refresh)
+    # 全ページを保存済みのコンテストは、取得せずに保存したページから用意する
+    archived = {} if refresh else archive.load_archived_contests(
+        pages, contest_names)
+    for contest, result in archived.items():
+        on_fetched(contest, result)
+    missing = [c for c in contest_names if c not in archived]
+    if missing:
+        scrape.fetch_contests(missing, on_fetched, max_workers=max_workers,
+                              requests_per_second=requests_per_second,
+                              pages=pages)
+    return failed
+
+
+def _format_remaining(seconds: float) -> str:
+    """残り時間を 'h:mm:ss' の形式にする"""
+    seconds = int(round(seconds))
+    return '{}:{:02d}:{:02d}'.format(seconds // 3600, seconds // 60 % 60,
+                                     seconds % 60)
+
+
+def archive_contests(contests: Iterable[str],
+                     max_workers: int = scrape.MAX_CONCURRENT_FETCHES,
+                     requests_per_second: float = scrape.REQUESTS_PER_SECOND
+                     ) -> List[str]:
+    """コンテストのページを取得してローカルに保存する (archiveを参照)
+    保存したコンテストは、prepare_contestsで取得せずに用意できる。
+    :param contests: コンテスト名または範囲 (parse_contestsを参照)
+    :return 保存できなかったコンテスト
+    """
+    contest_names = parse_contests(contests)
+    atcoder_dir, _ = _load_directories()
+    done = []
+    failed = []
+
+    def on_fetched(contest, result):
+        done.append(contest)
+        if isinstance(result, Exception):
+            failed.append(contest)
+            pprint('{}: failed ({})'.format(contest, result), color='red')
+        elif not result.prob_paths:
+            failed.append(contest)
+            pprint('{}: no tasks found'.format(contest), color='red')
+        else:
+            print('[{}/{}] {}: {} tasks'.format(
+                len(done), len(contest_names), contest,
+                len(result.prob_paths)))
+
+    archive.archive_contests(atcoder_dir, contest_names, on_fetched,
+                             max_workers=max_workers,
+                             requests_per_second=requests_per_second)
+    return failed
+
+
+def _write_contest(contest_dir: str, template_path: str,
+                   contest: scrape.Contest, export: bool = True):
+    """取得したコンテストの情報をデータベースに保存し、ディレクトリとmainスクリプトファイルを作る
+    :param export: サンプルケースを tests/ に書き出すかどうか
+        (書き出さない場合は、テストの実行時に書き出す)
+    """
     # make contest directory
     if not os.path.exists(contest_dir):
         os.makedirs(contest_dir)
 
-    contest_test_cases = fetch_contest_test_cases(contest)
+    prob_paths = contest.prob_paths
+    contest_problems = contest.problems
+    contest_test_cases = {task: problem.sample_test_cases
+                          for task, problem in contest_problems.items()}
+
+    # 提出時に問題一覧ページを取得しなくて済むよう、問題のtask_screen_nameを保存しておく
+    # 最大ケースの生成用に、制約と入力形式も保存しておく
+    task_info = taskinfo.load_task_info(contest_dir)
+    for task in prob_paths.keys():
+        info = task_info.setdefault(task, {})
+        info['screen_name'] = scrape.get_task_screen_name(prob_paths, task)
+        info['url'] = scrape.ATCODER_URL + prob_paths[task]
+        if task in contest_problems:
+            spec = contest_problems[task].spec
+            info['constraints'] = spec.constraints
+            info['input_format'] = spec.input_format
+            # 出力に誤差が許容されている場合は、テストで誤差を考慮して比較する
+            tolerance = compare.detect_tolerance(spec.output_description)
+            if tolerance is not None:
+                info['tolerance'] = tolerance
+            # テストで問題ごとの実行時間制限・メモリ制限を適用する
+            if spec.time_limit is not None:
+                info['time_limit'] = spec.time_limit
+            if spec.memory_limit is not None:
+                info['memory_limit'] = spec.memory_limit
+    taskinfo.save_task_info(contest_dir, task_info)
+
+    # サンプルケースはデータベースに保存し、テスト用にディレクトリへ書き出す
+    for task_name, test_cases in contest_test_cases.items():
+        store.save_cases(contest_dir, task_name, [
+            store.Case(str(test_number), test_case.input.encode(),
+                       test_case.output.encode())
+            for test_number, test_case in test_cases.items()
+            if test_case is not None
+        ])
 
     # 問題ごとのサブディレクトリを作成
+    template = None
     for task in contest_test_cases.keys():
         task_dir_name = contest_dir + task + '/'
-        if not os.path.exists(task_dir_name):
-            os.mkdir(task_dir_name)
+        os.makedirs(task_dir_name, exist_ok=True)
 
-        # 問題解答スクリプト用にテンプレートファイルをコピー
+        # 問題解答スクリプト用にテンプレートファイルをコピー (書きかけの解答は上書きしない)
         main_script_path = task_dir_name + 'main.py'
         if not os.path.exists(main_script_path):
-            shutil.copy(template_path, main_script_path)
+            if template is None:
+                with open(template_path, 'rb') as f:
+                    template = f.read()
+            store.write_if_changed(main_script_path, template)
 
-        # テスト用のディレクトリを作成
-        if not os.path.exists(task_dir_name + '/tests/'):
-            os.makedirs(task_dir_name + '/tests/')
-
-    # 取得したテストケースを格納する
-    for task_name, test_cases in contest_test_cases.items():
-        for test_number, test_case in test_cases.items():
-            task_test_dir = contest_dir + task_name + \
-                '/tests/' + str(test_number) + '/'
-            os.mkdir(task_test_dir)
-            with open(task_test_dir + 'in.txt', 'w') as f:
-                f.write(test_case.input)
-            with open(task_test_dir + 'out.txt', 'w') as f:
-                f.write(test_case.output)
+        # テスト用のディレクトリを作成し、サンプルケースを書き出す
+        # (書き出さない場合は作らず、テストの実行時に書き出す)
+        if export:
+            os.makedirs(task_dir_name + 'tests/', exist_ok=True)
+            store.export_cases(contest_dir, task)
 
 
 def init():
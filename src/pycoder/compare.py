@@ -0,0 +1,167 @@
+"""期待する出力と実際の出力を比較する.
+
+どの比較方法も出力をCHUNK_SIZEずつ読みながら比較するため、出力全体をメモリに載せない。
+"""
+import math
+import re
+from typing import BinaryIO, Iterator, Optional
+
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = b' \t\n\r\x0b\x0c'
+
+# 出力欄の '絶対誤差または相対誤差が 10^{-6} 以下' といった記述
+_TOLERANCE = re.compile(r'誤差[^。]*?10\s*\^\s*\{?\s*(-\s*\d+)\s*\}?')
+
+
+class Comparator:
+    """出力の比較方法
+    """
+
+    name = ''
+
+    def compare(self, expected: BinaryIO, actual: BinaryIO) -> bool:
+        """
+        :param expected: 期待する出力
+        :param actual: 実際の出力
+        :return 一致するかどうか
+        """
+        raise NotImplementedError
+
+
+class ExactComparator(Comparator):
+    """末尾の空白・改行を除いて完全に一致するかどうか
+    """
+
+    name = 'exact'
+
+    def compare(self, expected: BinaryIO, actual: BinaryIO) -> bool:
+        expected_buf = b''
+        actual_buf = b''
+        while True:
+            if len(expected_buf) < CHUNK_SIZE:
+                expected_buf += expected.read(CHUNK_SIZE)
+            if len(actual_buf) < CHUNK_SIZE:
+                actual_buf += actual.read(CHUNK_SIZE)
+            n = min(len(expected_buf), len(actual_buf))
+            if n == 0 or expected_buf[:n] != actual_buf[:n]:
+                break
+            expected_buf = expected_buf[n:]
+            actual_buf = actual_buf[n:]
+
+        # 最初に異なる位置以降が両方とも空白だけであれば、末尾の空白の違いだけ
+        mismatch = 0
+        while (mismatch < min(len(expected_buf), len(actual_buf))
+               and expected_buf[mismatch] == actual_buf[mismatch]):
+            mismatch += 1
+        return (_is_blank(expected_buf[mismatch:], expected)
+                and _is_blank(actual_buf[mismatch:], actual))
+
+
+def _is_blank(head: bytes, rest: BinaryIO) -> bool:
+    """headとrestの残りがすべて空白かどうか
+    """
+    chunk = head
+    while chunk:
+        if chunk.strip(_WHITESPACE):
+            return False
+        chunk = rest.read(CHUNK_SIZE)
+    return True
+
+
+def _tokens(stream: BinaryIO) -> Iterator[bytes]:
+    """空白区切りのトークンを順に返す
+    """
+    rest = b''
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        tokens = (rest + chunk).split()
+        # チャンクの境界をまたぐトークンは次のチャンクと合わせる
+        if chunk[-1:].strip(_WHITESPACE) and tokens:
+            rest = tokens.pop()
+        else:
+            rest = b''
+        yield from tokens
+    if rest:
+        yield rest
+
+
+class TokenComparator(Comparator):
+    """空白区切りのトークン列として一致するかどうか (空白・改行の違いは無視する)
+    """
+
+    name = 'token'
+
+    def compare(self, expected: BinaryIO, actual: BinaryIO) -> bool:
+        expected_tokens = _tokens(expected)
+        actual_tokens = _tokens(actual)
+        while True:
+            e = next(expected_tokens, None)
+            a = next(actual_tokens, None)
+            if e is None or a is None:
+                return e is None and a is None
+            if e != a and not self.match_token(e, a):
+                return False
+
+    def match_token(self, expected: bytes, actual: bytes) -> bool:
+        return False
+
+
+class FloatComparator(TokenComparator):
+    """トークン列として比較し、数値は絶対誤差または相対誤差が許容誤差以下であれば一致とみなす
+    """
+
+    name = 'float'
+
+    def __init__(self, tolerance: float = 1e-6):
+        """
+        :param tolerance: 許容する絶対誤差・相対誤差
+        """
+        self.tolerance = tolerance
+
+    def match_token(self, expected: bytes, actual: bytes) -> bool:
+        try:
+            e = float(expected)
+            a = float(actual)
+        except ValueError:
+            return False
+        if math.isnan(e) or math.isnan(a):
+            return False
+        return math.isclose(a, e, rel_tol=self.tolerance,
+                            abs_tol=self.tolerance)
+
+
+COMPARATORS = ('exact', 'token', 'float')
+
+
+def create_comparator(name: Optional[str] = None,
+                      tolerance: Optional[float] = None) -> Comparator:
+    """比較方法を選ぶ
+    :param name: 'exact', 'token', 'float'
+        省略した場合、許容誤差があれば'float', なければ'exact'
+    :param tolerance: 'float'の場合の許容誤差 (省略時は1e-6)
+    """
+    if name is None:
+        name = 'float' if tolerance is not None else 'exact'
+    if name == 'exact':
+        return ExactComparator()
+    if name == 'token':
+        return TokenComparator()
+    if name == 'float':
+        return FloatComparator(float(tolerance) if tolerance is not None else 1e-6)
+    raise ValueError('Unknown comparator: {}'.format(name))
+
+
+def detect_tolerance(text: Optional[str]) -> Optional[float]:
+    """問題の出力欄の記述から許容誤差を読み取る
+    :param text: 出力欄の文章 (ex: '真の値との絶対誤差または相対誤差が 10^{-6} 以下であれば正解とみなされる。')
+    :return 許容誤差 (記述が無い場合はNone)
+    """
+    if not text:
+        return None
+    m = _TOLERANCE.search(text)
+    if m is None:
+        return None
+    return 10.0 ** int(m.group(1).replace(' ', ''))
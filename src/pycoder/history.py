@@ -0,0 +1,169 @@
+"""テストの実行時間・メモリの履歴.
+
+pc test で実行したケースごとに、解答のハッシュ値と合わせて実行時間とメモリ使用量をデータベース (store)
+に記録する。解答を書き換えた後のテストで、以前の解答での最短の実行時間より大きく遅くなったケースを知らせる。
+"""
+import hashlib
+import time
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+from . import store
+from .pycolor import pprint
+
+# 以前の最短の実行時間のこの倍率を超えたら、遅くなったとみなす
+SLOWDOWN_RATIO = 1.5
+
+# 計測の揺らぎで知らせないよう、これ以上遅くなった場合だけ知らせる [sec]
+MIN_SLOWDOWN = 0.05
+
+# pc history で表示する解答の数 (新しいものから)
+MAX_SOLUTIONS = 20
+
+# 表示する解答のハッシュ値の長さ
+_SHORT_HASH = 8
+
+
+class Regression(NamedTuple):
+    name: str  # ケース名
+    best_time: float  # 以前の解答での最短の実行時間 [sec]
+    best_solution: str  # その解答のハッシュ値
+    wall_time: float  # 今回の実行時間 [sec]
+
+
+def solution_hash(source_path: str) -> str:
+    """解答のハッシュ値
+    """
+    with open(source_path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _best_times(runs: Iterable[store.Run], exclude: str = None
+                ) -> Dict[str, Tuple[float, str]]:
+    """ケースごとに、通った実行の中で最短の実行時間を求める
+    :param exclude: 除く解答のハッシュ値
+    :return ケース名 -> (実行時間 [sec], 解答のハッシュ値)
+    """
+    best: Dict[str, Tuple[float, str]] = {}
+    for run in runs:
+        if run.result != 'OK' or run.solution == exclude:
+            continue
+        if run.name not in best or run.wall_time < best[run.name][0]:
+            best[run.name] = (run.wall_time, run.solution)
+    return best
+
+
+def find_regressions(previous: Iterable[store.Run],
+                     current: Iterable[store.Run]) -> List[Regression]:
+    """今回の実行のうち、以前の解答での最短の実行時間より大きく遅くなったものを求める
+    同じ解答を実行し直した場合の揺らぎは知らせないよう、今回と異なる解答とだけ比べる。
+    """
+    current = list(current)
+    if not current:
+        return []
+    best = _best_times(previous, exclude=current[0].solution)
+    regressions = []
+    for run in current:
+        if run.name not in best:
+            continue
+        best_time, best_solution = best[run.name]
+        if (run.wall_time > best_time * SLOWDOWN_RATIO
+                and run.wall_time - best_time >= MIN_SLOWDOWN):
+            regressions.append(Regression(run.name, best_time, best_solution,
+                                          run.wall_time))
+    return regressions
+
+
+def record(contest_dir: str, task: str, source_path: str, interpreter: str,
+           results) -> List[Regression]:
+    """テストの結果を記録し、遅くなったケースを返す
+    :param results: [(ケース名, judge.TestResponse), ...]
+        (キャッシュした結果と、実行時間が分からない結果は記録しない)
+    """
+    solution = solution_hash(source_path)
+    now = time.time()
+    current = [store.Run(name, interpreter, solution, res.result.name,
+                         res.usage.wall_time, res.usage.max_rss, now)
+               for name, res in results
+               if not res.cached and res.usage is not None]
+    if not current:
+        return []
+    previous = store.load_runs(contest_dir, task, interpreter)
+    regressions = find_regressions(previous, current)
+    store.save_runs(contest_dir, task, current)
+    return regressions
+
+
+def print_regressions(regressions: List[Regression]) -> None:
+    if not regressions:
+        return
+    pprint('[regression]', color='red')
+    for r in regressions:
+        pprint('case: {} {:.3f} s -> {:.3f} s (x{:.1f}, best: {})'.format(
+            r.name, r.best_time, r.wall_time, r.wall_time / r.best_time,
+            r.best_solution[:_SHORT_HASH]), color='red', bold=False)
+
+
+def print_history(contest_dir: str, task: str, name: str = None,
+                  interpreter: str = None) -> bool:
+    """解答ごとに、各ケースの最短の実行時間を古い順に表示する
+    以前の解答での最短より大きく遅くなったものには '!' を付ける。
+    :param name: ケース名 (省略時はすべて)
+    :param interpreter: インタプリタ (省略時はすべて)
+    :return 記録があったかどうか
+    """
+    runs = store.load_runs(contest_dir, task, interpreter)
+    if name is not None:
+        runs = [run for run in runs if run.name == str(name)]
+    if not runs:
+        return False
+
+    # (インタプリタ, 解答) ごとに、初めて実行した順に並べる
+    solutions: Dict[Tuple[str, str], List[store.Run]] = {}
+    for run in runs:
+        solutions.setdefault((run.interpreter, run.solution), []).append(run)
+    case_names = sorted({run.name for run in runs})
+    keys = list(solutions)
+    # 古い解答は表示しないが、遅くなったかどうかの比較には使う
+    shown = set(keys[-MAX_SOLUTIONS:])
+
+    width = max([9] + [len(n) for n in case_names])
+    # 各セルの末尾は '!' を付ける位置
+    print('{:<{}} {:<16} {:<12}'.format('solution', _SHORT_HASH, 'recorded',
+                                        'interpreter')
+          + ''.join(' {:>{}} '.format(n, width) for n in case_names))
+    previous: List[store.Run] = []
+    for interpreter_name, solution in keys:
+        solution_runs = solutions[(interpreter_name, solution)]
+        if (interpreter_name, solution) not in shown:
+            previous.extend(solution_runs)
+            continue
+        best = _best_times(solution_runs)
+        earlier = _best_times([r for r in previous
+                               if r.interpreter == interpreter_name])
+        cells = []
+        for case_name in case_names:
+            if case_name in best:
+                t = best[case_name][0]
+                mark = ''
+                if case_name in earlier:
+                    before = earlier[case_name][0]
+                    if (t > before * SLOWDOWN_RATIO
+                            and t - before >= MIN_SLOWDOWN):
+                        mark = '!'
+                cells.append('{:.3f}{}'.format(t, mark or ' '))
+            elif any(r.name == case_name for r in solution_runs):
+                # 通らなかったケースは判定結果を表示する
+                cells.append(_last_result(solution_runs, case_name) + ' ')
+            else:
+                cells.append('- ')
+        recorded = time.strftime('%Y-%m-%d %H:%M',
+                                 time.localtime(solution_runs[0].recorded_at))
+        print('{:<{}} {:<16} {:<12}'.format(
+            solution[:_SHORT_HASH], _SHORT_HASH, recorded, interpreter_name)
+            + ''.join(' {:>{}}'.format(c, width + 1) for c in cells))
+        previous.extend(solution_runs)
+    return True
+
+
+def _last_result(runs: List[store.Run], name: str) -> str:
+    return next(run.result for run in reversed(runs) if run.name == name)
@@ -0,0 +1,375 @@
+"""AtCoderのページから必要な部分だけを1回の走査で取り出すパーサ.
+
+DOMツリーを組み立てずに html.parser でタグを順に読み、ページの大きさに比例する時間で
+抽出する。抽出結果は BeautifulSoup(html5lib) で木を組み立てて探索した場合と同じになる。
+"""
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+
+
+def _has_class(attrs: List[Tuple[str, Optional[str]]], class_name: str) -> bool:
+    for name, value in attrs:
+        if name == 'class' and value is not None:
+            return class_name in value.split()
+    return False
+
+
+def _normalize_newlines(html: str) -> str:
+    # html5libと同様に改行コードをLFに揃える
+    return html.replace('\r\n', '\n').replace('\r', '\n')
+
+
+class _Section:
+    def __init__(self):
+        self.h3: Optional[str] = None
+        self.pre: Optional[str] = None
+
+
+class _SampleScanner(HTMLParser):
+    """問題ページの各sectionについて、最初のh3と最初のpreのテキストを集める
+    英語ページ(span.lang-en)と入出力の形式欄(div.io-style)の中身は読み飛ばす。
+    """
+
+    # 読み飛ばす要素 (タグ名, class名)
+    SKIPPED = (('span', 'lang-en'), ('div', 'io-style'))
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.sections: List[_Section] = []
+        self._open_sections: List[_Section] = []
+        self._skip_tag: Optional[str] = None
+        self._skip_depth = 0
+        self._capture_tag: Optional[str] = None
+        self._capture_depth = 0
+        self._captured: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if self._skip_tag is not None:
+            if tag == self._skip_tag:
+                self._skip_depth += 1
+            return
+        for skip_tag, skip_class in self.SKIPPED:
+            if tag == skip_tag and _has_class(attrs, skip_class):
+                self._skip_tag = tag
+                self._skip_depth = 1
+                return
+
+        if self._capture_tag is not None:
+            if tag == self._capture_tag:
+                self._capture_depth += 1
+            return
+        if tag == 'section':
+            section = _Section()
+            self.sections.append(section)
+            self._open_sections.append(section)
+        elif tag in ('h3', 'pre') and self._open_sections:
+            if any(getattr(s, tag) is None for s in self._open_sections):
+                self._capture_tag = tag
+                self._capture_depth = 1
+                self._captured = []
+
+    def handle_endtag(self, tag):
+        if self._skip_tag is not None:
+            if tag == self._skip_tag:
+                self._skip_depth -= 1
+                if self._skip_depth == 0:
+                    self._skip_tag = None
+            return
+
+        if self._capture_tag is not None:
+            if tag == self._capture_tag:
+                self._capture_depth -= 1
+                if self._capture_depth == 0:
+                    self._finish_capture()
+            return
+        if tag == 'section' and self._open_sections:
+            self._open_sections.pop()
+
+    def handle_data(self, data):
+        if self._skip_tag is None and self._capture_tag is not None:
+            self._captured.append(data)
+
+    def _finish_capture(self):
+        text = ''.join(self._captured)
+        tag = self._capture_tag
+        if tag == 'pre' and text.startswith('\n'):
+            # <pre>直後の改行は無視される (HTMLの仕様)
+            text = text[1:]
+        for section in self._open_sections:
+            if getattr(section, tag) is None:
+                setattr(section, tag, text)
+        self._capture_tag = None
+
+
+def scan_sample_io(html: str) -> List[str]:
+    """問題ページから入出力例のテキストを出現順に取り出す
+    '問題文'のsectionとpreを含まないsectionは除く。
+    :param html 問題ページ
+    :return [入力例1, 出力例1, 入力例2, ...]
+    """
+    scanner = _SampleScanner()
+    scanner.feed(_normalize_newlines(html))
+    scanner.close()
+    return [section.pre for section in scanner.sections
+            if section.h3 != '問題文' and section.pre is not None]
+
+
+class _ProbPathScanner(HTMLParser):
+    """問題一覧ページの最初のtbodyについて、各行の最初のtd内の最初のaを集める
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.prob_paths: Dict[str, str] = {}
+        self._state = 'before_tbody'
+        self._td_seen = False
+        self._in_first_td = False
+        self._link: Optional[str] = None
+        self._label: Optional[List[str]] = None
+
+    def handle_starttag(self, tag, attrs):
+        if self._state == 'before_tbody':
+            if tag == 'tbody':
+                self._state = 'in_tbody'
+            return
+        if self._state != 'in_tbody':
+            return
+
+        if tag == 'tr':
+            self._td_seen = False
+            self._link = None
+        elif tag == 'td' and not self._td_seen:
+            self._td_seen = True
+            self._in_first_td = True
+        elif tag == 'a' and self._in_first_td and self._link is None:
+            self._link = dict(attrs).get('href') or ''
+            self._label = []
+        elif self._label is not None:
+            # aの最初の子要素がタグの場合はそこでラベルの取得を終える
+            self._finish_link()
+
+    def handle_endtag(self, tag):
+        if self._state != 'in_tbody':
+            return
+        if tag == 'a' and self._label is not None:
+            self._finish_link()
+        elif tag == 'td':
+            self._in_first_td = False
+        elif tag == 'tbody':
+            self._state = 'done'
+
+    def handle_data(self, data):
+        if self._label is not None:
+            self._label.append(data)
+
+    def _finish_link(self):
+        label = ''.join(self._label or [])
+        self.prob_paths[label.lower()] = self._link or ''
+        self._label = None
+
+
+def scan_prob_paths(html: str) -> Dict[str, str]:
+    """問題一覧ページから各問題へのパスを取り出す
+    :param html 問題一覧ページ
+    :return {'a': '/contests/abc160/tasks/abc160_a', ...}
+    """
+    scanner = _ProbPathScanner()
+    scanner.feed(_normalize_newlines(html))
+    scanner.close()
+    return scanner.prob_paths
+
+
+class _CsrfTokenScanner(HTMLParser):
+    """name="csrf_token"を持つ最初の要素のvalueを取り出す
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.csrf_token: Optional[str] = None
+        self.found = False
+
+    def handle_starttag(self, tag, attrs):
+        if self.found:
+            return
+        attr_dict = dict(attrs)
+        if attr_dict.get('name') == 'csrf_token':
+            self.found = True
+            self.csrf_token = attr_dict.get('value')
+
+    handle_startendtag = handle_starttag
+
+
+def scan_csrf_token(html: str) -> Optional[str]:
+    """htmlからcsrfトークンを取り出す
+    :param html csrfトークンを含むページ
+    :return csrf_token 見つからない場合はNone
+    """
+    scanner = _CsrfTokenScanner()
+    scanner.feed(html)
+    scanner.close()
+    return scanner.csrf_token
+
+
+class _SpecScanner(HTMLParser):
+    """問題ページ(日本語)の'制約'の各項目と、'入力'の形式(最初のpre)、'出力'の説明文を集める
+    """
+
+    CONSTRAINTS = '制約'
+    INPUT = '入力'
+    OUTPUT = '出力'
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.constraints: List[str] = []
+        self.input_format: Optional[str] = None
+        self.output_description: List[str] = []
+        self._section_titles: List[Optional[str]] = []
+        self._skip_depth = 0
+        self._capture_tag: Optional[str] = None
+        self._captured: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if self._skip_depth:
+            if tag == 'span':
+                self._skip_depth += 1
+            return
+        if tag == 'span' and _has_class(attrs, 'lang-en'):
+            self._skip_depth = 1
+            return
+
+        if self._capture_tag is not None:
+            return
+        title = self._section_titles[-1] if self._section_titles else None
+        if tag == 'section':
+            self._section_titles.append(None)
+        elif tag == 'h3' and self._section_titles and title is None:
+            self._start_capture(tag)
+        elif tag == 'li' and title == self.CONSTRAINTS:
+            self._start_capture(tag)
+        elif (tag == 'pre' and title == self.INPUT
+              and self.input_format is None):
+            self._start_capture(tag)
+
+    def handle_endtag(self, tag):
+        if self._skip_depth:
+            if tag == 'span':
+                self._skip_depth -= 1
+            return
+        if tag == self._capture_tag:
+            text = ''.join(self._captured)
+            if tag == 'h3':
+                self._section_titles[-1] = text.strip()
+            elif tag == 'li':
+                self.constraints.append(' '.join(text.split()))
+            elif tag == 'pre':
+                self.input_format = text.lstrip('\n')
+            self._capture_tag = None
+        elif tag == 'section' and self._section_titles:
+            self._section_titles.pop()
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        if self._capture_tag is not None:
+            self._captured.append(data)
+        elif self._section_titles and self._section_titles[-1] == self.OUTPUT:
+            self.output_description.append(data)
+
+    def _start_capture(self, tag):
+        self._capture_tag = tag
+        self._captured = []
+
+
+def scan_problem_spec(html: str) -> Tuple[List[str], Optional[str], str]:
+    """問題ページから制約、入力形式、出力の説明を取り出す
+    :param html 問題ページ
+    :return 制約の各項目 (ex: ['1 \\leq N \\leq 10^5', ...]),
+        入力形式 (ex: 'N\\nA_1 \\ldots A_N\\n'),
+        出力の説明 (ex: 'Yes または No を出力せよ。')
+    """
+    scanner = _SpecScanner()
+    scanner.feed(_normalize_newlines(html))
+    scanner.close()
+    output_description = ' '.join(''.join(scanner.output_description).split())
+    return scanner.constraints, scanner.input_format, output_description
+
+
+class _SubmissionIdScanner(HTMLParser):
+    """提出一覧ページの各行にある data-id (提出ID) を出現順に集める
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.submission_ids: List[int] = []
+
+    def handle_starttag(self, tag, attrs):
+        value = dict(attrs).get('data-id')
+        if value is not None and value.isdigit():
+            submission_id = int(value)
+            if submission_id not in self.submission_ids:
+                self.submission_ids.append(submission_id)
+
+    handle_startendtag = handle_starttag
+
+
+def scan_submission_ids(html: str) -> List[int]:
+    """提出一覧ページから提出IDを取り出す
+    :param html 提出一覧ページ (/contests/abc160/submissions/me)
+    :return 提出ID (新しい順)
+    """
+    scanner = _SubmissionIdScanner()
+    scanner.feed(html)
+    scanner.close()
+    return scanner.submission_ids
+
+
+class _SubmissionStatusScanner(HTMLParser):
+    """提出状況の断片から、ラベル(span.label)のテキストとセルのテキストを集める
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.label: Optional[str] = None
+        self.cells: List[str] = []
+        self._label_depth = 0
+        self._label_text: List[str] = []
+        self._cell_text: Optional[List[str]] = None
+
+    def handle_starttag(self, tag, attrs):
+        if self._label_depth:
+            if tag == 'span':
+                self._label_depth += 1
+        elif tag == 'span' and self.label is None and _has_class(attrs, 'label'):
+            self._label_depth = 1
+        if tag == 'td':
+            self._cell_text = []
+
+    def handle_endtag(self, tag):
+        if self._label_depth and tag == 'span':
+            self._label_depth -= 1
+            if self._label_depth == 0:
+                self.label = ''.join(self._label_text).strip()
+        if tag == 'td' and self._cell_text is not None:
+            self.cells.append(' '.join(''.join(self._cell_text).split()))
+            self._cell_text = None
+
+    def handle_data(self, data):
+        if self._label_depth:
+            self._label_text.append(data)
+        if self._cell_text is not None:
+            self._cell_text.append(data)
+
+
+def scan_submission_status(html: str) -> Tuple[str, List[str]]:
+    """提出状況のjsonに含まれるhtmlの断片から、ジャッジの状況と各セルのテキストを取り出す
+    :param html ex: "<td ...><span class='label label-success'>AC</span></td>
+        <td class='text-right'>21 ms</td><td class='text-right'>3648 KB</td>"
+    :return ジャッジの状況 (ex: 'AC', 'WJ', '3/14 TLE'), セルのテキスト (ex: ['AC', '21 ms', '3648 KB'])
+    """
+    scanner = _SubmissionStatusScanner()
+    scanner.feed(html)
+    scanner.close()
+    status = scanner.label
+    if status is None:
+        status = scanner.cells[0] if scanner.cells else ''
+    return status, scanner.cells
@@ -1,14 +1,26 @@
+from __future__ import annotations
+
+import io
 import os
-import subprocess
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum, auto
 from .pycolor import pprint
-from typing import NamedTuple, Optional
+from typing import TYPE_CHECKING, BinaryIO, Dict, List, NamedTuple, Optional
 from .auth import get_csrf_token, auth
-from requests import Session
-from . import scrape
+from .auth import load_csrf_token_in_local, save_csrf_token_in_local
 from . import langs
-import requests
-import webbrowser
+from . import runner as runners
+from . import taskinfo
+from . import compare as comparators
+from . import resultcache
+from . import history
+
+# requestsの読み込みには時間がかかるため、提出時に読み込む
+if TYPE_CHECKING:
+    import requests
+    from requests import Session
 
 
 def read_file(file_path: str) -> str:
@@ -22,21 +34,65 @@ class TestResult(Enum):
     NG = auto()
     TLE = auto()
     RE = auto()
+    OLE = auto()
+    MLE = auto()
+
+
+# 出力の大きさの上限のデフォルト値 [MB]
+DEFAULT_OUTPUT_LIMIT = 64
+
+# 問題ページから実行時間制限を取得できなかった場合の制限時間 [sec]
+DEFAULT_TIME_LIMIT = 2.0
+
+
+class Limits(NamedTuple):
+    time_limit: float  # 制限時間 [sec]
+    memory_limit: Optional[int]  # メモリ制限 [MB] (Noneの場合は制限しない)
 
 
 class TestResponse(NamedTuple):
     result: TestResult
-    input_val: str
-    expected_val: Optional[str]
-    actual_val: Optional[str]
+    input_path: str
+    expected_path: Optional[str]  # 期待する出力が無いケースはNone
+    actual_val: Optional[str]  # 出力を保持しなかった場合、TLE・OLEの場合はNone
+    usage: Optional[runners.Usage] = None
+    cached: bool = False  # 前回の結果を使った場合はTrue
+
+    @property
+    def input_val(self) -> str:
+        # 大きな入力を表示しない限りは読み込まない
+        return read_file(self.input_path)
+
+    @property
+    def expected_val(self) -> Optional[str]:
+        if self.expected_path is None:
+            return None
+        return read_file(self.expected_path)
+
+
+def get_contest_dir(contest) -> str:
+    """コンテストのディレクトリのパスを返す
+    """
+    # TODO: テストケースのディレクトリを設定ファイルのパスから取得する
+    return './atcoder/contests/' + contest + '/'
+
+
+def get_task_dir(contest, task_name) -> str:
+    """問題のディレクトリのパスを返す
+    """
+    return get_contest_dir(contest) + task_name + '/'
 
 
 def get_test_case_dirs(contest, task_name):
     """
+    tests/ が無いか空の場合は、データベースに保存したサンプルケースを書き出してから返す。
     """
-    # TODO: テストケースのディレクトリを設定ファイルのパスから取得する
-    test_case_root_dir = './atcoder/contests/' + \
-        contest + '/' + task_name + '/tests/'
+    test_case_root_dir = get_task_dir(contest, task_name) + 'tests/'
+    if (not os.path.isdir(test_case_root_dir)
+            or not os.listdir(test_case_root_dir)):
+        from . import store
+        store.export_cases(get_contest_dir(contest), task_name)
+        os.makedirs(test_case_root_dir, exist_ok=True)
 
     test_case_dirs = list(
         map(
@@ -47,61 +103,421 @@ def get_test_case_dirs(contest, task_name):
     return test_case_dirs
 
 
-def test_all(contest, task, name: str = None, verbose=False):
+def _select_test_dirs(contest, task, name=None):
+    test_dirs = get_test_case_dirs(contest, task)
+    if name is not None:
+        names = ({str(name)} if isinstance(name, (str, int))
+                 else {str(n) for n in name})
+        test_dirs = [(test_name, test_dir) for test_name, test_dir in test_dirs
+                     if test_name in names]
+    return test_dirs
+
+
+def _print_limits(limits: Limits):
+    print('limits: {:.2f} s, {}'.format(
+        limits.time_limit,
+        'no memory limit' if limits.memory_limit is None
+        else '{} MB'.format(limits.memory_limit)))
+
+
+class _CaseRunner:
+    """1つのインタプリタ・実行条件で、テストケースを実行するか、キャッシュから結果を返す
+    """
+
+    def __init__(self, target_script: str, runner: str, preload,
+                 comparator: comparators.Comparator, limits: Limits,
+                 output_limit: int, interpreter: str,
+                 cache: resultcache.ResultCache, use_cache: bool,
+                 keep_output: bool):
+        self.target_script = target_script
+        self.interpreter = interpreter
+        self.runner = runners.create_runner(runner, preload, interpreter)
+        self.comparator = comparator
+        self.limits = limits
+        self.output_limit = output_limit
+        self.cache = cache
+        self.use_cache = use_cache
+        self.keep_output = keep_output
+        self.settings = resultcache.settings_key(target_script, {
+            'runner': runner, 'preload': preload,
+            'comparator': comparator.name,
+            'tolerance': getattr(comparator, 'tolerance', None),
+            'limits': list(limits), 'output_limit': output_limit,
+        }, interpreter)
+
+    def submit(self, executor: ThreadPoolExecutor, test_dir: str):
+        """テストケースの実行を始める
+        :return (キャッシュのキー, TestResponse または Future)
+        """
+        input_path = test_dir + '/in.txt'
+        output_path = test_dir + '/out.txt'
+        key = resultcache.case_key(self.settings, input_path, output_path)
+        # 詳細表示では実際の出力が必要なので、キャッシュは使わない
+        entry = (self.cache.get(key)
+                 if self.use_cache and not self.keep_output else None)
+        if entry is not None:
+            return key, _cached_response(entry, input_path, output_path)
+        return key, executor.submit(
+            run_test, self.target_script, input_path, output_path,
+            runner=self.runner, comparator=self.comparator,
+            keep_output=self.keep_output, output_limit=self.output_limit,
+            limits=self.limits)
+
+    def result(self, key: str, item) -> TestResponse:
+        """実行の終了を待ち、結果をキャッシュに加える
+        """
+        res = item if isinstance(item, TestResponse) else item.result()
+        # TLEは実行時の負荷によって変わりうるので保存しない
+        if not res.cached and res.result != TestResult.TLE:
+            self.cache[key] = resultcache.make_entry(res.result.name, res.usage)
+        return res
+
+
+def test_all(contest, task, name=None, verbose=False, jobs: int = 1,
+             runner: str = 'subprocess', preload=None, compare: str = None,
+             tolerance: float = None, output_limit: int = DEFAULT_OUTPUT_LIMIT,
+             time_factor: float = 1.0,
+             verdicts: Dict[str, TestResult] = None, use_cache: bool = True,
+             interpreter: str = 'python', record_history: bool = True):
+    """全テストケースを実行する
+    :param name: 実行するテストケース名 (ex: '1' または ['1', 'gen-max'])
+    :param jobs: 並列に実行するテストケースの数 (0以下の場合はCPUコア数)
+    :param runner: テストの実行方式 ('subprocess' または 'fork')
+    :param preload: runnerが'fork'の場合に事前に読み込むモジュール
+        (ex: 'numpy,scipy' または ['numpy', 'scipy'])
+    :param compare: 出力の比較方法 ('exact', 'token', 'float')
+    :param tolerance: compareが'float'の場合の許容誤差
+    :param output_limit: 出力の大きさの上限 [MB]
+    :param time_factor: 制限時間に掛ける係数 (ジャッジより遅い環境では1より大きくする)
+    :param verdicts: 前回の各ケースの判定結果
+        指定した場合は判定が変わったケースだけを表示し、今回の結果で更新する
+    :param use_cache: 解答・テストケース・実行条件が前回と同じケースは実行せずに前回の結果を使うか
+        (Falseの場合も今回の結果は保存する)
+    :param interpreter: テストで実行するインタプリタのコマンド (ex: 'pypy3')
+    :param record_history: 実行時間を履歴に記録し、以前の解答より遅くなったケースを表示するか
+    :return 全テストケースに通ったかどうか
+    """
     print('contest: ', contest)
     print('task: ', task)
-    test_dirs = get_test_case_dirs(contest, task)
+    if interpreter != 'python':
+        print('interpreter: ', interpreter)
+    limits = get_limits(contest, task, time_factor)
+    _print_limits(limits)
+    test_dirs = _select_test_dirs(contest, task, name)
+    # ケースが無い場合は、通ったことにしない (テストしていない解答を提出しないように)
+    if not test_dirs:
+        pprint('Test case is not found.', color='red')
+        return False
     target_script = 'atcoder/contests/' + contest + '/' + task + '/main.py'
+
+    if jobs is None or jobs <= 0:
+        jobs = os.cpu_count() or 1
+    if isinstance(preload, str):
+        preload = [m for m in preload.split(',') if m]
+    comparator = get_comparator(contest, task, compare, tolerance)
+
+    contest_dir = get_contest_dir(contest)
+    cache = resultcache.load_cache(contest_dir, task)
+    case_runner = _CaseRunner(target_script, runner, preload, comparator,
+                              limits, output_limit, interpreter, cache,
+                              use_cache, keep_output=verbose)
+
     all_res = True
-    for test_name, test_dir in test_dirs:
-        if name is not None:
-            if str(name) != test_name:
-                continue
-        res = test(test_name, test_dir, target_script, verbose=verbose)
-        all_res &= res
+    usages = []
+    results = []
+    # run_testはsubprocessの終了を待つだけなので、スレッドで十分並列化できる
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        pending = [(test_name, *case_runner.submit(executor, test_dir))
+                   for test_name, test_dir in test_dirs]
+
+        # 終了順ではなくテストケースの順に結果を表示する
+        for test_name, key, item in pending:
+            res = case_runner.result(key, item)
+            results.append((test_name, res))
+            all_res &= res.result == TestResult.OK
+            if res.usage is not None:
+                usages.append((test_name, res.usage))
+            if verdicts is not None:
+                changed = verdicts.get(test_name) != res.result
+                verdicts[test_name] = res.result
+                if not changed:
+                    continue
+            print('case: {} => '.format(test_name), end='')
+            print_result(res, verbose=verbose)
+    resultcache.save_cache(contest_dir, task, cache)
+    print_usage_summary(usages)
+    if record_history:
+        # forkでの実行はインタプリタの起動時間を含まないため、別に記録する
+        label = interpreter if runner == 'subprocess' else '{}:{}'.format(
+            interpreter, runner)
+        history.print_regressions(history.record(
+            contest_dir, task, target_script, label, results))
     return all_res
 
 
+class InterpreterSummary(NamedTuple):
+    interpreter: str
+    passed: int  # 通ったケースの数
+    total: int
+    max_time: float  # 最も時間がかかったケースの経過時間 [sec]
+
+    @property
+    def passed_all(self) -> bool:
+        """全ケースに通ったかどうか (ケースが無い場合は通ったことにしない)"""
+        return self.total > 0 and self.passed == self.total
+
+
+def test_matrix(contest, task, interpreters: List[str], name=None,
+                jobs: int = 1, compare: str = None, tolerance: float = None,
+                output_limit: int = DEFAULT_OUTPUT_LIMIT,
+                time_factor: float = 1.0,
+                use_cache: bool = True) -> List[InterpreterSummary]:
+    """全テストケースを複数のインタプリタで並行に実行し、ケースごとの実行時間を比べる
+    :param interpreters: インタプリタのコマンド (ex: ['python', 'pypy3'])
+        見つからないインタプリタは飛ばす
+    :param jobs: 並列に実行するテストケースの数 (全インタプリタの合計、0以下の場合はCPUコア数)
+    その他の引数は test_all と同じ
+    :return インタプリタごとの結果 (interpretersの順)
+    """
+    print('contest: ', contest)
+    print('task: ', task)
+    limits = get_limits(contest, task, time_factor)
+    _print_limits(limits)
+    available = []
+    for interpreter in interpreters:
+        if shutil.which(interpreter) is None:
+            pprint('{} is not found.'.format(interpreter), color='yellow')
+        else:
+            available.append(interpreter)
+    test_dirs = _select_test_dirs(contest, task, name)
+    if not test_dirs:
+        pprint('Test case is not found.', color='red')
+    target_script = 'atcoder/contests/' + contest + '/' + task + '/main.py'
+
+    if jobs is None or jobs <= 0:
+        jobs = os.cpu_count() or 1
+    comparator = get_comparator(contest, task, compare, tolerance)
+    contest_dir = get_contest_dir(contest)
+    cache = resultcache.load_cache(contest_dir, task)
+    case_runners = [
+        _CaseRunner(target_script, 'subprocess', None, comparator, limits,
+                    output_limit, interpreter, cache, use_cache,
+                    keep_output=False)
+        for interpreter in available]
+
+    # インタプリタ -> [(ケース名, TestResponse), ...]
+    results: Dict[str, List] = {interpreter: [] for interpreter in available}
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        # 同じケースを各インタプリタで続けて実行し、負荷の偏りが比較に影響しにくいようにする
+        pending = [(test_name, case_runner,
+                    *case_runner.submit(executor, test_dir))
+                   for test_name, test_dir in test_dirs
+                   for case_runner in case_runners]
+        for test_name, case_runner, key, item in pending:
+            res = case_runner.result(key, item)
+            results[case_runner.interpreter].append((test_name, res))
+    resultcache.save_cache(contest_dir, task, cache)
+
+    summaries = [_summarize(interpreter, results[interpreter])
+                 for interpreter in available]
+    print_matrix([name for name, _ in test_dirs], results, summaries)
+    return summaries
+
+
+def _summarize(interpreter: str, results) -> InterpreterSummary:
+    passed = sum(res.result == TestResult.OK for _, res in results)
+    times = [res.usage.wall_time for _, res in results if res.usage is not None]
+    return InterpreterSummary(interpreter, passed, len(results),
+                              max(times, default=0.0))
+
+
+def _format_cell(res: TestResponse) -> str:
+    if res.usage is None:
+        return res.result.name
+    return '{} {:.3f}s'.format(res.result.name, res.usage.wall_time)
+
+
+def print_matrix(test_names: List[str], results: Dict[str, List],
+                 summaries: List[InterpreterSummary]):
+    """ケースごとに、各インタプリタでの判定結果と実行時間を並べて表示する
+    """
+    interpreters = [summary.interpreter for summary in summaries]
+    name_width = max([len('case')] + [len(n) for n in test_names])
+    cells = {interpreter: dict((name, _format_cell(res))
+                               for name, res in results[interpreter])
+             for interpreter in interpreters}
+    widths = [max([len(interpreter)] +
+                  [len(cell) for cell in cells[interpreter].values()])
+              for interpreter in interpreters]
+    print('  '.join(['case'.ljust(name_width)] +
+                    [interpreter.ljust(width)
+                     for interpreter, width in zip(interpreters, widths)]))
+    for test_name in test_names:
+        print('  '.join([test_name.ljust(name_width)] +
+                        [cells[interpreter].get(test_name, '-').ljust(width)
+                         for interpreter, width in zip(interpreters, widths)]))
+    pprint('[summary]', color='cyan')
+    for summary in summaries:
+        color = 'green' if summary.passed == summary.total else 'red'
+        pprint('{}: {}/{} passed, max time: {:.3f} s'.format(
+            summary.interpreter, summary.passed, summary.total,
+            summary.max_time), color=color)
+
+
+def choose_interpreter(summaries: List[InterpreterSummary]
+                       ) -> Optional[InterpreterSummary]:
+    """通ったケースが最も多く、その中で最大の実行時間が最も短いインタプリタを選ぶ
+    :return 選んだインタプリタ (候補が無い場合はNone)
+    """
+    if not summaries:
+        return None
+    return min(summaries, key=lambda s: (-s.passed, s.max_time))
+
+
+def _cached_response(entry: resultcache.Entry, input_path: str,
+                     output_path: str) -> TestResponse:
+    usage = runners.Usage(*entry['usage']) if entry['usage'] else None
+    expected_path = output_path if os.path.exists(output_path) else None
+    return TestResponse(TestResult[entry['result']], input_path,
+                        expected_path, None, usage, cached=True)
+
+
+def print_usage_summary(usages):
+    """全テストケースのうち、最も時間・メモリを使ったケースを表示する
+    :param usages: [(テストケース名, Usage), ...]
+    """
+    if not usages:
+        return
+    time_case, time_usage = max(usages, key=lambda x: x[1].wall_time)
+    cpu_case, cpu_usage = max(
+        usages, key=lambda x: x[1].user_time + x[1].sys_time)
+    mem_case, mem_usage = max(usages, key=lambda x: x[1].max_rss)
+    pprint('[summary]', color='cyan')
+    print('max time: {:.3f} s (case: {})'.format(
+        time_usage.wall_time, time_case))
+    print('max cpu time: {:.3f} s (case: {})'.format(
+        cpu_usage.user_time + cpu_usage.sys_time, cpu_case))
+    print('max memory: {:.1f} MB (case: {})'.format(
+        mem_usage.max_rss / 1024, mem_case))
+
+
 def test(test_name, test_dir, test_target_path, verbose=False):
     print('case: {} => '.format(test_name), end='')
     input_path = test_dir + '/in.txt'
     output_path = test_dir + '/out.txt'
-    res = run_test(test_target_path, input_path, output_path)
+    res = run_test(test_target_path, input_path, output_path,
+                   keep_output=verbose)
     print_result(res, verbose=verbose)
     return res.result == TestResult.OK
 
 
-def run_test(test_target_path, input_path, output_path) -> TestResponse:
-    """
+def run_test(test_target_path, input_path, output_path,
+             runner=None, comparator=None, keep_output=False,
+             output_limit: int = DEFAULT_OUTPUT_LIMIT,
+             limits: Limits = None) -> TestResponse:
+    """テストケースを1つ実行する
+    入力・出力はファイルのまま扱い、keep_outputが指定された場合だけ実際の出力を読み込む。
+    :param keep_output: 実際の出力を文字列として保持するかどうか (表示する場合に指定する)
+    :param output_limit: 出力の大きさの上限 [MB] (超えた場合はOLE)
+    :param limits: 実行時間制限とメモリ制限 (省略時は2秒、メモリ制限なし)
     """
-    input_val = read_file(input_path)
-    expected_output = read_file(output_path)
-    try:
-        with open(input_path, 'r') as f:
-            std = subprocess.run(
-                ['python', test_target_path],
-                stdin=f,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                timeout=2.0,
-                shell=False,
-                check=True,
-            )
-    except subprocess.TimeoutExpired:
+    if limits is None:
+        limits = Limits(DEFAULT_TIME_LIMIT, None)
+    memory_limit = (None if limits.memory_limit is None
+                    else limits.memory_limit * 1024 * 1024)
+    if runner is None:
+        runner = runners.SubprocessRunner()
+    # 生成した最大ケースなど、期待する出力が無いケースは実行できたかどうかだけを判定する
+    expected_path = output_path if os.path.exists(output_path) else None
+    with tempfile.TemporaryFile() as actual:
+        run_res = runner.run(test_target_path, input_path,
+                             timeout=limits.time_limit, output=actual,
+                             output_limit=output_limit * 1024 * 1024,
+                             memory_limit=memory_limit)
+        actual.seek(0)
+        if expected_path is not None:
+            with open(expected_path, 'rb') as expected:
+                res = judge_output(run_res, expected, comparator, actual)
+        else:
+            res = judge_output(run_res, None, comparator, actual)
+
         actual_output = None
-        res = TestResult.TLE
-    except subprocess.CalledProcessError as e:
-        actual_output = e.output.decode('utf-8').rstrip()
-        res = TestResult.RE
-    else:
-        actual_output = std.stdout.decode('utf-8').rstrip()
-        res = TestResult.OK if actual_output == expected_output else TestResult.NG
-    return TestResponse(res, input_val, expected_output, actual_output)
+        # 上限を超えた出力は表示しないので読み込まない
+        if keep_output and res not in (TestResult.TLE, TestResult.OLE):
+            actual.seek(0)
+            actual_output = actual.read().decode('utf-8', 'replace').rstrip()
+    return TestResponse(res, input_path, expected_path, actual_output,
+                        run_res.usage)
+
+
+def judge_output(run_res: runners.RunResult, expected: Optional[BinaryIO],
+                 comparator: comparators.Comparator = None,
+                 actual: BinaryIO = None) -> TestResult:
+    """実行結果を判定する
+    :param run_res: スクリプトの実行結果
+    :param expected: 期待する出力 (Noneの場合は出力を比較しない)
+    :param comparator: 出力の比較方法 (省略時は末尾の空白を除いて完全一致)
+    :param actual: 実際の出力 (省略時はrun_res.output)
+    :return 判定結果
+    """
+    if run_res.timed_out:
+        return TestResult.TLE
+    if run_res.output_limit_exceeded:
+        return TestResult.OLE
+    if run_res.memory_limit_exceeded:
+        return TestResult.MLE
+    if run_res.returncode != 0:
+        return TestResult.RE
+    if expected is None:
+        return TestResult.OK
+    if comparator is None:
+        comparator = comparators.ExactComparator()
+    if actual is None:
+        actual = io.BytesIO(run_res.output)
+    if comparator.compare(expected, actual):
+        return TestResult.OK
+    return TestResult.NG
+
+
+def get_comparator(contest, task, name: str = None,
+                   tolerance: float = None) -> comparators.Comparator:
+    """出力の比較方法を決める
+    指定されていない場合は、prepare_contest時にデータベース (store) に保存した設定
+    ('comparator', 'tolerance') を使う。
+    :param name: 'exact', 'token', 'float'
+    :param tolerance: 許容誤差
+    """
+    info = taskinfo.load_task_info(get_contest_dir(contest)).get(task, {})
+    if name is None:
+        name = info.get('comparator')
+    if tolerance is None:
+        tolerance = info.get('tolerance')
+    return comparators.create_comparator(name, tolerance)
+
+
+def get_limits(contest, task, time_factor: float = 1.0) -> Limits:
+    """問題の実行時間制限とメモリ制限を決める
+    prepare_contest時にデータベース (store) に保存した制限 ('time_limit', 'memory_limit') を使う。
+    :param time_factor: 制限時間に掛ける係数
+    """
+    info = taskinfo.load_task_info(get_contest_dir(contest)).get(task, {})
+    time_limit = info.get('time_limit', DEFAULT_TIME_LIMIT)
+    return Limits(time_limit * time_factor, info.get('memory_limit'))
+
+
+def _format_usage(usage: runners.Usage) -> str:
+    return '{:.3f} s (cpu: {:.3f} s user, {:.3f} s sys), {:.1f} MB'.format(
+        usage.wall_time, usage.user_time, usage.sys_time, usage.max_rss / 1024)
 
 
 def print_result(res: TestResponse, verbose=False):
     result_color: str = 'green' if res.result == TestResult.OK else 'red'
-    pprint('{}'.format(res.result.name), color=result_color)
+    pprint('{}'.format(res.result.name), color=result_color, end='')
+    cached = ' (cached)' if res.cached else ''
+    if res.usage is not None:
+        print('  ' + _format_usage(res.usage) + cached)
+    else:
+        print(cached)
 
     if verbose:
         pprint('[input]', color='cyan')
@@ -119,46 +535,112 @@ def print_result(res: TestResponse, verbose=False):
             pprint(res.actual_val, color='red', bold=False)
             print()
 
-        if res.result == TestResult.RE:
+        if res.result in (TestResult.RE, TestResult.MLE):
             pprint('[output]', color='red')
             pprint(res.actual_val, color='red', bold=False)
             print()
 
-        if res.result == TestResult.TLE:
+        if res.result in (TestResult.TLE, TestResult.OLE):
             print()
 
 
 CONTEST_URL = 'https://atcoder.jp/contests/'
 
 
+def _get_task_screen_name(contest, task) -> str:
+    """task_screen_nameを取得する
+    prepare_contest時に保存したものがあればそれを使い、なければ問題一覧ページから取得する。
+    """
+    task_info = taskinfo.load_task_info(get_contest_dir(contest))
+    task_screen_name = task_info.get(task, {}).get('screen_name')
+    if task_screen_name is not None:
+        return task_screen_name
+
+    from . import scrape
+    tasks_page = scrape.fetch_contest_tasks_page(contest)
+    prob_paths = scrape.extract_prob_paths(tasks_page)
+    return scrape.get_task_screen_name(prob_paths, task)
+
+
+def _is_submitted(res: requests.Response) -> bool:
+    """提出が受け付けられたかどうか
+    提出に成功すると提出結果ページ(/submissions/me)へリダイレクトされる。
+    """
+    return res.ok and res.url.rstrip('/').endswith('/submissions/me')
+
+
+def _is_rejected(res: requests.Response) -> bool:
+    """提出が受け付けられなかったことが確かかどうか (提出し直しても二重に提出しないか)
+    4xxの場合と、csrfトークンが無効で提出ページへ戻された場合。
+    """
+    from urllib.parse import urlsplit
+    return (400 <= res.status_code < 500
+            or urlsplit(res.url).path.rstrip('/').endswith('/submit'))
+
+
+def _report_unconfirmed(res: requests.Response) -> None:
+    pprint('Could not confirm the submission (status: {}, url: {}).'.format(
+        res.status_code, res.url), color='yellow')
+    pprint('It may have been accepted. Check the submissions page before '
+           'submitting again.', color='yellow', bold=False)
+
+
+def _get_submission_id(res: requests.Response) -> Optional[int]:
+    """提出結果ページから、最新の提出のIDを読み取る
+    """
+    from . import htmlscan
+    submission_ids = htmlscan.scan_submission_ids(res.text)
+    return submission_ids[0] if submission_ids else None
+
+
 @auth
-def submit(session_logined: Session, contest, task, lang='p'):
+def submit(session_logined: Session, contest, task, lang='p') -> Optional[int]:
+    """main.pyを提出する
+    :return 提出ID (提出結果ページから読み取れなかった場合はNone)
+    """
     target_script = 'atcoder/contests/' + contest + '/' + task + '/main.py'
     submit_src = read_file(target_script)
     submit_url = CONTEST_URL + contest + '/submit'
 
-    csrf_token = get_csrf_token(submit_url, session_logined)
-    tasks_page = scrape.fetch_contest_tasks_page(contest)
-    prob_paths = scrape.extract_prob_paths(tasks_page)
-    task_screen_name = scrape.get_task_screen_name(prob_paths, task)
-
+    task_screen_name = _get_task_screen_name(contest, task)
     lang_id = langs.get_lang_id(lang)
 
     submit_info = {"data.TaskScreenName": task_screen_name,
-                   "csrf_token": csrf_token,
                    "data.LanguageId": lang_id,
                    "sourceCode": submit_src}
+
+    # 保存済みのcsrfトークンがあれば、提出ページを取得せずにそのまま提出する
+    csrf_token = load_csrf_token_in_local()
+    if csrf_token is not None:
+        res = session_logined.post(
+            submit_url, dict(submit_info, csrf_token=csrf_token))
+        if _is_submitted(res):
+            print('Submit succeeded!')
+            return _get_submission_id(res)
+        # 受け付けられた可能性がある場合は、二重に提出しないよう提出し直さない
+        if not _is_rejected(res):
+            _report_unconfirmed(res)
+            return None
+
+    # トークンが無い、もしくは失効している場合は取得し直して再提出する
+    import requests
+    csrf_token = get_csrf_token(submit_url, session_logined)
+    save_csrf_token_in_local(csrf_token)
     try:
-        res = session_logined.post(submit_url, submit_info)
+        res = session_logined.post(
+            submit_url, dict(submit_info, csrf_token=csrf_token))
         res.raise_for_status()
     except requests.exceptions.HTTPError:
         exit(1)
 
-    if res.status_code == 200:
+    if _is_submitted(res):
         print('Submit succeeded!')
-    else:
-        print('Submit failed...')
-        exit(1)
+        return _get_submission_id(res)
+    if not _is_rejected(res):
+        _report_unconfirmed(res)
+        return None
+    print('Submit failed...')
+    exit(1)
 
 
 def _get_submission_result_url(contest):
@@ -170,5 +652,6 @@ def _get_submission_result_url(contest):
 
 
 def open_submission_page(contest):
+    import webbrowser
     submit_result_url = _get_submission_result_url(contest)
     webbrowser.open(submit_result_url)
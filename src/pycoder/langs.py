@@ -1,3 +1,4 @@
+import os
 from typing import List, Optional
 
 lang_ids = {
@@ -5,6 +6,12 @@ lang_ids = {
     'pypy': 4047,
 }
 
+# 提出言語ごとに、テストで使うインタプリタのコマンド
+interpreters = {
+    'python': 'python',
+    'pypy': 'pypy3',
+}
+
 
 def get_lang_id(lang_type: str) -> Optional[int]:
     if lang_type == 'p':
@@ -12,3 +19,11 @@ def get_lang_id(lang_type: str) -> Optional[int]:
     elif lang_type == 'pp':
         return lang_ids['pypy']
     return None
+
+
+def get_lang_type(interpreter: str) -> str:
+    """インタプリタのコマンドから、提出言語の種類を求める
+    :param interpreter: インタプリタのコマンド (ex: 'python', 'pypy3')
+    :return 'p' または 'pp'
+    """
+    return 'pp' if 'pypy' in os.path.basename(interpreter) else 'p'
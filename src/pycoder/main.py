@@ -1,57 +1,324 @@
 import fire
-from . import auth
-from . import code
 from . import judge
 
+# pc test の起動を速くするため、他のコマンドだけが使うモジュールは各コマンドの中で読み込む
+
+
+def _split_names(value):
+    """Split 'python,pypy3' (fire may also pass a tuple) into a list."""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [v for v in value.split(',') if v]
+    return [str(v) for v in value]
+
 
 class Commands:
     @staticmethod
     def login():
         """Login.
         """
+        from . import auth
         auth.login()
 
     @staticmethod
     def logout():
         """Logout.
         """
+        from . import auth
         auth.logout()
 
     @staticmethod
-    def contest(contest):
-        """Prepare contest.
-        :param contest: Coontest name
+    def contest(*contests, jobs=None, rate=None, no_export=False,
+                at_start=False, refresh=False):
+        """Prepare contests.
+        Pages fetched before are reused, so running it again (e.g. after a
+        network failure) fetches only the missing pages. Existing main.py
+        files are never overwritten.
+        :param contests: Contest names or ranges (ex: abc300 abc301-abc310)
+        :param jobs: Maximum number of pages fetched at the same time
+            (default: 8)
+        :param rate: Maximum number of requests per second (default: 4)
+        :param no_export: Keep sample cases only in the local database.
+            They are written to tests/ when the task is first tested.
+        :param at_start: Wait for the contest to start and prepare it as
+            soon as its tasks are visible.
+        :param refresh: Ask the server whether saved pages have changed
+            (conditional requests) and fetch only the changed ones.
+        """
+        from . import code
+        from . import scrape
+        if jobs is None:
+            jobs = scrape.MAX_CONCURRENT_FETCHES
+        if rate is None:
+            rate = scrape.REQUESTS_PER_SECOND
+        if not contests:
+            print('Please specify contests.')
+            exit(1)
+        failed = code.prepare_contests(contests, max_workers=jobs,
+                                       requests_per_second=rate,
+                                       export=not no_export,
+                                       at_start=at_start,
+                                       refresh=refresh)
+        if failed:
+            exit(1)
+
+    @staticmethod
+    def archive(*contests, jobs=None, rate=None):
+        """Save pages of contests locally so that `pc contest` works offline.
+        Pages already saved are not fetched again, and a problem shared by
+        several contests is fetched only once.
+        :param contests: Contest names or ranges (ex: abc300-abc310)
+        :param jobs: Maximum number of pages fetched at the same time
+            (default: 8)
+        :param rate: Maximum number of requests per second (default: 4)
+        """
+        from . import code
+        from . import scrape
+        if jobs is None:
+            jobs = scrape.MAX_CONCURRENT_FETCHES
+        if rate is None:
+            rate = scrape.REQUESTS_PER_SECOND
+        if not contests:
+            print('Please specify contests.')
+            exit(1)
+        failed = code.archive_contests(contests, max_workers=jobs,
+                                       requests_per_second=rate)
+        if failed:
+            exit(1)
+
+    @staticmethod
+    def export(contest, task=None):
+        """Write sample cases saved in the local database to tests/.
+        :param contest: Contest name
+        :param task: Target problem (default: all problems of the contest)
         """
-        code.prepare_contest(contest)
+        from . import code
+        exported = code.export_contest(contest, task)
+        for task_name, cases in exported.items():
+            print('{}: {} cases'.format(task_name, len(cases)))
 
     @staticmethod
-    def test(contest, task, name=None, verbose=False):
+    def test(contest, task, name=None, verbose=False, jobs=1,
+             runner='subprocess', preload=None, compare=None, tolerance=None,
+             output_limit=judge.DEFAULT_OUTPUT_LIMIT, time_factor=1.0,
+             watch=False, no_cache=False, interp=None):
         """Run test.
         :param contest: Contest name
         :param task: Target problem (a, b, c, ...)
         :param name: Test case name
         :param verbose: If verbose is True, show full information of test.
+        :param jobs: Number of test cases run in parallel (0: number of CPUs)
+        :param runner: How to run test cases ('subprocess' or 'fork')
+        :param preload: Modules imported once before forking (ex: numpy,scipy)
+        :param compare: How to compare outputs ('exact', 'token', 'float').
+            Defaults to the setting saved by pc contest ('float' if the
+            problem allows an error, otherwise 'exact').
+        :param tolerance: Allowed absolute/relative error for 'float'
+        :param output_limit: Output size limit in MB (exceeding it is OLE)
+        :param time_factor: Multiplier for the problem's time limit
+            (ex: 1.5 on a machine slower than the judge)
+        :param watch: Re-run tests whenever main.py or test cases are saved.
+            Only test cases whose verdict changed are shown.
+        :param no_cache: Run all test cases even if the solution and the test
+            case are unchanged since the last run.
+        :param interp: Interpreter command (ex: pypy3). With several
+            interpreters (ex: python,pypy3), test cases run under each of
+            them concurrently and their times are compared per case
+            (--runner and --preload cannot be used then).
         """
-        res = judge.test_all(contest, task, name=name, verbose=verbose)
+        interpreters = _split_names(interp)
+        if len(interpreters) > 1:
+            if watch:
+                print('--watch cannot be used with several interpreters.')
+                exit(1)
+            if runner != 'subprocess' or preload:
+                # 各インタプリタは別プロセスで実行するため、forkできない
+                print('--runner and --preload cannot be used with several '
+                      'interpreters.')
+                exit(1)
+            judge.test_matrix(contest, task, interpreters, name=name,
+                              jobs=jobs, compare=compare, tolerance=tolerance,
+                              output_limit=output_limit,
+                              time_factor=time_factor, use_cache=not no_cache)
+            return
+        options = dict(verbose=verbose, jobs=jobs, runner=runner,
+                       preload=preload, compare=compare, tolerance=tolerance,
+                       output_limit=output_limit, time_factor=time_factor,
+                       use_cache=not no_cache)
+        if interpreters:
+            options['interpreter'] = interpreters[0]
+        if watch:
+            from . import watch as watcher
+            watcher.watch(contest, task, **options)
+            return
+        res = judge.test_all(contest, task, name=name, **options)
 
     @staticmethod
-    def submit(contest, task, lang='p', force=False):
+    def submit(contest, task, lang='p', force=False, jobs=1,
+               runner='subprocess', preload=None, compare=None,
+               tolerance=None, output_limit=judge.DEFAULT_OUTPUT_LIMIT,
+               time_factor=1.0, no_cache=False, wait=False):
         """Submit code.
         :param contest: Contest name
         :param task: Target problem (a, b, c, ...)
-        :param lang: Submission language
+        :param lang: Submission language ('p': CPython, 'pp': PyPy, 'auto':
+            test under both and submit with the faster one; test cases run
+            as subprocesses, so --runner and --preload cannot be used)
         :param force: Submit forcibly if all test cases are not passed.
+        :param jobs: Number of test cases run in parallel (0: number of CPUs)
+        :param runner: How to run test cases ('subprocess' or 'fork')
+        :param preload: Modules imported once before forking (ex: numpy,scipy)
+        :param compare: How to compare outputs ('exact', 'token', 'float')
+        :param tolerance: Allowed absolute/relative error for 'float'
+        :param output_limit: Output size limit in MB (exceeding it is OLE)
+        :param time_factor: Multiplier for the problem's time limit
+        :param no_cache: Run all test cases instead of reusing cached results
+        :param wait: Wait for the verdict in the terminal instead of opening
+            the submission page in a browser.
         """
-        is_all_test_cases_passed = judge.test_all(contest, task)
+        if lang == 'auto':
+            from . import langs
+            if runner != 'subprocess' or preload:
+                # インタプリタを比べるため、どちらもsubprocessで実行する
+                print('--runner and --preload cannot be used with '
+                      '--lang auto.')
+                exit(1)
+            summaries = judge.test_matrix(
+                contest, task, list(langs.interpreters.values()), jobs=jobs,
+                compare=compare, tolerance=tolerance,
+                output_limit=output_limit, time_factor=time_factor,
+                use_cache=not no_cache)
+            best = judge.choose_interpreter(summaries)
+            if best is None:
+                print('No interpreter is found.')
+                exit(1)
+            lang = langs.get_lang_type(best.interpreter)
+            print('lang: {} ({})'.format(lang, best.interpreter))
+            is_all_test_cases_passed = best.passed_all
+        else:
+            is_all_test_cases_passed = judge.test_all(
+                contest, task, jobs=jobs, runner=runner, preload=preload,
+                compare=compare, tolerance=tolerance,
+                output_limit=output_limit, time_factor=time_factor,
+                use_cache=not no_cache)
         if (not is_all_test_cases_passed) and (not force):
             return
-        judge.submit(contest, task, lang=lang)
-        judge.open_submission_page(contest)
+        submission_id = judge.submit(contest, task, lang=lang)
+        if not wait:
+            judge.open_submission_page(contest)
+            return
+        from . import submissions
+        if submission_id is None:
+            submission_ids = submissions.fetch_pending_submission_ids(contest)
+        else:
+            submission_ids = [submission_id]
+        if not submissions.wait_and_print(contest, submission_ids):
+            exit(1)
+
+    @staticmethod
+    def wait(contest):
+        """Wait for the verdicts of your submissions still being judged.
+        :param contest: Contest name
+        """
+        from . import submissions
+        submission_ids = submissions.fetch_pending_submission_ids(contest)
+        if not submission_ids:
+            print('No submission is being judged.')
+            return
+        if not submissions.wait_and_print(contest, submission_ids):
+            exit(1)
+
+    @staticmethod
+    def stress(contest, task, iterations=1000, jobs=1, runner='subprocess',
+               preload=None, compare=None, tolerance=None, time_factor=1.0):
+        """Compare main.py with naive.py on random cases generated by gen.py.
+        gen.py receives a seed as its first argument and prints an input.
+        The first mismatch is saved as a new test case. main.py runs under
+        the problem's time and memory limits, as in pc test.
+        :param contest: Contest name
+        :param task: Target problem (a, b, c, ...)
+        :param iterations: Number of random cases
+        :param jobs: Number of cases run in parallel (0: number of CPUs)
+        :param runner: How to run scripts ('subprocess' or 'fork')
+        :param preload: Modules imported once before forking (ex: numpy,scipy)
+        :param compare: How to compare outputs ('exact', 'token', 'float')
+        :param tolerance: Allowed absolute/relative error for 'float'
+        :param time_factor: Multiplier for the problem's time limit, which
+            applies to main.py (gen.py and naive.py may run longer)
+        """
+        from . import stress
+        stress.stress_test(contest, task, iterations=iterations, jobs=jobs,
+                           runner=runner, preload=preload, compare=compare,
+                           tolerance=tolerance, time_factor=time_factor)
+
+    @staticmethod
+    def maxcase(contest, task, modes='max,min,random'):
+        """Generate worst-case inputs from the constraints and input format.
+        Generated cases have no expected output; pc test only checks that
+        they finish within the time limit.
+        :param contest: Contest name
+        :param task: Target problem (a, b, c, ...)
+        :param modes: Kinds of cases (max: max values, min: min values,
+            random: random values). Sizes are always maximum.
+        """
+        from . import maxcase
+        if isinstance(modes, str):
+            modes = [m for m in modes.split(',') if m]
+        try:
+            case_names = maxcase.save_max_cases(contest, task, modes)
+        except ValueError as e:
+            print(e)
+            exit(1)
+        print('Generated test cases: {}'.format(', '.join(case_names)))
+
+    @staticmethod
+    def history(contest, task, name=None, interp=None):
+        """Show how the time of each test case changed across edits.
+        Each row is a version of main.py (first tested at 'recorded') and
+        shows the best time of each case. '!' marks a case that became much
+        slower than with earlier versions.
+        :param contest: Contest name
+        :param task: Target problem (a, b, c, ...)
+        :param name: Test case name (default: all cases)
+        :param interp: Interpreter (default: all interpreters)
+        """
+        from . import history
+        if not history.print_history(judge.get_contest_dir(contest), task,
+                                     name=name, interpreter=interp):
+            print('No history of {} {}.'.format(contest, task))
+
+    @staticmethod
+    def profile(contest, task, case=None, lines=True, memory=False,
+                generate=False):
+        """Profile main.py on one input to find where the time goes.
+        Shows the functions with the most time (cProfile), the hottest lines
+        of main.py (sampling) and, optionally, allocation sites (tracemalloc).
+        :param contest: Contest name
+        :param task: Target problem (a, b, c, ...)
+        :param case: Test case name (default: the case with the largest input)
+        :param lines: Sample which line of main.py is running
+        :param memory: Trace memory allocations
+        :param generate: Generate a max case from the constraints
+            (see `pc maxcase`) and profile it.
+        """
+        from . import profiler
+        if generate:
+            from . import maxcase
+            try:
+                case = maxcase.save_max_cases(contest, task, ['max'])[0]
+            except ValueError as e:
+                print(e)
+                exit(1)
+        if not profiler.profile(contest, task, case=case, lines=lines,
+                                memory=memory):
+            exit(1)
 
     @staticmethod
     def init():
         """Initialize directory for atcoder
         """
+        from . import code
         code.init()
 
 
@@ -0,0 +1,330 @@
+"""問題の制約と入力形式から、最大サイズの入力を生成する.
+
+'1 \\leq N \\leq 2 \\times 10^5' のような制約から各変数の範囲を読み取り、
+'A_1 A_2 \\ldots A_N' のような入力形式に従って入力を組み立てる。
+変数同士の関係 (u_i < v_i など) は考慮しないため、生成した入力は実行時間・メモリの
+確認用であり、正しい答えは分からない (期待する出力は保存しない)。
+"""
+import ast
+import operator
+import random
+import re
+import string
+from typing import Dict, List, Optional, Tuple
+
+from . import judge
+from . import store
+from . import taskinfo
+
+MODES = ('max', 'min', 'random')
+
+# 生成したケースのケース名の接頭辞 (ex: 'gen-max')
+CASE_NAME_PREFIX = 'gen-'
+
+# 生成する入力の大きさの上限 [文字]
+MAX_INPUT_SIZE = 64 * 1024 * 1024
+
+_RELATION = re.compile(
+    r'\\(?:leqq|leq|le|lt|geqq|geq|ge|gt)(?![A-Za-z])|≦|≤|≧|≥|<=|>=|<|>')
+_ASCENDING = {'\\leqq': False, '\\leq': False, '\\le': False, '\\lt': True,
+              '≦': False, '≤': False, '<=': False, '<': True}
+_DESCENDING = {'\\geqq': False, '\\geq': False, '\\ge': False, '\\gt': True,
+               '≧': False, '≥': False, '>=': False, '>': True}
+_VARIABLE = re.compile(
+    r'(\|)?([A-Za-z]+)(?:_(?:\{[^}]*\}|[A-Za-z0-9]+))?(?(1)\|)')
+_TOKEN = re.compile(r'([A-Za-z]+)(?:_(\{[^}]*\}|[A-Za-z0-9]+))?$')
+_LENGTH_RANGE = re.compile(
+    r'([A-Za-z]+)(?:_\S*)?\s*は.*?長さ\s*(.+?)\s*以上\s*(.+?)\s*以下')
+_LENGTH = re.compile(r'([A-Za-z]+)(?:_\S*)?\s*は.*?長さ\s*(.+?)\s*の')
+_H_ELLIPSIS = {'\\ldots', '\\cdots', '\\dots', '...', '…', '⋯'}
+_V_ELLIPSIS = {'\\vdots', ':', '⋮'}
+
+_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Pow: operator.pow,
+    ast.FloorDiv: operator.floordiv,
+    ast.Div: operator.floordiv,
+}
+
+
+class _Bound:
+    """変数(または文字列の長さ)の範囲. lo, hiは (式, 補正値) の組"""
+
+    def __init__(self):
+        self.lo: Optional[Tuple[str, int]] = None
+        self.hi: Optional[Tuple[str, int]] = None
+        self.is_length = False
+        self.charset = string.ascii_lowercase
+
+
+def _eval_node(node, env):
+    if isinstance(node, ast.Expression):
+        return _eval_node(node.body, env)
+    if isinstance(node, ast.Constant) and isinstance(node.value, int):
+        return node.value
+    if isinstance(node, ast.Name) and node.id in env:
+        return env[node.id]
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        return -_eval_node(node.operand, env)
+    if isinstance(node, ast.BinOp) and type(node.op) in _OPERATORS:
+        return _OPERATORS[type(node.op)](_eval_node(node.left, env),
+                                         _eval_node(node.right, env))
+    raise ValueError('Unsupported expression')
+
+
+def eval_expr(expr: str, env: Dict[str, int]) -> int:
+    """TeX形式の式を評価する
+    :param expr: 式 (ex: '2 \\times 10^5', 'N-1')
+    :param env: 式中の変数の値
+    :raise ValueError 評価できない場合
+    """
+    s = expr.replace('\\times', '*').replace('\\cdot', '*')
+    s = s.replace('\\,', '').replace(',', '')
+    s = re.sub(r'\^\{([^}]*)\}', r'**(\1)', s).replace('^', '**')
+    if re.search(r'\\[A-Za-z]+', s):
+        raise ValueError('Unsupported expression: {}'.format(expr))
+    s = s.replace('{', '(').replace('}', ')')
+    s = _VARIABLE.sub(lambda m: m.group(2), s)
+    try:
+        return _eval_node(ast.parse(s.strip(), mode='eval'), env)
+    except (SyntaxError, ValueError, TypeError, ZeroDivisionError):
+        raise ValueError('Unsupported expression: {}'.format(expr))
+
+
+def _variables_in(term: str) -> Optional[List[Tuple[str, bool]]]:
+    """'N, M' や '|S_i|' のように変数だけからなる項であれば、(変数名, 長さかどうか)のリストを返す
+    """
+    names = []
+    for piece in term.split(','):
+        m = _VARIABLE.fullmatch(piece.strip())
+        if m is None:
+            return None
+        names.append((m.group(2), m.group(1) is not None))
+    return names
+
+
+def parse_constraints(constraints: List[str]) -> Dict[str, _Bound]:
+    """制約の各項目から変数ごとの範囲を読み取る
+    読み取れない項目は無視する。
+    """
+    bounds: Dict[str, _Bound] = {}
+
+    def bound_of(name):
+        return bounds.setdefault(name, _Bound())
+
+    for constraint in constraints:
+        for m in _LENGTH_RANGE.finditer(constraint):
+            bound = bound_of(m.group(1))
+            bound.is_length = True
+            bound.lo, bound.hi = (m.group(2), 0), (m.group(3), 0)
+        for m in _LENGTH.finditer(constraint):
+            bound = bound_of(m.group(1))
+            if bound.hi is None:
+                bound.is_length = True
+                bound.lo = bound.hi = (m.group(2), 0)
+        if '英大文字' in constraint:
+            for m in _LENGTH.finditer(constraint):
+                bound_of(m.group(1)).charset = string.ascii_uppercase
+        if '数字' in constraint:
+            for m in _LENGTH.finditer(constraint):
+                bound_of(m.group(1)).charset = string.digits
+
+        terms = _RELATION.split(constraint)
+        relations = _RELATION.findall(constraint)
+        if not relations:
+            continue
+        if all(r in _DESCENDING for r in relations):
+            terms, relations = terms[::-1], relations[::-1]
+            strict = [_DESCENDING[r] for r in relations]
+        elif all(r in _ASCENDING for r in relations):
+            strict = [_ASCENDING[r] for r in relations]
+        else:
+            continue
+        terms = [t.strip() for t in terms]
+
+        if len(terms) == 2:
+            # 'N \leq 10^5' または '1 \leq N'
+            if _variables_in(terms[0]) is not None:
+                subjects = [0]
+            else:
+                subjects = [1]
+        else:
+            subjects = list(range(1, len(terms) - 1))
+
+        for k in subjects:
+            names = _variables_in(terms[k])
+            if names is None:
+                continue
+            for name, is_length in names:
+                bound = bound_of(name)
+                bound.is_length |= is_length
+                if k > 0:
+                    bound.lo = (terms[0], sum(strict[:k]))
+                if k < len(terms) - 1:
+                    bound.hi = (terms[-1], -sum(strict[k:]))
+    return bounds
+
+
+def _resolve(bounds: Dict[str, _Bound]) -> Dict[str, Tuple[int, int]]:
+    """各変数の範囲を数値にする
+    他の変数を含む式 (ex: A_i \\leq N) は、その変数を最大値として評価する。
+    """
+    resolved: Dict[str, Tuple[int, int]] = {}
+    env: Dict[str, int] = {}
+    progress = True
+    while progress:
+        progress = False
+        for name, bound in bounds.items():
+            if name in resolved or bound.hi is None:
+                continue
+            try:
+                hi = eval_expr(bound.hi[0], env) + bound.hi[1]
+                if bound.lo is not None:
+                    lo = eval_expr(bound.lo[0], env) + bound.lo[1]
+                else:
+                    lo = min(hi, 1 if bound.is_length else 0)
+            except ValueError:
+                continue
+            resolved[name] = (lo, hi)
+            env[name] = hi
+            progress = True
+    return resolved
+
+
+class _Generator:
+    def __init__(self, bounds: Dict[str, _Bound], mode: str,
+                 rand: random.Random):
+        self.bounds = bounds
+        self.ranges = _resolve(bounds)
+        self.env = {name: hi for name, (lo, hi) in self.ranges.items()}
+        self.mode = mode
+        self.rand = rand
+        self.size = 0
+
+    def value(self, name: str, indexed: bool) -> str:
+        if name not in self.ranges:
+            raise ValueError('Cannot determine the range of {}'.format(name))
+        lo, hi = self.ranges[name]
+        bound = self.bounds[name]
+        if not indexed and not bound.is_length:
+            # サイズを表す変数は常に最大にする
+            v = hi
+        elif self.mode == 'max':
+            v = hi
+        elif self.mode == 'min':
+            v = lo
+        else:
+            v = self.rand.randint(lo, hi)
+
+        if bound.is_length:
+            length = hi if self.mode != 'min' else lo
+            if self.mode == 'random':
+                text = ''.join(self.rand.choices(bound.charset, k=length))
+            else:
+                text = bound.charset[0] * length
+        else:
+            text = str(v)
+        self.size += len(text) + 1
+        if self.size > MAX_INPUT_SIZE:
+            raise ValueError('Generated input is too large.')
+        return text
+
+    def count(self, index: str, first: bool) -> int:
+        components = index.strip('{}').split(',')
+        return eval_expr(components[0 if first else -1], self.env)
+
+    def row(self, tokens: List[str]) -> str:
+        parsed = []
+        ellipsis_at = None
+        for i, token in enumerate(tokens):
+            if token in _H_ELLIPSIS:
+                ellipsis_at = i
+                continue
+            m = _TOKEN.match(token)
+            if m is None:
+                raise ValueError('Cannot parse input format: {}'.format(token))
+            parsed.append((i, m.group(1), m.group(2)))
+
+        if ellipsis_at is None:
+            return ' '.join(self.value(name, index is not None)
+                            for _, name, index in parsed)
+
+        # 'A_1 A_2 \ldots A_N': 最後の項の添字の数だけ並べる
+        _, last_name, last_index = parsed[-1]
+        if last_index is None:
+            raise ValueError('Cannot parse input format: {}'.format(
+                ' '.join(tokens)))
+        values = [self.value(name, index is not None)
+                  for _, name, index in parsed if name != last_name]
+        n = self.count(last_index, first=False)
+        values += [self.value(last_name, True) for _ in range(n)]
+        return ' '.join(values)
+
+    def generate(self, input_format: str) -> str:
+        lines = []
+        repeat_next = False
+        for line in input_format.splitlines():
+            tokens = line.replace('\\ ', ' ').replace('\\quad', ' ').split()
+            if not tokens:
+                continue
+            if len(tokens) == 1 and tokens[0] in _V_ELLIPSIS:
+                repeat_next = True
+                continue
+            if repeat_next:
+                # 'A_1 \n \vdots \n A_N': 最初の添字の数だけ行を並べる
+                # (1行目は\vdotsの前の行として出力済み)
+                indexes = [m.group(2) for m in map(_TOKEN.match, tokens)
+                           if m is not None and m.group(2) is not None]
+                if not indexes:
+                    raise ValueError('Cannot parse input format: {}'.format(line))
+                n = self.count(indexes[0], first=True)
+                lines += [self.row(tokens) for _ in range(n - 1)]
+                repeat_next = False
+            else:
+                lines.append(self.row(tokens))
+        return '\n'.join(lines) + '\n'
+
+
+def generate(constraints: List[str], input_format: str, mode: str = 'max',
+             seed: int = 0) -> str:
+    """制約と入力形式から入力を生成する
+    :param constraints: 制約の各項目
+    :param input_format: 入力形式
+    :param mode: 'max' (値を最大に), 'min' (値を最小に), 'random' (値をランダムに)
+        いずれも個数・長さを表す変数は最大にする。
+    :param seed: modeが'random'の場合のシード値
+    :return 生成した入力
+    :raise ValueError 制約か入力形式を解釈できない場合
+    """
+    if mode not in MODES:
+        raise ValueError('Unknown mode: {}'.format(mode))
+    bounds = parse_constraints(constraints)
+    generator = _Generator(bounds, mode, random.Random(seed))
+    return generator.generate(input_format)
+
+
+def save_max_cases(contest, task, modes=MODES) -> List[str]:
+    """prepare_contestで保存した制約と入力形式から入力を生成し、テストケースとして保存する
+    データベースに保存し、tests/ に書き出す。
+    期待する出力は分からないため入力のみを保存する (pc test では実行時間・メモリと
+    正常終了したかどうかだけを確認する)。
+    :param modes: 生成するケースの種類 (ex: ['max', 'random'])
+    :return 保存したケース名
+    """
+    contest_dir = judge.get_contest_dir(contest)
+    info = taskinfo.load_task_info(contest_dir).get(task, {})
+    constraints = info.get('constraints')
+    input_format = info.get('input_format')
+    if not constraints or not input_format:
+        raise ValueError('Constraints or input format of {} {} is not saved. '
+                         'Run `pc contest {}` first.'.format(contest, task, contest))
+
+    cases = [store.Case(CASE_NAME_PREFIX + mode,
+                        generate(constraints, input_format, mode=mode).encode(),
+                        None)
+             for mode in modes]
+    store.save_cases(contest_dir, task, cases)
+    store.export_cases(contest_dir, task)
+    return [case.name for case in cases]
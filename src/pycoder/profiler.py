@@ -0,0 +1,298 @@
+"""main.pyを1つの入力で実行し、どこに時間とメモリを使っているかを表示する.
+
+子プロセスで main.py を cProfile の下で実行し、関数ごとの実行時間を集める。
+指定した場合は、一定間隔で main.py の実行中の行を記録して行ごとの時間の割合を求め (サンプリング)、
+tracemalloc でメモリを確保した箇所を集める。
+子プロセスは結果をjsonファイルに書き出し、親プロセスが表示する。
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from collections import Counter
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from . import judge
+from .pycolor import pprint
+
+# 表示する関数・行・メモリ確保箇所の数
+TOP_N = 15
+
+# 実行中の行を記録する間隔 [sec]
+SAMPLE_INTERVAL = 0.001
+
+# tracemallocで記録する呼び出し元の深さ
+TRACEBACK_LIMIT = 1
+
+
+class FunctionStat(NamedTuple):
+    name: str  # ex: 'main.py:12(solve)'
+    ncalls: int
+    tottime: float  # その関数自体の実行時間 [sec]
+    cumtime: float  # 呼び出した関数を含む実行時間 [sec]
+
+
+class AllocationStat(NamedTuple):
+    location: str  # ex: 'main.py:10'
+    size: int  # 確保したままのメモリ [byte]
+    count: int  # ブロック数
+
+
+class ProfileResult(NamedTuple):
+    returncode: int
+    total_time: float  # 実行時間 [sec]
+    functions: List[FunctionStat]  # tottimeの降順
+    line_samples: Dict[int, int]  # 行番号 -> サンプル数
+    allocations: List[AllocationStat]  # 大きさの降順
+    output: str  # 標準エラー出力 (例外のトレースバックなど)
+
+
+def _short_path(path: str, target_path: str) -> str:
+    if os.path.abspath(path) == os.path.abspath(target_path):
+        return os.path.basename(path)
+    return path
+
+
+def _function_name(func, target_path: str) -> str:
+    file_name, line, name = func
+    # 組み込み関数は ('~', 0, "<built-in method builtins.sorted>")
+    if file_name == '~' and line == 0:
+        return name
+    return '{}:{}({})'.format(_short_path(file_name, target_path), line, name)
+
+
+class _LineSampler:
+    """一定間隔で、main.pyの実行中の行を記録する
+    ITIMER_PROF (CPU時間) を使うため、入出力の待ち時間は数えない。
+    """
+
+    def __init__(self, target_path: str, interval: float = SAMPLE_INTERVAL):
+        import signal
+        self.signal = signal
+        self.target_path = os.path.abspath(target_path)
+        self.interval = interval
+        self.samples: Counter = Counter()
+
+    def _handler(self, signum, frame):
+        # 呼び出し元をたどり、main.pyの中で実行している行を探す
+        while frame is not None:
+            if frame.f_code.co_filename == self.target_path:
+                self.samples[frame.f_lineno] += 1
+                return
+            frame = frame.f_back
+
+    def start(self):
+        self.signal.signal(self.signal.SIGPROF, self._handler)
+        self.signal.setitimer(self.signal.ITIMER_PROF, self.interval,
+                              self.interval)
+
+    def stop(self):
+        self.signal.setitimer(self.signal.ITIMER_PROF, 0, 0)
+        self.signal.signal(self.signal.SIGPROF, self.signal.SIG_DFL)
+
+
+def _run_child(target_path: str, input_path: str, result_path: str,
+               lines: bool, memory: bool) -> int:
+    """子プロセスで main.py を計測しながら実行し、結果をjsonファイルに書き出す
+    :return 終了コード
+    """
+    import cProfile
+    import pkgutil
+    import pstats
+    import runpy
+    import time
+    import traceback
+    import tracemalloc
+
+    target_path = os.path.abspath(target_path)
+    sys.argv = [target_path]
+    sys.path.insert(0, os.path.dirname(target_path))
+    sys.stdin = open(input_path, 'r')
+    # 解答の出力は捨てる (計測結果だけを表示する)
+    sys.stdout = open(os.devnull, 'w')
+
+    profiler = cProfile.Profile()
+    sampler = _LineSampler(target_path) if lines else None
+    code = 0
+    if memory:
+        tracemalloc.start(TRACEBACK_LIMIT)
+    if sampler is not None:
+        sampler.start()
+    start = time.perf_counter()
+    try:
+        profiler.runcall(runpy.run_path, target_path, run_name='__main__')
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        total_time = time.perf_counter() - start
+        if sampler is not None:
+            sampler.stop()
+        snapshot = tracemalloc.take_snapshot() if memory else None
+        tracemalloc.stop()
+        sys.stdout.flush()
+
+    stats = pstats.Stats(profiler).stats  # type: ignore
+    # 行のサンプリングの処理は除く
+    functions = sorted(
+        (FunctionStat(_function_name(func, target_path), nc, tt, ct)
+         for func, (_, nc, tt, ct, _) in stats.items()
+         if func[0] != __file__),
+        key=lambda f: f.tottime, reverse=True)
+    allocations = []
+    if snapshot is not None:
+        # スクリプトの読み込みにかかった分は除く
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, '<frozen *>'),
+            tracemalloc.Filter(False, runpy.__file__),
+            tracemalloc.Filter(False, pkgutil.__file__),
+            tracemalloc.Filter(False, cProfile.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+        for stat in snapshot.statistics('lineno')[:TOP_N]:
+            frame = stat.traceback[0]
+            allocations.append(AllocationStat(
+                '{}:{}'.format(_short_path(frame.filename, target_path),
+                               frame.lineno), stat.size, stat.count))
+    with open(result_path, 'w') as f:
+        json.dump({
+            'returncode': code,
+            'total_time': total_time,
+            'functions': [list(s) for s in functions[:TOP_N]],
+            'line_samples': sampler.samples if sampler is not None else {},
+            'allocations': [list(a) for a in allocations],
+        }, f)
+    return code
+
+
+def profile_script(target_path: str, input_path: str, lines: bool = True,
+                   memory: bool = False) -> ProfileResult:
+    """スクリプトを1つの入力で計測しながら実行する
+    :param target_path: 実行するスクリプトのパス
+    :param input_path: 標準入力に渡すファイルのパス
+    :param lines: 行ごとの時間の割合を求めるかどうか (SIGPROFが使える環境のみ)
+    :param memory: メモリを確保した箇所を集めるかどうか
+    """
+    import signal
+    lines = lines and hasattr(signal, 'setitimer')
+    fd, result_path = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    # pycoderを読み込めるよう、実行中のインタプリタとパッケージの場所を使う
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [package_root] + ([env['PYTHONPATH']] if env.get('PYTHONPATH') else []))
+    try:
+        proc = subprocess.run(
+            [sys.executable, '-m', 'pycoder.profiler', target_path,
+             input_path, result_path, str(int(lines)), str(int(memory))],
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT, env=env)
+        with open(result_path, 'r') as f:
+            try:
+                data: Dict[str, Any] = json.load(f)
+            except ValueError:
+                data = {}
+    finally:
+        os.remove(result_path)
+    output = proc.stdout.decode('utf-8', 'replace')
+    if not data:
+        return ProfileResult(proc.returncode, 0.0, [], {}, [], output)
+    return ProfileResult(
+        data['returncode'], data['total_time'],
+        [FunctionStat(*f) for f in data['functions']],
+        {int(line): n for line, n in data['line_samples'].items()},
+        [AllocationStat(*a) for a in data['allocations']],
+        output)
+
+
+def _select_input(contest, task, case: Optional[str]) -> Optional[str]:
+    """計測に使う入力を選ぶ
+    :param case: テストケース名 (省略時は入力が最も大きいケース)
+    :return 入力ファイルのパス (ケースが無い場合はNone)
+    """
+    input_paths = {name: test_dir + '/in.txt'
+                   for name, test_dir in judge.get_test_case_dirs(contest, task)
+                   if os.path.exists(test_dir + '/in.txt')}
+    if case is not None:
+        return input_paths.get(str(case))
+    if not input_paths:
+        return None
+    return max(input_paths.values(), key=os.path.getsize)
+
+
+def _color_for(ratio: float) -> str:
+    if ratio >= 0.5:
+        return 'red'
+    if ratio >= 0.1:
+        return 'yellow'
+    return ''
+
+
+def print_profile(res: ProfileResult, target_path: str):
+    """計測結果を表示する
+    """
+    if res.output:
+        pprint('[output]', color='red')
+        pprint(res.output.rstrip(), color='red', bold=False)
+    color = 'green' if res.returncode == 0 else 'red'
+    pprint('total: {:.3f} s (exit code: {})'.format(
+        res.total_time, res.returncode), color=color)
+
+    if res.functions:
+        pprint('[functions]', color='cyan')
+        print('{:>9} {:>9} {:>9}  {}'.format(
+            'ncalls', 'tottime', 'cumtime', 'function'))
+        for f in res.functions:
+            ratio = f.tottime / res.total_time if res.total_time else 0.0
+            pprint('{:>9} {:>9.3f} {:>9.3f}  {}'.format(
+                f.ncalls, f.tottime, f.cumtime, f.name),
+                color=_color_for(ratio), bold=False)
+
+    if res.line_samples:
+        total = sum(res.line_samples.values())
+        with open(target_path, 'r') as f:
+            source = f.read().splitlines()
+        pprint('[lines] {} ({} samples)'.format(
+            os.path.basename(target_path), total), color='cyan')
+        hottest = sorted(res.line_samples.items(), key=lambda x: x[1],
+                         reverse=True)[:TOP_N]
+        for line, samples in hottest:
+            ratio = samples / total
+            text = source[line - 1].strip() if 0 < line <= len(source) else ''
+            pprint('{:>5} {:>6.1%}  {}'.format(line, ratio, text),
+                   color=_color_for(ratio), bold=False)
+
+    if res.allocations:
+        pprint('[allocations]', color='cyan')
+        for a in res.allocations:
+            print('{:>10.1f} KB {:>8} blocks  {}'.format(
+                a.size / 1024, a.count, a.location))
+
+
+def profile(contest, task, case: str = None, lines: bool = True,
+            memory: bool = False) -> bool:
+    """問題のmain.pyをテストケースの入力で計測し、結果を表示する
+    :param case: テストケース名 (省略時は入力が最も大きいケース)
+    :return 正常に終了したかどうか
+    """
+    target_path = judge.get_task_dir(contest, task) + 'main.py'
+    input_path = _select_input(contest, task, case)
+    if input_path is None:
+        print('Test case is not found.')
+        return False
+    print('contest: ', contest)
+    print('task: ', task)
+    print('input: ', input_path)
+    res = profile_script(target_path, input_path, lines=lines, memory=memory)
+    print_profile(res, target_path)
+    return res.returncode == 0
+
+
+if __name__ == '__main__':
+    _target, _input, _result, _lines, _memory = sys.argv[1:6]
+    sys.exit(_run_child(_target, _input, _result, _lines == '1',
+                        _memory == '1'))
@@ -0,0 +1,110 @@
+"""テスト結果のキャッシュ.
+
+解答・テストケース・インタプリタ・実行条件のハッシュ値をキーとして判定結果と実行時間を保存し、
+どれも変わっていないケースは実行せずに前回の結果を返す。
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from typing import Any, Dict, Optional
+
+# コンテストディレクトリ直下に置く、キャッシュを保存するディレクトリ
+CACHE_DIR_NAME = '.cache'
+
+# 問題ごとに保存する結果の最大数 (古いものから捨てる)
+MAX_ENTRIES = 1000
+
+_CHUNK_SIZE = 1024 * 1024
+
+Entry = Dict[str, Any]
+ResultCache = Dict[str, Entry]
+
+
+def _cache_path(contest_dir: str, task: str) -> str:
+    return os.path.join(contest_dir, CACHE_DIR_NAME, task + '.json')
+
+
+def load_cache(contest_dir: str, task: str) -> ResultCache:
+    """保存したテスト結果を読み込む
+    :param contest_dir: コンテストのディレクトリ
+    :param task: 問題 (a, b, c, ...)
+    :return {キー: {'result': 'OK', 'usage': [...], 'time': ...}, ...}
+        (保存されていない、または壊れている場合は空のdict)
+    """
+    try:
+        with open(_cache_path(contest_dir, task), 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_cache(contest_dir: str, task: str, cache: ResultCache) -> None:
+    """テスト結果を保存する
+    他のプロセスが読み込み中でも壊れないよう、一時ファイルに書いてから置き換える。
+    """
+    if len(cache) > MAX_ENTRIES:
+        newest = sorted(cache.items(), key=lambda item: item[1]['time'])
+        cache = dict(newest[-MAX_ENTRIES:])
+    path = _cache_path(contest_dir, task)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp_path, 'w') as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, path)
+
+
+def _update_file_digest(digest, path: str) -> None:
+    try:
+        with open(path, 'rb') as f:
+            digest.update(b'file')
+            for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+                digest.update(chunk)
+    except FileNotFoundError:
+        digest.update(b'none')
+    # ファイルの境界をはっきりさせる
+    digest.update(b'\0')
+
+
+def _interpreter_id(interpreter: str = 'python') -> str:
+    """テストで実行するインタプリタを識別する文字列
+    PATH上のインタプリタが更新・切り替えされた場合に変わる。
+    """
+    path = shutil.which(interpreter)
+    if path is None:
+        return interpreter
+    real_path = os.path.realpath(path)
+    stat = os.stat(real_path)
+    return '{}:{}:{}'.format(real_path, stat.st_size, stat.st_mtime_ns)
+
+
+def settings_key(source_path: str, settings: Dict[str, Any],
+                 interpreter: str = 'python') -> str:
+    """解答と実行条件から、全ケースに共通のキーを作る
+    :param source_path: 解答のパス
+    :param settings: 結果に影響する実行条件 (実行方式、比較方法、制限など)
+    :param interpreter: テストで実行するインタプリタのコマンド
+    """
+    digest = hashlib.sha256()
+    _update_file_digest(digest, source_path)
+    digest.update(_interpreter_id(interpreter).encode())
+    digest.update(sys.platform.encode())
+    digest.update(json.dumps(settings, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def case_key(settings: str, input_path: str, output_path: str) -> str:
+    """テストケースごとのキーを作る
+    :param settings: settings_keyで作ったキー
+    """
+    digest = hashlib.sha256(settings.encode())
+    _update_file_digest(digest, input_path)
+    _update_file_digest(digest, output_path)
+    return digest.hexdigest()
+
+
+def make_entry(result: str, usage: Optional[tuple]) -> Entry:
+    return {'result': result, 'usage': list(usage) if usage else None,
+            'time': time.time()}
@@ -0,0 +1,511 @@
+import importlib
+import json
+import os
+import resource
+import runpy
+import select
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import weakref
+from array import array
+from contextlib import contextmanager
+from typing import (Any, BinaryIO, Dict, Iterable, List, NamedTuple, Optional,
+                    Sequence, Tuple)
+
+# 子プロセスの終了を待つ間に、出力の大きさを確認する間隔 [sec]
+POLL_INTERVAL = 0.01
+
+# メモリ制限付きで実行したスクリプトが、メモリの確保に失敗して終了したときの終了コード
+_MEMORY_ERROR_EXIT_CODE = 99
+
+# メモリ制限付きで実行するときに、インタプリタに渡すプログラム
+# スクリプトの実行前に自身のアドレス空間を制限し、MemoryErrorで終了した場合は専用の終了コードにする。
+# pycoderをimportできないインタプリタ(pypyなど)でも動くよう、標準ライブラリだけを使う。
+_MEMORY_LIMITED_MAIN = '''\
+import os, resource, runpy, sys, traceback
+limit = int(sys.argv[1])
+_, hard = resource.getrlimit(resource.RLIMIT_AS)
+if hard != resource.RLIM_INFINITY:
+    limit = min(limit, hard)
+try:
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+except (ValueError, OSError):
+    pass
+sys.argv = sys.argv[2:]
+sys.path[0] = os.path.dirname(os.path.abspath(sys.argv[0]))
+try:
+    runpy.run_path(sys.argv[0], run_name='__main__')
+except MemoryError:
+    traceback.print_exc()
+    sys.exit({})
+'''.format(_MEMORY_ERROR_EXIT_CODE)
+
+
+class Usage(NamedTuple):
+    """子プロセスが使用したリソース"""
+    wall_time: float  # 経過時間 [sec]
+    user_time: float  # ユーザーCPU時間 [sec]
+    sys_time: float  # システムCPU時間 [sec]
+    max_rss: int  # 最大常駐メモリ [KB]
+
+
+class RunResult(NamedTuple):
+    """スクリプトの実行結果"""
+    returncode: Optional[int]  # 制限時間を超えた場合はNone
+    output: bytes  # 標準出力と標準エラー出力をまとめたもの (出力先を指定した場合は空)
+    usage: Usage
+    output_limit_exceeded: bool = False
+    memory_limit_exceeded: bool = False
+
+    @property
+    def timed_out(self) -> bool:
+        return self.returncode is None
+
+
+@contextmanager
+def _output_file(output: Optional[BinaryIO]):
+    if output is not None:
+        yield output
+    else:
+        with tempfile.TemporaryFile() as f:
+            yield f
+
+
+def _read_output(out: BinaryIO, output: Optional[BinaryIO]) -> bytes:
+    if output is not None:
+        return b''
+    out.seek(0)
+    return out.read()
+
+
+class SubprocessRunner:
+    """テスト対象のスクリプトをケースごとに新しいpythonプロセスで実行する
+    """
+
+    def __init__(self, interpreter: str = 'python'):
+        """
+        :param interpreter: スクリプトを実行するインタプリタのコマンド (ex: 'pypy3')
+        """
+        self.interpreter = interpreter
+
+    def run(self, target_path: str, input_path: str, timeout: float,
+            args: Sequence[str] = (), output: BinaryIO = None,
+            output_limit: int = None, memory_limit: int = None) -> RunResult:
+        """スクリプトを実行する
+        入力はファイルをそのまま標準入力に渡し、出力はパイプを介さずファイルに直接書き出させる。
+        :param target_path: 実行するスクリプトのパス
+        :param input_path: 標準入力に渡すファイルのパス
+        :param timeout: 制限時間(秒)
+        :param args: スクリプトに渡すコマンドライン引数
+        :param output: 標準出力と標準エラー出力の書き出し先
+            (省略時は一時ファイルに書き出し、RunResult.outputとして返す)
+        :param output_limit: 出力の大きさの上限 [byte] (超えた場合はkillする)
+        :param memory_limit: メモリ使用量の上限 [byte]
+            (アドレス空間の大きさを制限し、超える確保は失敗させる)
+        :return 実行結果
+        """
+        command = [self.interpreter, target_path, *args]
+        if memory_limit is not None:
+            # スクリプトが動き出す前に、子プロセス自身でアドレス空間を制限する
+            # (スレッドから呼ばれるため、preexec_fnは使わない)
+            command = [self.interpreter, '-c', _MEMORY_LIMITED_MAIN,
+                       str(memory_limit), target_path, *args]
+
+        with _output_file(output) as out, open(input_path, 'rb') as f:
+            start = time.monotonic()
+            proc = subprocess.Popen(
+                command,
+                stdin=f,
+                stdout=out,
+                stderr=subprocess.STDOUT,
+                shell=False,
+            )
+            returncode, exceeded, usage = _collect(
+                proc.pid, out.fileno(), start, timeout, output_limit)
+            # wait4で回収済みのため、Popen側で再度waitしないようにする
+            proc.returncode = -signal.SIGKILL if returncode is None else returncode
+            memory_exceeded = _exceeds_memory(returncode, usage.max_rss,
+                                              memory_limit)
+            return RunResult(returncode, _read_output(out, output), usage,
+                             exceeded, memory_exceeded)
+
+
+class ForkRunner:
+    """モジュールを読み込み済みのプロセスから、ケースごとに子プロセスをforkして実行する
+    インタプリタの起動と重いモジュール(numpyなど)のimportをケースごとに行わずに済む。
+    fork が使えない環境(Windows)では利用できない。
+    子プロセスは親のメモリを引き継ぐため、max_rssには読み込み済みのモジュールの分も含まれる。
+    メモリ制限は、fork時点の親のメモリ使用量からの増分に対して適用する。
+
+    テストを並列に実行するスレッドから直接forkすると、他のスレッドが持っていたロック
+    (Cの拡張モジュールの内部のロックなど) が子プロセスで解放されないままになりうる。
+    そのため初期化時に1つのスレッドだけのプロセス (fork server) を作っておき、forkは常にそこで行う。
+    runは複数のスレッドから呼べる。
+    """
+
+    def __init__(self, preload: Iterable[str] = ()):
+        """
+        :param preload: fork前に読み込んでおくモジュール名 (ex: ['numpy', 'scipy'])
+        """
+        if not hasattr(os, 'fork'):
+            raise RuntimeError('fork runner is not supported on this platform.')
+        for module_name in preload:
+            importlib.import_module(module_name)
+        self._sock, server_sock = socket.socketpair()
+        self._lock = threading.Lock()
+        pid = os.fork()
+        if pid == 0:
+            self._sock.close()
+            _serve(server_sock)
+        server_sock.close()
+        # 使い終わったら (参照が無くなるか、終了時に) fork serverを止める
+        weakref.finalize(self, _stop_server, self._sock, pid)
+
+    def run(self, target_path: str, input_path: str, timeout: float,
+            args: Sequence[str] = (), output: BinaryIO = None,
+            output_limit: int = None, memory_limit: int = None) -> RunResult:
+        """SubprocessRunner.run と同じ
+        """
+        request = json.dumps({
+            'target_path': target_path, 'input_path': input_path,
+            'timeout': timeout, 'args': list(args),
+            'output_limit': output_limit, 'memory_limit': memory_limit,
+        }).encode()
+        with _output_file(output) as out:
+            # 結果は要求ごとの接続で受け取る
+            reply, server_reply = socket.socketpair()
+            with reply:
+                try:
+                    with self._lock:
+                        _send_message(self._sock, request,
+                                      [server_reply.fileno(), out.fileno()])
+                finally:
+                    server_reply.close()
+                data = _recv_all(reply)
+            if not data:
+                raise RuntimeError('fork server has stopped.')
+            result = json.loads(data.decode())
+            if 'error' in result:
+                raise RuntimeError(result['error'])
+            return RunResult(result['returncode'], _read_output(out, output),
+                             Usage(*result['usage']),
+                             result['output_limit_exceeded'],
+                             result['memory_limit_exceeded'])
+
+
+def _send_message(sock: socket.socket, data: bytes, fds: Sequence[int]):
+    """長さを付けたメッセージとファイルディスクリプタを送る"""
+    message = struct.pack('!I', len(data)) + data
+    sent = sock.sendmsg([message], [(socket.SOL_SOCKET, socket.SCM_RIGHTS,
+                                     array('i', fds))])
+    if sent < len(message):
+        sock.sendall(message[sent:])
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise EOFError
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def _recv_message(sock: socket.socket, max_fds: int = 2
+                  ) -> Optional[Tuple[bytes, List[int]]]:
+    """_send_messageで送ったメッセージを受け取る
+    :return メッセージ, ファイルディスクリプタ (接続が閉じられた場合はNone)
+    """
+    fds = array('i')
+    header, ancdata, _, _ = sock.recvmsg(
+        4, socket.CMSG_SPACE(max_fds * fds.itemsize))
+    if not header:
+        return None
+    for level, kind, data in ancdata:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            fds.frombytes(data[:len(data) - len(data) % fds.itemsize])
+    header += _recv_exactly(sock, 4 - len(header))
+    size, = struct.unpack('!I', header)
+    return _recv_exactly(sock, size), list(fds)
+
+
+def _recv_all(sock: socket.socket) -> bytes:
+    chunks = []
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk:
+            return b''.join(chunks)
+        chunks.append(chunk)
+
+
+def _serve(sock: socket.socket):
+    """fork server: 要求を受け取るたびにforkし、その子プロセスでスクリプトを実行して結果を返す
+    接続が閉じられたら終了する。この関数からは戻らない。
+    """
+    code = 0
+    try:
+        # Ctrl-Cは親プロセスが扱う (親が終了すれば接続が閉じられる)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        while True:
+            try:
+                message = _recv_message(sock)
+            except EOFError:
+                message = None
+            if message is None:
+                break
+            request, fds = message
+            if os.fork() == 0:
+                sock.close()
+                _handle_request(json.loads(request.decode()), *fds)
+            for fd in fds:
+                os.close(fd)
+            _reap_children()
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        os._exit(code)
+
+
+def _reap_children():
+    """終了した子プロセスを回収する"""
+    try:
+        while os.waitpid(-1, os.WNOHANG)[0] != 0:
+            pass
+    except ChildProcessError:
+        pass
+
+
+def _handle_request(request: Dict[str, Any], reply_fd: int, out_fd: int):
+    """fork serverからforkしたプロセスで、スクリプトをさらにforkして実行し、結果を返す
+    この関数からは戻らない。
+    """
+    code = 0
+    try:
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        address_space, baseline_rss = _memory_size()
+        memory_limit = request['memory_limit']
+        with open(request['input_path'], 'rb') as f:
+            start = time.monotonic()
+            pid = os.fork()
+            if pid == 0:
+                os.close(reply_fd)
+                if memory_limit is not None:
+                    _limit_address_space(address_space + memory_limit)
+                _exec_in_child(request['target_path'], request['args'],
+                               f.fileno(), out_fd,
+                               memory_limited=memory_limit is not None)
+            returncode, exceeded, usage = _collect(
+                pid, out_fd, start, request['timeout'],
+                request['output_limit'])
+        result: Dict[str, Any] = {
+            'returncode': returncode,
+            'usage': list(usage),
+            'output_limit_exceeded': exceeded,
+            'memory_limit_exceeded': _exceeds_memory(
+                returncode, usage.max_rss - baseline_rss, memory_limit),
+        }
+    except BaseException as e:
+        result = {'error': '{}: {}'.format(type(e).__name__, e)}
+        code = 1
+    try:
+        with open(reply_fd, 'wb') as f:
+            f.write(json.dumps(result).encode())
+    finally:
+        os._exit(code)
+
+
+def _stop_server(sock: socket.socket, pid: int):
+    # forkしたプロセスが接続を引き継いでいても閉じられるよう、shutdownする
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+    sock.close()
+    try:
+        os.waitpid(pid, 0)
+    except ChildProcessError:
+        pass
+
+
+def _exec_in_child(target_path: str, args: Sequence[str],
+                   stdin_fd: int, stdout_fd: int, memory_limited: bool = False):
+    """forkした子プロセスで標準入出力をつなぎ替えてスクリプトを実行する
+    この関数からは戻らない。
+    :param memory_limited: メモリ制限付きで実行しているか
+        (MemoryErrorで終了した場合に専用の終了コードにする)
+    """
+    code = 0
+    try:
+        os.dup2(stdin_fd, 0)
+        os.dup2(stdout_fd, 1)
+        os.dup2(stdout_fd, 2)
+        sys.stdin = sys.__stdin__ = open(0, 'r', closefd=False)
+        sys.stdout = sys.__stdout__ = open(1, 'w', closefd=False)
+        sys.stderr = sys.__stderr__ = open(2, 'w', closefd=False)
+        sys.argv = [target_path, *args]
+        sys.path.insert(0, os.path.dirname(os.path.abspath(target_path)))
+        runpy.run_path(target_path, run_name='__main__')
+    except SystemExit as e:
+        if e.code is None:
+            code = 0
+        elif isinstance(e.code, int):
+            code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except MemoryError:
+        traceback.print_exc()
+        code = _MEMORY_ERROR_EXIT_CODE if memory_limited else 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+
+class _ExitWaiter:
+    """子プロセスの終了を待つ
+    Linuxではpidfdで終了を待ち、それ以外では短い間隔でsleepする。
+    """
+
+    def __init__(self, pid: int):
+        self.pidfd = None
+        self.delay = 0.0005
+        if hasattr(os, 'pidfd_open'):
+            try:
+                self.pidfd = os.pidfd_open(pid)
+            except OSError:
+                pass
+
+    def wait(self, timeout: float):
+        if timeout <= 0:
+            return
+        if self.pidfd is not None:
+            select.select([self.pidfd], [], [], timeout)
+        else:
+            time.sleep(min(timeout, self.delay))
+            self.delay = min(self.delay * 2, POLL_INTERVAL)
+
+    def close(self):
+        if self.pidfd is not None:
+            os.close(self.pidfd)
+
+
+def _collect(pid: int, out_fd: int, start: float, timeout: float,
+             output_limit: Optional[int]) -> Tuple[Optional[int], bool, Usage]:
+    """子プロセスの終了を待ち、リソース使用量を集める
+    制限時間を超えた場合、または出力が上限を超えた場合は子プロセスをkillする。
+    :return 終了コード(制限時間を超えた場合はNone), 出力が上限を超えたかどうか, リソース使用量
+    """
+    deadline = start + timeout
+    waiter = _ExitWaiter(pid)
+    try:
+        while True:
+            waited_pid, status, rusage = os.wait4(pid, os.WNOHANG)
+            if waited_pid == pid:
+                returncode: Optional[int] = _exit_code(status)
+                break
+            now = time.monotonic()
+            timed_out = now >= deadline
+            if timed_out or _exceeds(out_fd, output_limit):
+                os.kill(pid, signal.SIGKILL)
+                _, status, rusage = os.wait4(pid, 0)
+                returncode = None if timed_out else _exit_code(status)
+                break
+            waiter.wait(min(deadline - now, POLL_INTERVAL))
+    finally:
+        waiter.close()
+    wall_time = time.monotonic() - start
+    exceeded = _exceeds(out_fd, output_limit)
+    return returncode, exceeded, _to_usage(wall_time, rusage)
+
+
+def _exceeds(out_fd: int, output_limit: Optional[int]) -> bool:
+    return output_limit is not None and os.fstat(out_fd).st_size > output_limit
+
+
+def _limit_address_space(memory_limit: int):
+    """自プロセスのアドレス空間の大きさを制限する
+    :param memory_limit: 上限 [byte]
+    """
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        memory_limit = min(memory_limit, hard)
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, hard))
+    except (ValueError, OSError):
+        # 制限できない環境では、max_rssによる判定だけを行う
+        pass
+
+
+def _memory_size() -> Tuple[int, int]:
+    """自プロセスのアドレス空間の大きさ [byte] と常駐メモリ [KB]
+    /proc が無い環境では (0, 0)
+    """
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            size, resident = f.read().split()[:2]
+    except OSError:
+        return 0, 0
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    return int(size) * page_size, int(resident) * page_size // 1024
+
+
+def _exceeds_memory(returncode: Optional[int], max_rss: int,
+                    memory_limit: Optional[int]) -> bool:
+    """メモリ制限を超えたかどうか
+    最大常駐メモリが上限を超えた場合と、アドレス空間の制限によってメモリの確保に失敗した場合
+    (専用の終了コードで終了した場合)
+    :param max_rss: 最大常駐メモリ [KB]
+    """
+    if memory_limit is None:
+        return False
+    return (max_rss * 1024 > memory_limit
+            or returncode == _MEMORY_ERROR_EXIT_CODE)
+
+
+def _exit_code(status: int) -> int:
+    """waitの終了ステータスをsubprocessと同じ形式の終了コードに変換する
+    """
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def _to_usage(wall_time: float, rusage) -> Usage:
+    max_rss = rusage.ru_maxrss
+    if sys.platform == 'darwin':
+        # macOSではバイト単位
+        max_rss //= 1024
+    return Usage(wall_time, rusage.ru_utime, rusage.ru_stime, max_rss)
+
+
+def create_runner(runner: str = 'subprocess', preload: Optional[Iterable[str]] = None,
+                  interpreter: str = 'python'):
+    """名前からテスト実行方式を選ぶ
+    :param runner: 'subprocess' または 'fork'
+    :param preload: forkの場合に事前に読み込むモジュール
+    :param interpreter: subprocessの場合に使うインタプリタのコマンド
+        (forkの場合は実行中のインタプリタを使うため、'python'のみ)
+    """
+    if runner == 'subprocess':
+        return SubprocessRunner(interpreter)
+    if runner == 'fork':
+        if interpreter != 'python':
+            raise ValueError('fork runner cannot use {}.'.format(interpreter))
+        return ForkRunner(preload or ())
+    raise ValueError('Unknown runner: {}'.format(runner))
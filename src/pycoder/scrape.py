@@ -1,12 +1,63 @@
-from typing import Dict, Mapping, NamedTuple, NewType, Optional, cast
-from requests import Session
-from bs4 import BeautifulSoup as bs
-from .auth import auth
+from __future__ import annotations
+
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import (TYPE_CHECKING, Callable, Dict, List, Mapping, NamedTuple,
+                    NewType, Optional, Protocol, Tuple, Union, cast)
+from .auth import auth, SESSION_POOL_SIZE
+from . import htmlscan
+
+# requestsの読み込みには時間がかかるため、実際に取得する際に読み込む
+if TYPE_CHECKING:
+    from requests import Session
 
 
 ATCODER_URL = 'https://atcoder.jp'
 CONTEST_URL = 'https://atcoder.jp/contests/'
 
+# 問題ページを同時に取得する最大数
+MAX_CONCURRENT_FETCHES = SESSION_POOL_SIZE
+
+# 複数のコンテストをまとめて取得する際の、1秒あたりのリクエスト数の上限
+REQUESTS_PER_SECOND = 4.0
+
+# 問題ページ冒頭の '実行時間制限: 2 sec / メモリ制限: 1024 MB'
+_LIMITS = re.compile(
+    r'(?:実行時間制限|Time Limit)\s*:\s*([\d.]+)\s*sec\s*/\s*'
+    r'(?:メモリ制限|Memory Limit)\s*:\s*(\d+)\s*([KMG])i?B')
+_MEMORY_UNITS = {'K': 1 / 1024, 'M': 1, 'G': 1024}
+
+# コンテストページの開始・終了時刻 (最初のものが開始時刻)
+# <time class='fixtime-full'>2025-04-05 21:00:00+0900</time>
+_FIXTIME = re.compile(
+    r"""<time class=['"][^'"]*fixtime-full[^'"]*['"]>\s*"""
+    r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}[+-]\d{4})\s*</time>')
+
+# コンテスト開始の何秒前に、取得に使う接続を確立しておくか
+# (keep-aliveの接続が切られない程度に短くする)
+WARMUP_BEFORE_START = 10.0
+
+# 開始までの残り時間がこれより短い場合は、接続を確立しておくのを省く [sec]
+# (確立を待つ分だけ、問題の取得が遅れるため)
+WARMUP_MIN_WAIT = 1.0
+
+# 開始後、問題一覧ページが見えるまでの確認の間隔 [sec]
+# 見えない間は間隔を延ばし、他の参加者と確認が揃わないよう揺らぎを加える
+START_POLL_MIN = 0.2
+START_POLL_MAX = 3.0
+
+# 開始後、問題一覧ページが見えるまで待つ時間の上限 [sec]
+START_POLL_TIMEOUT = 300.0
+
+# サーバーとの時刻のずれがこれより大きい場合だけ補正する [sec]
+# (Dateヘッダーは秒単位のため、小さいずれは測れない)
+CLOCK_SKEW_THRESHOLD = 2.0
+
 
 ContestTasksPage = NewType('ContestTasksPage', str)
 ProbPaths = NewType('ProbPaths', Dict[str, str])
@@ -21,6 +72,55 @@ class TestCase(NamedTuple):
 SampleTestCases = NewType('SampleTestCases', Dict[int, Optional[TestCase]])
 
 
+class ProblemSpec(NamedTuple):
+    constraints: List[str]  # 制約の各項目 (ex: '1 \\leq N \\leq 2 \\times 10^5')
+    input_format: Optional[str]  # 入力形式 (ex: 'N\nA_1 A_2 \\ldots A_N\n')
+    output_description: str = ''  # 出力欄の説明文
+    time_limit: Optional[float] = None  # 実行時間制限 [sec]
+    memory_limit: Optional[int] = None  # メモリ制限 [MB]
+
+
+class Problem(NamedTuple):
+    sample_test_cases: SampleTestCases
+    spec: ProblemSpec
+
+
+class Contest(NamedTuple):
+    prob_paths: ProbPaths
+    problems: Dict[str, Problem]
+
+
+class RateLimiter:
+    """リクエストの頻度を制限する (トークンバケット)
+    burst回までは続けて送り、それ以降は1秒あたりrate回に抑える。複数スレッドから使える。
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        :param rate: 1秒あたりのリクエスト数の上限
+        :param burst: 続けて送れるリクエスト数
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """次のリクエストを送れるまで待つ
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst,
+                              self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # 足りない分は先に予約し (負の値になる)、溜まるまで待つ
+            self.tokens -= 1
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if delay > 0:
+            time.sleep(delay)
+
+
 def _get_tasks_url(contest: str) -> str:
     return CONTEST_URL + contest + '/tasks'
 
@@ -42,13 +142,8 @@ def extract_prob_paths(html: ContestTasksPage) -> ProbPaths:
     :param html 問題一覧ページ
     :return prob_paths 各問題のパス
     """
-    soup = bs(html, 'html5lib')
-    prob_paths = cast(ProbPaths, {})
-    for tr in soup.find('tbody').find_all('tr'):
-        item = tr.find('td').find('a')
-        p_type = item.contents[0].lower()
-        link = item.get('href')  # ex: /contests/abc160/tasks/abc160_a
-        prob_paths[p_type] = link
+    # ex: {'a': '/contests/abc160/tasks/abc160_a', ...}
+    prob_paths = cast(ProbPaths, htmlscan.scan_prob_paths(html))
     return prob_paths
 
 
@@ -84,26 +179,10 @@ def extract_sample_test_cases_from_prob_page(html: str) -> SampleTestCases:
     :return 問題ページのサンプルテストケース.
         {0: (入力例1, 出力例1), 1: (入力例2, 出力例2), ...}といった形式の辞書で返す.
     """
-    soup = bs(html, 'html5lib')
-
-    # 英語ページを除外（日本語ページのサンプルケースと重複して取得してしまうのを防ぐため）
-    while soup.find('span', class_='lang-en'):
-        soup.find('span', class_='lang-en').extract()
-
-    # 入出力の形式欄を除外
-    while soup.find('div', class_='io-style'):
-        soup.find('div', class_='io-style').extract()
-
-    io_samples = []
-    for sec in soup.find_all('section'):
-        if sec.find('h3').get_text() == '問題文':
-            continue
-        # section内の先頭以外のpreは'間違いの例'などサンプルケースでないことがあるため、
-        # 先頭のpreのみを取得する
-        pre = sec.find('pre')
-        if pre is None:
-            continue
-        io_samples.append(pre.get_text())
+    # 英語ページ(日本語ページのサンプルケースと重複するため)と入出力の形式欄を除外し、
+    # '問題文'以外の各sectionの先頭のpreを取得する
+    # (section内の先頭以外のpreは'間違いの例'などサンプルケースでないことがある)
+    io_samples = htmlscan.scan_sample_io(html)
 
     sample_test_cases = cast(SampleTestCases, {})
     for i in range(0, len(io_samples), 2):
@@ -116,13 +195,326 @@ def extract_sample_test_cases_from_prob_page(html: str) -> SampleTestCases:
     return sample_test_cases
 
 
+def extract_limits_from_prob_page(html: str) -> Tuple[Optional[float], Optional[int]]:
+    """問題ページから実行時間制限とメモリ制限を抽出する.
+    :param html 問題ページ
+    :return 実行時間制限 [sec], メモリ制限 [MB] (記載が無い場合はNone)
+    """
+    m = _LIMITS.search(html)
+    if m is None:
+        return None, None
+    time_limit = float(m.group(1))
+    memory_limit = int(int(m.group(2)) * _MEMORY_UNITS[m.group(3)])
+    return time_limit, memory_limit
+
+
+def extract_problem_spec_from_prob_page(html: str) -> ProblemSpec:
+    """問題ページから制約、入力形式、出力欄の説明文、実行時間・メモリ制限を抽出する.
+    :param html 問題ページ
+    :return 制約、入力形式、出力欄の説明文、実行時間・メモリ制限
+    """
+    constraints, input_format, output_description = \
+        htmlscan.scan_problem_spec(html)
+    time_limit, memory_limit = extract_limits_from_prob_page(html)
+    return ProblemSpec(constraints, input_format, output_description,
+                       time_limit, memory_limit)
+
+
+def parse_problem(html: str) -> Problem:
+    """問題ページからサンプルテストケースと制約・入力形式などを抽出する.
+    :param html 問題ページ
+    """
+    return Problem(extract_sample_test_cases_from_prob_page(html),
+                   extract_problem_spec_from_prob_page(html))
+
+
+class PageCache(Protocol):
+    """取得済みのページを保存しておき、次回からはリクエストせずに返す (archive.PageArchive)
+    """
+
+    def get(self, url: str) -> Optional[str]:
+        ...
+
+    def put(self, url: str, html: str, headers: Mapping[str, str]) -> None:
+        ...
+
+    def revalidation_headers(self, url: str) -> Optional[Dict[str, str]]:
+        """保存済みのページを取得し直す際に付けるヘッダ
+        (Noneの場合は取得し直さずに保存したページを使う)
+        """
+        ...
+
+    def forget(self, url: str) -> None:
+        ...
+
+
+def _get_page(session: Session, url: str, limiter: RateLimiter = None,
+              pages: PageCache = None) -> str:
+    """ページのhtmlを取得する (pagesに保存済みであれば、リクエストしない)
+    pagesが取得し直すよう指定した場合は、If-None-Match / If-Modified-Since を付けて
+    リクエストし、変わっていなければ (304 Not Modified) 保存したページを使う。
+    """
+    headers: Optional[Dict[str, str]] = None
+    html = None
+    if pages is not None:
+        html = pages.get(url)
+        if html is not None:
+            headers = pages.revalidation_headers(url)
+            if headers is None:
+                return html
+    if limiter is not None:
+        limiter.acquire()
+    res = session.get(url, headers=headers) if headers else session.get(url)
+    if html is not None and getattr(res, 'status_code', None) == 304:
+        return html
+    # 取得し直したページが無くなっていたら、保存したページも使わないようにする
+    if (pages is not None and html is not None
+            and getattr(res, 'status_code', None) == 404):
+        pages.forget(url)
+    # エラーページは保存しない
+    if pages is not None and res.ok:
+        pages.put(url, res.text, getattr(res, 'headers', {}))
+    return res.text
+
+
+def _fetch_problem(session: Session, prob_url: str,
+                   limiter: RateLimiter = None,
+                   pages: PageCache = None) -> Problem:
+    return parse_problem(_get_page(session, prob_url, limiter, pages))
+
+
+def _ensure_pool_size(session: Session, workers: int):
+    """同時接続数分のkeep-alive接続を使い回せるようにする
+    共有セッションの接続数で足りる場合は、確立済みの接続を捨てないようそのまま使う。
+    """
+    if workers > SESSION_POOL_SIZE:
+        from requests.adapters import HTTPAdapter
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        session.mount(ATCODER_URL, adapter)
+
+
+def _fetch_problems(session: Session, prob_urls: ProbUrls,
+                    max_workers: int) -> Dict[str, Problem]:
+    if not prob_urls:
+        return {}
+    workers = min(max_workers, len(prob_urls))
+    _ensure_pool_size(session, workers)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            prob_type: executor.submit(_fetch_problem, session, prob_url)
+            for prob_type, prob_url in prob_urls.items()
+        }
+        problems = {
+            prob_type: future.result() for prob_type, future in futures.items()
+        }
+    return problems
+
+
+@auth
+def fetch_sample_test_cases(session_logined: Session, prob_urls: ProbUrls,
+                            max_workers: int = MAX_CONCURRENT_FETCHES):
+    """各問題ページを並行に取得し、サンプルテストケースを抽出する.
+    :param prob_urls 各問題のurl
+    :param max_workers 同時に取得する問題ページの最大数
+    :return 問題ごとのサンプルテストケース (prob_urlsと同じ順序)
+    """
+    problems = _fetch_problems(session_logined, prob_urls, max_workers)
+    return {prob_type: problem.sample_test_cases
+            for prob_type, problem in problems.items()}
+
+
+def _fetch_prob_paths(session: Session, contest: str,
+                      limiter: RateLimiter = None,
+                      pages: PageCache = None) -> ProbPaths:
+    html = _get_page(session, _get_tasks_url(contest), limiter, pages)
+    return extract_prob_paths(cast(ContestTasksPage, html))
+
+
+ContestCallback = Callable[[str, Union[Contest, Exception]], None]
+
+
 @auth
-def fetch_sample_test_cases(session_logined: Session, prob_urls: ProbUrls):
+def fetch_contests(session_logined: Session, contests: List[str],
+                   callback: ContestCallback,
+                   max_workers: int = MAX_CONCURRENT_FETCHES,
+                   requests_per_second: float = REQUESTS_PER_SECOND,
+                   pages: PageCache = None) -> None:
+    """複数のコンテストの問題一覧ページと問題ページを、1つのセッションで並行に取得する.
+    同時に取得するページ数をmax_workers、リクエストの頻度をrequests_per_secondまでに抑える。
+    同時に扱うコンテストもmax_workersまでとし、先に指定したコンテストから順に揃うようにする。
+    :param contests コンテストの名前 (ex: ['abc300', 'abc301'])
+    :param callback コンテストの全ページを取得し終えるたびに、呼び出したスレッドで
+        callback(コンテスト名, Contest) を呼ぶ。取得に失敗した場合は例外を渡す。
+    :param max_workers 同時に取得するページの最大数
+    :param requests_per_second 1秒あたりのリクエスト数の上限
+    :param pages 取得したページの保存先 (保存済みのページはリクエストせずに使う)
+    """
+    if not contests:
+        return
+    limiter = RateLimiter(requests_per_second, burst=max_workers)
+    _ensure_pool_size(session_logined, max_workers)
+
+    queue = list(reversed(contests))
+    # future -> (コンテスト名, 問題 (問題一覧ページの場合はNone))
+    futures: Dict = {}
+    fetching: Dict[str, Tuple[ProbPaths, Dict[str, Problem]]] = {}
+    failed = set()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def start_next_contest():
+            if queue:
+                contest = queue.pop()
+                future = executor.submit(_fetch_prob_paths, session_logined,
+                                         contest, limiter, pages)
+                futures[future] = (contest, None)
+
+        for _ in range(max_workers):
+            start_next_contest()
+
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                contest, prob_type = futures.pop(future)
+                if contest in failed:
+                    continue
+                try:
+                    result = future.result()
+                except Exception as e:
+                    failed.add(contest)
+                    fetching.pop(contest, None)
+                    callback(contest, e)
+                    start_next_contest()
+                    continue
+
+                if prob_type is None:
+                    prob_paths = result
+                    fetching[contest] = (prob_paths, {})
+                    for p, prob_url in prob_paths_to_urls(prob_paths).items():
+                        f = executor.submit(_fetch_problem, session_logined,
+                                            prob_url, limiter, pages)
+                        futures[f] = (contest, p)
+                else:
+                    prob_paths, problems = fetching[contest]
+                    problems[prob_type] = result
+
+                prob_paths, problems = fetching[contest]
+                if len(problems) == len(prob_paths):
+                    del fetching[contest]
+                    # 問題一覧ページと同じ順序にする
+                    ordered = {p: problems[p] for p in prob_paths}
+                    callback(contest, Contest(prob_paths, ordered))
+                    start_next_contest()
+
+
+def extract_start_time(html: str) -> Optional[datetime]:
+    """コンテストページから開始時刻を抽出する.
+    :param html コンテストのトップページ
+    :return 開始時刻 (タイムゾーン付き、記載が無い場合はNone)
+    """
+    m = _FIXTIME.search(html)
+    if m is None:
+        return None
+    return datetime.strptime(m.group(1), '%Y-%m-%d %H:%M:%S%z')
+
+
+def _clock_offset(res) -> float:
+    """レスポンスのDateヘッダーから、サーバーの時刻と手元の時刻の差を求める
+    :return サーバーの時刻 - 手元の時刻 [sec] (ずれが小さい、または分からない場合は0)
+    """
+    date = getattr(res, 'headers', {}).get('Date')
+    if not date:
+        return 0.0
+    try:
+        offset = parsedate_to_datetime(date).timestamp() - time.time()
+    except (TypeError, ValueError):
+        return 0.0
+    return offset if abs(offset) > CLOCK_SKEW_THRESHOLD else 0.0
+
+
+def sleep_until(target: datetime, clock_offset: float = 0.0,
+                progress: Callable[[float], None] = None) -> None:
+    """指定した時刻まで待つ
+    待ち始めた時点で単調増加の時計の時刻に換算し、待つ間の時刻の補正の影響を受けないようにする。
+    :param clock_offset サーバーの時刻 - 手元の時刻 [sec]
+    :param progress 長く待つ間、残り時間 [sec] を渡して定期的に呼ぶ
     """
+    remaining = target.timestamp() - (time.time() + clock_offset)
+    deadline = time.monotonic() + remaining
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        if remaining > 60:
+            if progress is not None:
+                progress(remaining)
+            # 次の表示は残り時間が分単位で切りのいいところで行う
+            time.sleep(remaining % 60 or 60)
+        else:
+            time.sleep(remaining)
+
+
+def next_poll_delay(attempt: int) -> float:
+    """問題一覧ページを確認し直すまでの時間 [sec]
+    :param attempt 確認した回数 (0から)
+    """
+    delay = min(START_POLL_MIN * 2 ** attempt, START_POLL_MAX)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _warm_up(session: Session, contest: str, workers: int):
+    """取得に使う数だけ、keep-aliveの接続を確立しておく
     """
-    contest_sample_test_cases = {}
-    for prob_type, prob_url in prob_urls.items():
-        res = session_logined.get(prob_url)
-        sample_test_cases = extract_sample_test_cases_from_prob_page(res.text)
-        contest_sample_test_cases[prob_type] = sample_test_cases
-    return contest_sample_test_cases
+    _ensure_pool_size(session, workers)
+    url = CONTEST_URL + contest
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for future in [executor.submit(session.get, url)
+                       for _ in range(workers)]:
+            try:
+                future.result()
+            except OSError:
+                pass
+
+
+@auth
+def fetch_contest_at_start(session_logined: Session, contest: str,
+                           max_workers: int = MAX_CONCURRENT_FETCHES,
+                           progress: Callable[[float], None] = None) -> Contest:
+    """コンテストの開始を待ち、問題一覧ページが見えたらすぐに全問題ページを取得する.
+    開始の少し前に接続を確立しておき、開始時刻からは間隔を延ばしながら問題一覧ページを確認する。
+    開始済みのコンテストはすぐに取得する。
+    :param contest コンテストの名前 (ex: 'abc400')
+    :param max_workers 同時に取得する問題ページの最大数
+    :param progress 開始を待つ間、残り時間 [sec] を渡して定期的に呼ぶ
+    :return コンテストの情報
+    :raise ValueError コンテストページに開始時刻が無い場合
+    :raise TimeoutError 開始後、START_POLL_TIMEOUT 秒待っても問題一覧ページが見えない場合
+    """
+    res = session_logined.get(CONTEST_URL + contest)
+    start = extract_start_time(res.text)
+    if start is None:
+        raise ValueError('Start time of {} is not found.'.format(contest))
+    offset = _clock_offset(res)
+    if start.timestamp() - (time.time() + offset) >= WARMUP_MIN_WAIT:
+        warm_up_at = datetime.fromtimestamp(
+            start.timestamp() - WARMUP_BEFORE_START, timezone.utc)
+        sleep_until(warm_up_at, offset, progress)
+        _warm_up(session_logined, contest, max_workers)
+    sleep_until(start, offset)
+
+    deadline = time.monotonic() + START_POLL_TIMEOUT
+    attempt = 0
+    while True:
+        try:
+            prob_paths = _fetch_prob_paths(session_logined, contest)
+        except OSError:
+            prob_paths = cast(ProbPaths, {})
+        if prob_paths:
+            break
+        if time.monotonic() >= deadline:
+            raise TimeoutError('Tasks of {} are not visible.'.format(contest))
+        time.sleep(next_poll_delay(attempt))
+        attempt += 1
+    problems = _fetch_problems(session_logined,
+                               prob_paths_to_urls(prob_paths), max_workers)
+    return Contest(prob_paths, problems)
@@ -0,0 +1,322 @@
+"""コンテスト・問題・サンプルケースを保存するローカルのデータベース (SQLite).
+
+atcoder/pycoder.db に、問題ごとのメタデータ (task_screen_name、制約、制限など) と
+サンプルケースを保存する。(コンテスト, 問題) を主キーとするため、問題のケースの取得は
+1回の索引付きの問い合わせで済む。
+各問題の tests/<ケース名>/in.txt, out.txt は、ここから書き出したもの (export_cases)。
+オフライン用に保存したページ (archive) の索引と、テストの実行時間の履歴 (history) も持つ。
+"""
+import json
+import os
+import sqlite3
+import time
+import zlib
+from contextlib import closing, contextmanager
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# atcoderディレクトリ直下に置く、データベースのファイル名
+STORE_FILE_NAME = 'pycoder.db'
+
+# この大きさ以上の入出力は圧縮して保存する [byte]
+COMPRESS_THRESHOLD = 4096
+
+# ケースごとに残す実行履歴の数 (古いものから捨てる)
+MAX_RUNS_PER_CASE = 200
+
+_SCHEMA_VERSION = 4
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS contests (
+    contest TEXT PRIMARY KEY,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS tasks (
+    contest TEXT NOT NULL,
+    task TEXT NOT NULL,
+    info TEXT NOT NULL,
+    PRIMARY KEY (contest, task)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS cases (
+    contest TEXT NOT NULL,
+    task TEXT NOT NULL,
+    name TEXT NOT NULL,
+    input BLOB NOT NULL,
+    output BLOB,
+    compressed INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (contest, task, name)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS pages (
+    key TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS page_validators (
+    key TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS runs (
+    contest TEXT NOT NULL,
+    task TEXT NOT NULL,
+    name TEXT NOT NULL,
+    interpreter TEXT NOT NULL,
+    solution TEXT NOT NULL,
+    result TEXT NOT NULL,
+    wall_time REAL NOT NULL,
+    max_rss INTEGER NOT NULL,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_by_case
+    ON runs (contest, task, name, interpreter, recorded_at);
+'''
+
+TaskInfo = Dict[str, Dict[str, Any]]
+
+
+class Case(NamedTuple):
+    name: str  # ケース名 (ex: '1')
+    input: bytes
+    output: Optional[bytes]  # 期待する出力が無い場合はNone
+
+
+class Run(NamedTuple):
+    """テストケースを1回実行した記録"""
+    name: str  # ケース名
+    interpreter: str  # ex: 'python'
+    solution: str  # 解答のハッシュ値
+    result: str  # 判定結果 (ex: 'OK')
+    wall_time: float  # 経過時間 [sec]
+    max_rss: int  # 最大常駐メモリ [KB]
+    recorded_at: float  # 実行した時刻 (UNIX時間)
+
+
+def locate(contest_dir: str) -> Tuple[str, str]:
+    """コンテストのディレクトリから、データベースのパスとコンテスト名を求める
+    :param contest_dir: コンテストのディレクトリ (ex: './atcoder/contests/abc160/')
+    :return データベースのパス (ex: './atcoder/pycoder.db'), コンテスト名 (ex: 'abc160')
+    """
+    contest_dir = os.path.normpath(contest_dir)
+    atcoder_dir = os.path.dirname(os.path.dirname(contest_dir))
+    return (os.path.join(atcoder_dir, STORE_FILE_NAME),
+            os.path.basename(contest_dir))
+
+
+def _store_path(atcoder_dir: str) -> str:
+    return os.path.join(atcoder_dir, STORE_FILE_NAME)
+
+
+@contextmanager
+def _connect(store_path: str, create: bool = True):
+    """データベースに接続し、ブロックを抜ける際にコミットする
+    :param create: データベースが無い場合に作るかどうか (Falseの場合はNoneを返す)
+    """
+    if not os.path.exists(store_path):
+        if not create:
+            yield None
+            return
+        os.makedirs(os.path.dirname(store_path) or '.', exist_ok=True)
+    with closing(sqlite3.connect(store_path, timeout=30)) as conn:
+        if conn.execute('PRAGMA user_version').fetchone()[0] < _SCHEMA_VERSION:
+            conn.executescript(_SCHEMA)
+            conn.execute('PRAGMA user_version = {}'.format(_SCHEMA_VERSION))
+        with conn:
+            yield conn
+
+
+def _pack(data: Optional[bytes]) -> Tuple[Optional[bytes], bool]:
+    if data is None or len(data) < COMPRESS_THRESHOLD:
+        return data, False
+    return zlib.compress(data), True
+
+
+def _unpack(data: Optional[bytes], compressed: bool) -> Optional[bytes]:
+    if data is None or not compressed:
+        return data
+    return zlib.decompress(data)
+
+
+def save_task_info(contest_dir: str, task_info: TaskInfo) -> None:
+    """問題ごとのメタデータを保存する (保存済みの問題は置き換える)
+    :param task_info: {'a': {'screen_name': 'abc160_a', ...}, ...}
+    """
+    store_path, contest = locate(contest_dir)
+    with _connect(store_path) as conn:
+        conn.execute('INSERT OR REPLACE INTO contests VALUES (?, ?)',
+                     (contest, time.time()))
+        conn.executemany(
+            'INSERT OR REPLACE INTO tasks VALUES (?, ?, ?)',
+            [(contest, task, json.dumps(info, sort_keys=True))
+             for task, info in task_info.items()])
+
+
+def load_task_info(contest_dir: str) -> Optional[TaskInfo]:
+    """保存した問題ごとのメタデータを読み込む
+    :return メタデータ (コンテストが保存されていない場合はNone)
+    """
+    store_path, contest = locate(contest_dir)
+    with _connect(store_path, create=False) as conn:
+        if conn is None:
+            return None
+        rows = conn.execute(
+            'SELECT task, info FROM tasks WHERE contest = ? ORDER BY task',
+            (contest,)).fetchall()
+    if not rows:
+        return None
+    return {task: json.loads(info) for task, info in rows}
+
+
+def save_cases(contest_dir: str, task: str, cases: Iterable[Case]) -> None:
+    """問題のケースを保存する (同じ名前のケースは置き換える)
+    """
+    store_path, contest = locate(contest_dir)
+    rows = []
+    for case in cases:
+        input_data, input_compressed = _pack(case.input)
+        output_data, output_compressed = _pack(case.output)
+        # 入力と出力のどちらを圧縮したかをビットで持つ
+        flags = int(input_compressed) | int(output_compressed) << 1
+        rows.append((contest, task, case.name, input_data, output_data, flags))
+    with _connect(store_path) as conn:
+        conn.executemany('INSERT OR REPLACE INTO cases VALUES (?, ?, ?, ?, ?, ?)',
+                         rows)
+
+
+def load_cases(contest_dir: str, task: str) -> List[Case]:
+    """問題のケースを読み込む
+    :return ケース (ケース名の順)
+    """
+    store_path, contest = locate(contest_dir)
+    with _connect(store_path, create=False) as conn:
+        if conn is None:
+            return []
+        rows = conn.execute(
+            'SELECT name, input, output, compressed FROM cases '
+            'WHERE contest = ? AND task = ? ORDER BY name',
+            (contest, task)).fetchall()
+    return [Case(name, _unpack(input_data, bool(flags & 1)),
+                 _unpack(output_data, bool(flags & 2)))
+            for name, input_data, output_data, flags in rows]
+
+
+def export_cases(contest_dir: str, task: str) -> List[str]:
+    """保存したケースを tests/<ケース名>/in.txt, out.txt に書き出す
+    既に書き出したケースは、内容が変わったファイルだけを書き換える。
+    :return 書き出したケース名
+    """
+    tests_dir = os.path.join(contest_dir, task, 'tests')
+    case_names = []
+    for case in load_cases(contest_dir, task):
+        case_dir = os.path.join(tests_dir, case.name)
+        os.makedirs(case_dir, exist_ok=True)
+        write_if_changed(os.path.join(case_dir, 'in.txt'), case.input)
+        if case.output is not None:
+            write_if_changed(os.path.join(case_dir, 'out.txt'), case.output)
+        case_names.append(case.name)
+    return case_names
+
+
+def write_if_changed(path: str, data: bytes) -> bool:
+    """内容が変わる場合だけファイルに書き込む
+    途中で中断しても壊れたファイルが残らないよう、一時ファイルに書いてから置き換える。
+    :return 書き込んだかどうか
+    """
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+    except FileNotFoundError:
+        pass
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return True
+
+
+def save_page(atcoder_dir: str, key: str, digest: str, etag: str = None,
+              last_modified: str = None) -> None:
+    """保存したページの索引を記録する
+    :param key: ページのキー (ex: 'task/abc160_a')
+    :param digest: ページの内容のハッシュ値
+    :param etag: レスポンスの ETag ヘッダ (条件付きで取得し直す際に使う)
+    :param last_modified: レスポンスの Last-Modified ヘッダ
+    """
+    with _connect(_store_path(atcoder_dir)) as conn:
+        conn.execute('INSERT OR REPLACE INTO pages VALUES (?, ?, ?)',
+                     (key, digest, time.time()))
+        if etag is None and last_modified is None:
+            conn.execute('DELETE FROM page_validators WHERE key = ?', (key,))
+        else:
+            conn.execute('INSERT OR REPLACE INTO page_validators '
+                         'VALUES (?, ?, ?)', (key, etag, last_modified))
+
+
+def load_page_digest(atcoder_dir: str, key: str) -> Optional[str]:
+    """保存したページのハッシュ値を返す (保存されていない場合はNone)
+    """
+    with _connect(_store_path(atcoder_dir), create=False) as conn:
+        if conn is None:
+            return None
+        row = conn.execute('SELECT digest FROM pages WHERE key = ?',
+                           (key,)).fetchone()
+    return row[0] if row else None
+
+
+def load_page_validators(atcoder_dir: str, key: str
+                         ) -> Tuple[Optional[str], Optional[str]]:
+    """保存したページの ETag, Last-Modified を返す (記録されていない場合はNone)
+    """
+    with _connect(_store_path(atcoder_dir), create=False) as conn:
+        if conn is None:
+            return None, None
+        row = conn.execute('SELECT etag, last_modified FROM page_validators '
+                           'WHERE key = ?', (key,)).fetchone()
+    return (row[0], row[1]) if row else (None, None)
+
+
+def delete_page(atcoder_dir: str, key: str) -> None:
+    with _connect(_store_path(atcoder_dir), create=False) as conn:
+        if conn is not None:
+            conn.execute('DELETE FROM pages WHERE key = ?', (key,))
+            conn.execute('DELETE FROM page_validators WHERE key = ?', (key,))
+
+
+def save_runs(contest_dir: str, task: str, runs: Iterable[Run]) -> None:
+    """テストケースの実行記録を加える
+    ケースごとに新しいものから MAX_RUNS_PER_CASE 件だけ残す。
+    """
+    runs = list(runs)
+    if not runs:
+        return
+    store_path, contest = locate(contest_dir)
+    with _connect(store_path) as conn:
+        conn.executemany(
+            'INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [(contest, task, *run) for run in runs])
+        for name, interpreter in {(run.name, run.interpreter) for run in runs}:
+            conn.execute(
+                'DELETE FROM runs WHERE contest = ? AND task = ? AND name = ? '
+                'AND interpreter = ? AND rowid NOT IN ('
+                'SELECT rowid FROM runs WHERE contest = ? AND task = ? '
+                'AND name = ? AND interpreter = ? '
+                'ORDER BY recorded_at DESC LIMIT ?)',
+                (contest, task, name, interpreter) * 2 + (MAX_RUNS_PER_CASE,))
+
+
+def load_runs(contest_dir: str, task: str,
+              interpreter: str = None) -> List[Run]:
+    """テストケースの実行記録を読み込む
+    :param interpreter: インタプリタ (省略時はすべて)
+    :return 実行記録 (古い順)
+    """
+    store_path, contest = locate(contest_dir)
+    query = ('SELECT name, interpreter, solution, result, wall_time, max_rss, '
+             'recorded_at FROM runs WHERE contest = ? AND task = ?')
+    params: Tuple = (contest, task)
+    if interpreter is not None:
+        query += ' AND interpreter = ?'
+        params += (interpreter,)
+    with _connect(store_path, create=False) as conn:
+        if conn is None:
+            return []
+        rows = conn.execute(query + ' ORDER BY recorded_at', params).fetchall()
+    return [Run(*row) for row in rows]
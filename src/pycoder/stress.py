@@ -0,0 +1,229 @@
+import itertools
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, NamedTuple, Optional
+
+from . import judge
+from . import runner as runners
+from . import store
+from .pycolor import pprint
+
+# 問題のディレクトリに置く、ランダムケースの生成スクリプトと愚直解のファイル名
+GENERATOR_FILE_NAME = 'gen.py'
+NAIVE_FILE_NAME = 'naive.py'
+
+# 生成スクリプトと愚直解の制限時間 [sec]
+# (愚直解は遅くてもよいので、問題の制限時間は main.py にだけ適用する)
+HELPER_TIMEOUT = 10.0
+
+
+class Counterexample(NamedTuple):
+    seed: int
+    result: judge.TestResult
+    input_val: str
+    expected_val: str
+    actual_val: Optional[str]
+
+
+class _Checker:
+    """ランダムケースを生成し、main.pyと愚直解の出力を比較する
+    """
+
+    def __init__(self, task_dir: str, case_runner, comparator, tmp_dir: str,
+                 limits: judge.Limits, executor: ThreadPoolExecutor):
+        """
+        :param limits: main.pyに適用する実行時間制限とメモリ制限
+        :param executor: main.pyと並行に愚直解を実行するためのスレッドプール
+            (同時に試すケースの数だけスレッドを用意し、全ケースで使い回す)
+        """
+        self.target_path = task_dir + 'main.py'
+        self.naive_path = task_dir + NAIVE_FILE_NAME
+        self.generator_path = task_dir + GENERATOR_FILE_NAME
+        self.runner = case_runner
+        self.comparator = comparator
+        self.tmp_dir = tmp_dir
+        self.limits = limits
+        self.executor = executor
+
+    def check(self, seed: int) -> Optional[Counterexample]:
+        """シード値seedで生成したケースを試す
+        生成した入力と各スクリプトの出力はファイルのまま扱い、反例が見つかった場合だけ読み込む。
+        :return main.pyが愚直解と異なる結果になった場合はそのケース
+        :raise RuntimeError 生成スクリプトか愚直解が正常に終了しなかった場合
+        """
+        input_path = os.path.join(self.tmp_dir, '{}.txt'.format(seed))
+        try:
+            with open(input_path, 'wb') as f:
+                gen_res = self.runner.run(self.generator_path, os.devnull,
+                                          timeout=HELPER_TIMEOUT,
+                                          args=[str(seed)], output=f)
+            if gen_res.returncode != 0:
+                raise RuntimeError('{} failed (seed: {})\n{}'.format(
+                    GENERATOR_FILE_NAME, seed, judge.read_file(input_path)))
+            with tempfile.TemporaryFile(dir=self.tmp_dir) as naive_out, \
+                    tempfile.TemporaryFile(dir=self.tmp_dir) as target_out:
+                naive_future = self.executor.submit(
+                    self.runner.run, self.naive_path, input_path,
+                    timeout=HELPER_TIMEOUT, output=naive_out)
+                memory_limit = (None if self.limits.memory_limit is None
+                                else self.limits.memory_limit * 1024 * 1024)
+                target_res = self.runner.run(self.target_path, input_path,
+                                             timeout=self.limits.time_limit,
+                                             output=target_out,
+                                             memory_limit=memory_limit)
+                naive_res = naive_future.result()
+                return self._judge(seed, input_path, naive_res, naive_out,
+                                   target_res, target_out)
+        finally:
+            os.remove(input_path)
+
+    def _judge(self, seed: int, input_path: str,
+               naive_res: runners.RunResult, naive_out: BinaryIO,
+               target_res: runners.RunResult,
+               target_out: BinaryIO) -> Optional[Counterexample]:
+        naive_out.seek(0)
+        if naive_res.returncode != 0:
+            raise RuntimeError('{} failed (seed: {})\n{}'.format(
+                NAIVE_FILE_NAME, seed, _decode(naive_out)))
+        target_out.seek(0)
+        result = judge.judge_output(target_res, naive_out, self.comparator,
+                                    target_out)
+        if result == judge.TestResult.OK:
+            return None
+        naive_out.seek(0)
+        target_out.seek(0)
+        actual_output = (None if target_res.timed_out
+                         else _decode(target_out).rstrip())
+        with open(input_path, 'rb') as f:
+            input_val = _decode(f)
+        return Counterexample(seed, result, input_val,
+                              _decode(naive_out).rstrip(), actual_output)
+
+
+def _decode(f: BinaryIO) -> str:
+    return f.read().decode('utf-8', 'replace')
+
+
+def _next_case_name(contest_dir: str, task: str) -> str:
+    """テストケースとして追加する際のケース名を返す (既存の数字のケース名 + 1)
+    tests/ に書き出したケースと、データベースにだけ保存したケースの両方から求める。
+    """
+    tests_dir = os.path.join(contest_dir, task, 'tests')
+    case_names = [case.name for case in store.load_cases(contest_dir, task)]
+    if os.path.isdir(tests_dir):
+        case_names += os.listdir(tests_dir)
+    numbers = [int(name) for name in case_names if name.isdigit()]
+    return str(max(numbers, default=0) + 1)
+
+
+def save_counterexample(contest_dir: str, task: str,
+                        counterexample: Counterexample) -> str:
+    """反例をテストケースとしてデータベースに保存し、tests/ に書き出す
+    :return 保存したケース名
+    """
+    case_name = _next_case_name(contest_dir, task)
+    store.save_cases(contest_dir, task, [store.Case(
+        case_name, counterexample.input_val.encode(),
+        (counterexample.expected_val + '\n').encode())])
+    store.export_cases(contest_dir, task)
+    return case_name
+
+
+def stress_test(contest, task, iterations: int = 1000, jobs: int = 1,
+                runner: str = 'subprocess', preload=None,
+                time_factor: float = 1.0, compare: str = None,
+                tolerance: float = None) -> Optional[Counterexample]:
+    """ランダムケースでmain.pyと愚直解(naive.py)の出力を比較する
+    gen.py はコマンドライン引数でシード値を受け取り、入力を標準出力に書き出すスクリプト。
+    異なる結果になったケースが見つかった時点で止め、テストケースとして保存する。
+    :param iterations: 試すケースの数
+    :param jobs: 並列に試すケースの数 (0以下の場合はCPUコア数)
+    :param runner: 実行方式 ('subprocess' または 'fork')
+    :param preload: runnerが'fork'の場合に事前に読み込むモジュール
+    :param time_factor: 問題の制限時間に掛ける係数 (main.pyにだけ適用する)
+    :param compare: 出力の比較方法 ('exact', 'token', 'float')
+    :param tolerance: compareが'float'の場合の許容誤差
+    :return 見つかった反例 (見つからなかった場合はNone)
+    """
+    task_dir = judge.get_task_dir(contest, task)
+    for file_name in (GENERATOR_FILE_NAME, NAIVE_FILE_NAME):
+        if not os.path.exists(task_dir + file_name):
+            print('{} is not found.'.format(task_dir + file_name))
+            exit(1)
+
+    if jobs is None or jobs <= 0:
+        jobs = os.cpu_count() or 1
+    if isinstance(preload, str):
+        preload = [m for m in preload.split(',') if m]
+    case_runner = runners.create_runner(runner, preload)
+    comparator = judge.get_comparator(contest, task, compare, tolerance)
+    limits = judge.get_limits(contest, task, time_factor)
+
+    seeds = itertools.count()
+    lock = threading.Lock()
+    stop = threading.Event()
+    found = []
+    done = [0]
+    start = time.monotonic()
+
+    def work(checker: _Checker):
+        while not stop.is_set():
+            with lock:
+                seed = next(seeds)
+            if seed >= iterations:
+                return
+            try:
+                counterexample = checker.check(seed)
+            except RuntimeError:
+                # 他のスレッドも止め、失敗をすぐに知らせる
+                stop.set()
+                raise
+            with lock:
+                done[0] += 1
+                if counterexample is not None:
+                    found.append(counterexample)
+                    stop.set()
+                if done[0] % 100 == 0:
+                    elapsed = time.monotonic() - start
+                    print('\r{} cases ({:.0f} cases/s)'.format(
+                        done[0], done[0] / elapsed), end='', flush=True)
+
+    with tempfile.TemporaryDirectory() as tmp_dir, \
+            ThreadPoolExecutor(max_workers=jobs) as naive_executor:
+        checker = _Checker(task_dir, case_runner, comparator, tmp_dir,
+                           limits, naive_executor)
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(work, checker) for _ in range(jobs)]
+            try:
+                for future in futures:
+                    future.result()
+            except RuntimeError as e:
+                # 生成スクリプトか愚直解が失敗した場合は、そのスクリプトとシード値を表示して止める
+                print()
+                pprint(str(e), color='red')
+                exit(1)
+            finally:
+                stop.set()
+
+    elapsed = time.monotonic() - start
+    print('\r{} cases in {:.2f} s'.format(done[0], elapsed))
+    if not found:
+        pprint('No counterexample found.', color='green')
+        return None
+
+    counterexample = min(found, key=lambda c: c.seed)
+    case_name = save_counterexample(judge.get_contest_dir(contest), task,
+                                    counterexample)
+    pprint('{} (seed: {})'.format(counterexample.result.name,
+                                  counterexample.seed), color='red')
+    pprint('[input]', color='cyan')
+    print(counterexample.input_val.rstrip())
+    pprint('[expected]', color='green')
+    pprint(counterexample.expected_val, color='green', bold=False)
+    pprint('[actual]', color='red')
+    pprint(counterexample.actual_val, color='red', bold=False)
+    print('Saved as test case: {}'.format(case_name))
+    return counterexample
@@ -0,0 +1,183 @@
+"""提出のジャッジ結果をターミナルで待つ.
+
+提出一覧ページが使っている状況確認用のjson (/submissions/me/status/json) を定期的に取得し、
+ジャッジが終わった提出から結果を表示する。複数の提出は1回のリクエストでまとめて確認する。
+"""
+import re
+import time
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .auth import auth
+from . import htmlscan
+from .pycolor import pprint
+
+CONTEST_URL = 'https://atcoder.jp/contests/'
+
+# 状況を確認する間隔 [sec]
+# ジャッジ待ち・ジャッジ中の提出がある間は短い間隔で、それ以外の状況 (分からない状況など) では
+# 徐々に間隔を延ばす
+MIN_POLL_INTERVAL = 0.5
+MAX_POLL_INTERVAL = 5.0
+BACKOFF = 1.5
+
+# 結果を待つ時間の上限 [sec]
+WAIT_TIMEOUT = 600.0
+
+# ジャッジが終わったことを表す状況
+FINAL_STATUSES = ('AC', 'WA', 'TLE', 'MLE', 'RE', 'CE', 'OLE', 'IE', 'QLE')
+
+# ジャッジ待ちを表す状況 (WJ: ジャッジ待ち, WR: リジャッジ待ち)
+WAITING_STATUSES = ('WJ', 'WR')
+
+# ジャッジ中の状況 (ex: '3/14', '3/14 TLE')
+_JUDGING_STATUS = re.compile(r'\d+/\d+(?: \w+)?')
+
+
+class SubmissionStatus(NamedTuple):
+    status: str  # ジャッジの状況 (ex: 'AC', 'WJ', '3/14 TLE')
+    time: Optional[int] = None  # 実行時間 [ms]
+    memory: Optional[int] = None  # メモリ使用量 [KB]
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINAL_STATUSES
+
+    @property
+    def judging(self) -> bool:
+        """ジャッジ待ちまたはジャッジ中かどうか"""
+        return (self.status in WAITING_STATUSES
+                or _JUDGING_STATUS.fullmatch(self.status) is not None)
+
+
+def parse_status(html: str) -> SubmissionStatus:
+    """状況確認用のjsonに含まれるhtmlの断片から、提出の状況を読み取る
+    """
+    status, cells = htmlscan.scan_submission_status(html)
+    time_ms = memory = None
+    for cell in cells:
+        m = re.fullmatch(r'(\d+) ms', cell)
+        if m:
+            time_ms = int(m.group(1))
+        m = re.fullmatch(r'(\d+) KB', cell)
+        if m:
+            memory = int(m.group(1))
+    return SubmissionStatus(status, time_ms, memory)
+
+
+def _submissions_url(contest) -> str:
+    return CONTEST_URL + contest + '/submissions/me'
+
+
+def fetch_statuses(session, contest, submission_ids: Iterable[int]
+                   ) -> Tuple[Dict[int, SubmissionStatus], Optional[float]]:
+    """提出の状況をまとめて取得する
+    :param submission_ids: 提出ID
+    :return 提出IDごとの状況, サーバーが指定する確認の間隔 [sec] (指定が無い場合はNone)
+    """
+    res = session.get(_submissions_url(contest) + '/status/json',
+                      params={'reload': 'true',
+                              'sids[]': [str(sid) for sid in submission_ids]})
+    res.raise_for_status()
+    data = res.json()
+    statuses = {int(sid): parse_status(result['Html'])
+                for sid, result in data.get('Result', {}).items()}
+    interval = data.get('Interval')
+    return statuses, (interval / 1000 if interval else None)
+
+
+def next_interval(interval: float, judging: bool,
+                  server_interval: Optional[float] = None) -> float:
+    """次に状況を確認するまでの間隔を決める
+    :param interval: 前回の間隔 [sec]
+    :param judging: ジャッジ待ち・ジャッジ中の提出があるかどうか
+    :param server_interval: サーバーが指定する間隔 [sec] (これより短くはしない)
+    """
+    if judging:
+        interval = MIN_POLL_INTERVAL
+    else:
+        interval = min(interval * BACKOFF, MAX_POLL_INTERVAL)
+    if server_interval is not None:
+        interval = max(interval, min(server_interval, MAX_POLL_INTERVAL))
+    return interval
+
+
+@auth
+def wait_for_verdicts(session_logined, contest, submission_ids: Iterable[int],
+                      on_finished: Callable[[int, SubmissionStatus], None] = None,
+                      timeout: float = WAIT_TIMEOUT) -> Dict[int, SubmissionStatus]:
+    """提出のジャッジが終わるまで待つ
+    :param submission_ids: 待つ提出のID
+    :param on_finished: ジャッジが終わった提出ごとに on_finished(提出ID, 状況) を呼ぶ
+    :param timeout: 待つ時間の上限 [sec]
+    :return 提出IDごとの最後に確認した状況 (時間内に終わらなかったものも含む)
+    """
+    waiting = list(dict.fromkeys(submission_ids))
+    latest: Dict[int, SubmissionStatus] = {}
+    deadline = time.monotonic() + timeout
+    interval = MIN_POLL_INTERVAL
+    while waiting:
+        statuses, server_interval = fetch_statuses(session_logined, contest,
+                                                   waiting)
+        judging = False
+        for sid in list(waiting):
+            status = statuses.get(sid)
+            if status is None:
+                continue
+            judging |= status.judging
+            latest[sid] = status
+            if status.finished:
+                waiting.remove(sid)
+                if on_finished is not None:
+                    on_finished(sid, status)
+        if not waiting or time.monotonic() >= deadline:
+            break
+        interval = next_interval(interval, judging, server_interval)
+        time.sleep(min(interval, max(0.0, deadline - time.monotonic())))
+    return latest
+
+
+@auth
+def fetch_pending_submission_ids(session_logined, contest) -> List[int]:
+    """提出一覧ページの提出のうち、ジャッジが終わっていないもののIDを返す
+    """
+    res = session_logined.get(_submissions_url(contest))
+    res.raise_for_status()
+    submission_ids = htmlscan.scan_submission_ids(res.text)
+    if not submission_ids:
+        return []
+    statuses, _ = fetch_statuses(session_logined, contest, submission_ids)
+    return [sid for sid in submission_ids
+            if sid in statuses and not statuses[sid].finished]
+
+
+def print_verdict(submission_id: int, status: SubmissionStatus) -> None:
+    color = 'green' if status.status == 'AC' else 'red'
+    print('submission {} => '.format(submission_id), end='')
+    pprint(status.status, color=color, end='')
+    if status.time is not None and status.memory is not None:
+        print('  {} ms, {} KB'.format(status.time, status.memory))
+    else:
+        print()
+
+
+def wait_and_print(contest, submission_ids: Iterable[int],
+                   timeout: float = WAIT_TIMEOUT) -> bool:
+    """提出のジャッジが終わるのを待ち、終わったものから結果を表示する
+    :return すべての提出がACだったかどうか (待つ提出が無い場合はFalse)
+    """
+    submission_ids = list(submission_ids)
+    if not submission_ids:
+        print('No submission is being judged.')
+        return False
+    print('Waiting for judge: {}'.format(
+        ', '.join(str(sid) for sid in submission_ids)))
+    latest = wait_for_verdicts(contest, submission_ids,
+                               on_finished=print_verdict, timeout=timeout)
+    unfinished = [sid for sid in submission_ids
+                  if sid not in latest or not latest[sid].finished]
+    for sid in unfinished:
+        status = latest.get(sid)
+        print('submission {} => still judging ({})'.format(
+            sid, status.status if status else 'unknown'))
+    return not unfinished and all(latest[sid].status == 'AC'
+                                  for sid in submission_ids)
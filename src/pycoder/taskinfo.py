@@ -0,0 +1,38 @@
+import json
+import os
+from typing import Any, Dict
+
+from . import store
+
+# 以前のバージョンがコンテストディレクトリ直下に置いていた、問題ごとのメタデータのファイル名
+# 現在はデータベース (store) に保存し、このファイルは読み込みだけを行う
+TASK_INFO_FILE_NAME = 'tasks.json'
+
+TaskInfo = Dict[str, Dict[str, Any]]
+
+
+def _task_info_path(contest_dir: str) -> str:
+    return os.path.join(contest_dir, TASK_INFO_FILE_NAME)
+
+
+def save_task_info(contest_dir: str, task_info: TaskInfo) -> None:
+    """問題ごとのメタデータを保存する
+    :param contest_dir: コンテストのディレクトリ
+    :param task_info: {'a': {'screen_name': 'abc160_a', ...}, ...}
+    """
+    store.save_task_info(contest_dir, task_info)
+
+
+def load_task_info(contest_dir: str) -> TaskInfo:
+    """保存した問題ごとのメタデータを読み込む
+    :param contest_dir: コンテストのディレクトリ
+    :return メタデータ (保存されていない場合は空のdict)
+    """
+    task_info = store.load_task_info(contest_dir)
+    if task_info is not None:
+        return task_info
+    try:
+        with open(_task_info_path(contest_dir), 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
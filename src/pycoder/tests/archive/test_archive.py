@@ -0,0 +1,182 @@
+from pycoder import archive
+from pycoder import scrape
+from requests.cookies import RequestsCookieJar
+from unittest.mock import patch
+import pytest
+
+TASKS_PAGE = '''<table><tbody>
+<tr><td><a href="/contests/{0}/tasks/{0}_a">A</a></td></tr>
+<tr><td><a href="/contests/{0}/tasks/{1}">B</a></td></tr>
+</tbody></table>'''
+
+PROB_PAGE = '''<html><body>
+<span class="lang-ja">
+<section><h3>入力例 1</h3><pre>{0}
+</pre></section>
+<section><h3>出力例 1</h3><pre>{0}
+</pre></section>
+</span>
+</body></html>'''
+
+
+class FakeResponse:
+    def __init__(self, text, status_code=200, headers=None):
+        self.text = text
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.headers = headers or {}
+
+
+class FakeSession:
+    def __init__(self, pages):
+        self.pages = pages
+        self.cookies = RequestsCookieJar()
+        self.requested = []
+
+    def get(self, url):
+        self.requested.append(url)
+        return FakeResponse(self.pages[url])
+
+    def mount(self, prefix, adapter):
+        pass
+
+    def close(self):
+        pass
+
+
+def _pages():
+    # abc001とabc002のb問題は、どちらもarc001_b
+    pages = {}
+    for contest in ('abc001', 'abc002'):
+        pages[scrape._get_tasks_url(contest)] = TASKS_PAGE.format(
+            contest, 'arc001_b')
+        pages['{}{}/tasks/{}_a'.format(scrape.CONTEST_URL, contest,
+                                       contest)] = PROB_PAGE.format(contest)
+        pages['{}{}/tasks/arc001_b'.format(scrape.CONTEST_URL, contest)] = \
+            PROB_PAGE.format('arc001')
+    return pages
+
+
+def _archive(atcoder_dir, session, contests):
+    results = {}
+    with patch('pycoder.auth.check_cookies', lambda: session), \
+            patch('pycoder.auth.save_cookies_in_local', lambda _: None):
+        archive.archive_contests(
+            atcoder_dir, contests,
+            lambda contest, result: results.setdefault(contest, result),
+            max_workers=1, requests_per_second=1000)
+    return results
+
+
+class TestArchive:
+
+    @pytest.mark.parametrize(('url', 'expected'), [
+        ('https://atcoder.jp/contests/abc160/tasks', 'contest/abc160'),
+        ('https://atcoder.jp/contests/abc160/tasks/arc012_c', 'task/arc012_c'),
+        ('https://atcoder.jp/contests/abc160/submissions/me', None),
+    ])
+    def test_page_key(self, url, expected):
+        assert archive._page_key(url) == expected
+
+    def test_put_and_get(self, tmp_path):
+        pages = archive.PageArchive(str(tmp_path))
+        url = scrape.CONTEST_URL + 'abc001/tasks/abc001_a'
+        assert pages.get(url) is None
+        pages.put(url, 'あ' * 10000)
+        assert pages.get(url) == 'あ' * 10000
+
+    def test_archive_contests(self, tmp_path):
+        atcoder_dir = str(tmp_path)
+        session = FakeSession(_pages())
+        results = _archive(atcoder_dir, session, ['abc001', 'abc002'])
+        assert set(results) == {'abc001', 'abc002'}
+        # 共通の問題は1回だけ取得する
+        assert len(session.requested) == 5
+        assert results['abc002'].problems['b'].sample_test_cases == {
+            1: scrape.TestCase('arc001\n', 'arc001\n')}
+
+        # 保存済みのコンテストは取得しない
+        session = FakeSession({})
+        results = _archive(atcoder_dir, session, ['abc001', 'abc002'])
+        assert set(results) == {'abc001', 'abc002'}
+        assert session.requested == []
+
+        contest = archive.load_contest(archive.PageArchive(atcoder_dir),
+                                       'abc001')
+        assert list(contest.prob_paths) == ['a', 'b']
+        assert contest.problems['a'].sample_test_cases == {
+            1: scrape.TestCase('abc001\n', 'abc001\n')}
+
+    def test_resume(self, tmp_path):
+        atcoder_dir = str(tmp_path)
+        pages = archive.PageArchive(atcoder_dir)
+        all_pages = _pages()
+        tasks_url = scrape._get_tasks_url('abc001')
+        pages.put(tasks_url, all_pages[tasks_url])
+        assert archive.load_contest(pages, 'abc001') is None
+
+        session = FakeSession(all_pages)
+        results = _archive(atcoder_dir, session, ['abc001'])
+        assert list(results['abc001'].prob_paths) == ['a', 'b']
+        assert tasks_url not in session.requested
+
+    def test_skip_empty_tasks_page(self, tmp_path):
+        pages = archive.PageArchive(str(tmp_path))
+        url = scrape._get_tasks_url('abc999')
+        pages.put(url, '<table><tbody></tbody></table>')
+        assert pages.get(url) is None
+
+    def test_revalidation_headers(self, tmp_path):
+        atcoder_dir = str(tmp_path)
+        url = scrape.CONTEST_URL + 'abc001/tasks/abc001_a'
+        archive.PageArchive(atcoder_dir).put(url, 'page', {
+            'ETag': '"v1"', 'Last-Modified': 'Sat, 01 Apr 2023 12:00:00 GMT'})
+        assert archive.PageArchive(atcoder_dir).revalidation_headers(
+            url) is None
+        assert archive.PageArchive(
+            atcoder_dir, revalidate=True).revalidation_headers(url) == {
+                'If-None-Match': '"v1"',
+                'If-Modified-Since': 'Sat, 01 Apr 2023 12:00:00 GMT'}
+
+        # 記録が無いページは条件を付けずに取得し直す
+        archive.PageArchive(atcoder_dir).put(url, 'page')
+        assert archive.PageArchive(
+            atcoder_dir, revalidate=True).revalidation_headers(url) == {}
+
+    def test_get_page_not_modified(self, tmp_path):
+        atcoder_dir = str(tmp_path)
+        url = scrape.CONTEST_URL + 'abc001/tasks/abc001_a'
+        archive.PageArchive(atcoder_dir).put(url, 'old', {'ETag': '"v1"'})
+        pages = archive.PageArchive(atcoder_dir, revalidate=True)
+
+        class ConditionalSession:
+            def __init__(self, response):
+                self.response = response
+                self.headers = []
+
+            def get(self, url, headers=None):
+                self.headers.append(headers)
+                return self.response
+
+        session = ConditionalSession(FakeResponse('', status_code=304))
+        assert scrape._get_page(session, url, pages=pages) == 'old'
+        assert session.headers == [{'If-None-Match': '"v1"'}]
+
+        session = ConditionalSession(FakeResponse('new', headers={
+            'ETag': '"v2"'}))
+        assert scrape._get_page(session, url, pages=pages) == 'new'
+        assert pages.get(url) == 'new'
+        assert pages.revalidation_headers(url) == {'If-None-Match': '"v2"'}
+
+    def test_get_page_gone(self, tmp_path):
+        url = scrape.CONTEST_URL + 'abc001/tasks/abc001_a'
+        archive.PageArchive(str(tmp_path)).put(url, 'old')
+        pages = archive.PageArchive(str(tmp_path), revalidate=True)
+
+        class GoneSession:
+            def get(self, url):
+                return FakeResponse('not found', status_code=404)
+
+        # 取得し直したページが無くなっていたら、保存したページを消す
+        assert scrape._get_page(GoneSession(), url, pages=pages) == 'not found'
+        assert pages.get(url) is None
@@ -1,4 +1,5 @@
 import pytest
+import requests
 from pycoder import auth
 from unittest.mock import patch
 import os
@@ -25,3 +26,54 @@ class TestAuth:
         expected = 'test_val_csrf_token'
         actual = auth.extract_csrf_token(html)
         assert actual == expected
+
+    def test_session_is_shared(self):
+        loaded = []
+        saved = []
+
+        def check_cookies():
+            session = requests.session()
+            session.cookies.set('REVEL_SESSION', 'a', domain='atcoder.jp')
+            loaded.append(session)
+            return session
+
+        with patch('pycoder.auth.check_cookies', check_cookies), \
+                patch('pycoder.auth.save_cookies_in_local', saved.append):
+            calls = [auth.auth(lambda session: session)() for _ in range(3)]
+            assert len(loaded) == 1
+            assert all(session is loaded[0] for session in calls)
+
+            # cookieが変わっていなければ保存しない
+            auth.save_session()
+            assert saved == []
+            loaded[0].cookies.set('REVEL_SESSION', 'b', domain='atcoder.jp')
+            auth.save_session()
+            assert len(saved) == 1
+            auth.reset_session()
+
+            assert auth.get_session() is not loaded[0]
+            assert len(loaded) == 2
+
+    def test_logout_drops_session(self, tmp_path, monkeypatch):
+        monkeypatch.setattr('pycoder.auth.COOKIES_PATH',
+                            str(tmp_path / 'cookies'))
+        monkeypatch.setattr('pycoder.auth.CSRF_TOKEN_PATH',
+                            str(tmp_path / 'csrf_token'))
+        (tmp_path / 'cookies').write_text('')
+        saved = []
+
+        def check_cookies():
+            session = requests.session()
+            session.cookies.set('REVEL_SESSION', 'a', domain='atcoder.jp')
+            return session
+
+        with patch('pycoder.auth.check_cookies', check_cookies), \
+                patch('pycoder.auth.save_cookies_in_local', saved.append):
+            session = auth.get_session()
+            session.cookies.set('REVEL_SESSION', 'b', domain='atcoder.jp')
+            auth.logout()
+            # ログアウト後は、変わったcookieも保存し直さない
+            auth.save_session()
+            assert saved == []
+            assert auth.get_session() is not session
+        assert not (tmp_path / 'cookies').exists()
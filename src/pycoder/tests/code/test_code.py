@@ -0,0 +1,124 @@
+from pycoder import code
+from pycoder import scrape
+from requests.cookies import RequestsCookieJar
+from unittest.mock import patch
+import os
+import pytest
+
+TASKS_PAGE = '''<table><tbody>
+<tr><td><a href="/contests/abc001/tasks/abc001_a">A</a></td></tr>
+<tr><td><a href="/contests/abc001/tasks/abc001_b">B</a></td></tr>
+</tbody></table>'''
+
+PROB_PAGE = '''<html><body>
+<span class="lang-ja">
+<section><h3>入力例 1</h3><pre>{0}
+</pre></section>
+<section><h3>出力例 1</h3><pre>{0}
+</pre></section>
+</span>
+</body></html>'''
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+        self.ok = True
+
+
+class FakeSession:
+    def __init__(self, pages):
+        self.pages = pages
+        self.cookies = RequestsCookieJar()
+        self.requested = []
+
+    def get(self, url):
+        self.requested.append(url)
+        page = self.pages[url]
+        if isinstance(page, Exception):
+            raise page
+        return FakeResponse(page)
+
+    def mount(self, prefix, adapter):
+        pass
+
+    def close(self):
+        pass
+
+
+def _pages():
+    return {
+        scrape._get_tasks_url('abc001'): TASKS_PAGE,
+        scrape.CONTEST_URL + 'abc001/tasks/abc001_a': PROB_PAGE.format('a'),
+        scrape.CONTEST_URL + 'abc001/tasks/abc001_b': PROB_PAGE.format('b'),
+    }
+
+
+def _prepare(tmp_path, session):
+    template_path = str(tmp_path / 'template.py')
+    with open(template_path, 'w') as f:
+        f.write('# template\n')
+    atcoder_dir = str(tmp_path) + '/'
+    with patch('pycoder.auth.check_cookies', lambda: session), \
+            patch('pycoder.auth.save_cookies_in_local', lambda _: None), \
+            patch.object(code, '_load_directories',
+                         lambda: (atcoder_dir, template_path)):
+        return code.prepare_contests(['abc001'], max_workers=1,
+                                     requests_per_second=1000)
+
+
+class TestCode:
+
+    @pytest.mark.parametrize('contests, expected', [
+        (['abc300'], ['abc300']),
+        (['abc300-abc302'], ['abc300', 'abc301', 'abc302']),
+        (['arc099-101', 'abc001'], ['arc099', 'arc100', 'arc101', 'abc001']),
+        (['abc001-003', 'abc002'], ['abc001', 'abc002', 'abc003']),
+        (['agc001-agc000'], []),
+    ])
+    def test_parse_contests(self, contests, expected):
+        assert code.parse_contests(contests) == expected
+
+    def test_parse_contests_invalid_range(self):
+        with pytest.raises(ValueError):
+            code.parse_contests(['abc001-arc003'])
+
+    @pytest.mark.parametrize('seconds, expected', [
+        (59.6, '0:01:00'),
+        (3 * 3600 + 62, '3:01:02'),
+    ])
+    def test_format_remaining(self, seconds, expected):
+        assert code._format_remaining(seconds) == expected
+
+    def test_prepare_contests_resume(self, tmp_path):
+        # b問題の取得に失敗しても、取得できたページは保存しておく
+        pages = _pages()
+        b_url = scrape.CONTEST_URL + 'abc001/tasks/abc001_b'
+        pages[b_url] = OSError('connection reset')
+        session = FakeSession(pages)
+        assert _prepare(tmp_path, session) == ['abc001']
+
+        # やり直す際は、取得できなかったページだけを取得する
+        session.pages = _pages()
+        session.requested = []
+        assert _prepare(tmp_path, session) == []
+        assert session.requested == [b_url]
+        contest_dir = tmp_path / 'contests' / 'abc001'
+        assert (contest_dir / 'b' / 'tests' / '1' / 'in.txt').read_text() == \
+            'b\n'
+
+    def test_prepare_contests_again(self, tmp_path):
+        session = FakeSession(_pages())
+        assert _prepare(tmp_path, session) == []
+        task_dir = tmp_path / 'contests' / 'abc001' / 'a'
+        (task_dir / 'main.py').write_text('print(1)\n')
+        in_path = task_dir / 'tests' / '1' / 'in.txt'
+        os.utime(str(in_path), (0, 0))
+
+        # 用意し直しても、書きかけの解答と変わっていないケースはそのまま残す
+        session.requested = []
+        assert _prepare(tmp_path, session) == []
+        assert session.requested == []
+        assert (task_dir / 'main.py').read_text() == 'print(1)\n'
+        assert in_path.read_text() == 'a\n'
+        assert os.path.getmtime(str(in_path)) == 0
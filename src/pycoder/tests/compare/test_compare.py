@@ -0,0 +1,71 @@
+from pycoder import compare
+import io
+import pytest
+
+
+def _compare(comparator, expected, actual):
+    return comparator.compare(io.BytesIO(expected), io.BytesIO(actual))
+
+
+@pytest.fixture(params=[3, 64 * 1024])
+def chunk_size(request, monkeypatch):
+    # チャンクの境界をまたぐ場合も同じ結果になること
+    monkeypatch.setattr(compare, 'CHUNK_SIZE', request.param)
+    return request.param
+
+
+class TestCompare:
+
+    @pytest.mark.parametrize('expected, actual, same', [
+        (b'1 2 3\n', b'1 2 3\n', True),
+        (b'1 2 3\n', b'1 2 3', True),
+        (b'1 2 3\n', b'1 2 3  \n\n', True),
+        (b'1 2 3\n', b'1 2 4\n', False),
+        (b'1 2 3\n', b'1  2 3\n', False),
+        (b'1\n2\n', b'1 \n2\n', False),
+        (b'1 2 3\n', b'1 2 3 4\n', False),
+        (b'', b'\n', True),
+        (b'abcdefgh' * 10, b'abcdefgh' * 10 + b'\n', True),
+    ])
+    def test_exact(self, chunk_size, expected, actual, same):
+        assert _compare(compare.ExactComparator(), expected, actual) == same
+        assert (expected.rstrip() == actual.rstrip()) == same
+
+    @pytest.mark.parametrize('expected, actual, same', [
+        (b'1 2 3\n', b'1\n2\n3\n', True),
+        (b'1  2 3', b' 1 2 3 ', True),
+        (b'123 456\n', b'12 3456\n', False),
+        (b'1 2 3\n', b'1 2\n', False),
+        (b'Yes\n', b'yes\n', False),
+    ])
+    def test_token(self, chunk_size, expected, actual, same):
+        assert _compare(compare.TokenComparator(), expected, actual) == same
+
+    @pytest.mark.parametrize('expected, actual, same', [
+        (b'0.333333333\n', b'0.3333333\n', True),
+        (b'0.5\n', b'0.50001\n', False),
+        (b'1000000.0\n', b'1000000.5\n', True),
+        (b'1.0 Yes\n', b'1.0000001 Yes\n', True),
+        (b'1.0 Yes\n', b'1.0000001 No\n', False),
+        (b'nan\n', b'nan\n', True),
+    ])
+    def test_float(self, chunk_size, expected, actual, same):
+        comparator = compare.FloatComparator(1e-6)
+        assert _compare(comparator, expected, actual) == same
+
+    @pytest.mark.parametrize('text, expected', [
+        ('出力 真の値との絶対誤差または相対誤差が 10^{-6} 以下であれば正解とみなされる。', 1e-6),
+        ('絶対誤差が 10^{-9} 以下であれば正解とみなされます。', 1e-9),
+        ('Yes または No を出力せよ。', None),
+        ('', None),
+    ])
+    def test_detect_tolerance(self, text, expected):
+        assert compare.detect_tolerance(text) == expected
+
+    def test_create_comparator(self):
+        assert isinstance(compare.create_comparator(), compare.ExactComparator)
+        comparator = compare.create_comparator(tolerance=1e-9)
+        assert isinstance(comparator, compare.FloatComparator)
+        assert comparator.tolerance == 1e-9
+        with pytest.raises(ValueError):
+            compare.create_comparator('unknown')
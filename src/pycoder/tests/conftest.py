@@ -1,7 +1,16 @@
 import sys
 import os
+import pytest
 
 conf_path = os.path.abspath(__file__)
 dirpath_of_conf = os.path.dirname(conf_path)
 src_dir_path = os.path.abspath(dirpath_of_conf + '/../src/')
 sys.path.append(src_dir_path)
+
+
+@pytest.fixture(autouse=True)
+def reset_auth_session():
+    """テストごとに共有セッションを作り直す"""
+    from pycoder import auth
+    yield
+    auth.reset_session()
@@ -0,0 +1,69 @@
+from pycoder import history
+from pycoder import judge
+from pycoder import store
+
+
+def _run(name, solution, wall_time, result='OK', recorded_at=0.0):
+    return store.Run(name, 'python', solution, result, wall_time, 10000,
+                     recorded_at)
+
+
+def _contest_dir(root):
+    contest_dir = root / 'atcoder' / 'contests' / 'abc001'
+    contest_dir.mkdir(parents=True)
+    return str(contest_dir) + '/'
+
+
+class TestHistory:
+
+    def test_find_regressions(self):
+        previous = [_run('1', 'old', 0.3), _run('1', 'old', 0.4),
+                    _run('2', 'old', 0.01), _run('3', 'old', 0.1, 'WA'),
+                    _run('4', 'new', 0.1)]
+        current = [_run('1', 'new', 1.5), _run('2', 'new', 0.03),
+                   _run('3', 'new', 1.0), _run('4', 'new', 1.0)]
+        # 2は揺らぎの範囲、3は以前に通っていない、4は同じ解答なので知らせない
+        assert history.find_regressions(previous, current) == [
+            history.Regression('1', 0.3, 'old', 1.5)]
+        assert history.find_regressions(previous, []) == []
+
+    def test_save_and_load_runs(self, tmp_path, monkeypatch):
+        contest_dir = _contest_dir(tmp_path)
+        assert store.load_runs(contest_dir, 'a') == []
+        monkeypatch.setattr(store, 'MAX_RUNS_PER_CASE', 3)
+        runs = [_run('1', 's', 0.1 * i, recorded_at=float(i))
+                for i in range(5)]
+        store.save_runs(contest_dir, 'a', runs[:2])
+        store.save_runs(contest_dir, 'a', runs[2:] + [_run('2', 's', 1.0)])
+        loaded = store.load_runs(contest_dir, 'a')
+        # ケースごとに新しいものだけ残す
+        assert [r for r in loaded if r.name == '1'] == runs[2:]
+        assert store.load_runs(contest_dir, 'a', 'pypy3') == []
+
+    def test_test_all_reports_regression(self, tmp_path, monkeypatch,
+                                         capsys):
+        task_dir = tmp_path / 'atcoder' / 'contests' / 'abc001' / 'a'
+        case_dir = task_dir / 'tests' / '1'
+        case_dir.mkdir(parents=True)
+        (case_dir / 'in.txt').write_text('1\n')
+        (case_dir / 'out.txt').write_text('1\n')
+        (task_dir / 'main.py').write_text('print(input())\n')
+        monkeypatch.chdir(tmp_path)
+        assert judge.test_all('abc001', 'a')
+        assert '[regression]' not in capsys.readouterr().out
+
+        (task_dir / 'main.py').write_text(
+            'import time\ntime.sleep(0.5)\nprint(input())\n')
+        assert judge.test_all('abc001', 'a')
+        out = capsys.readouterr().out
+        assert '[regression]' in out
+        assert 'case: 1 ' in out
+
+        contest_dir = str(tmp_path / 'atcoder' / 'contests' / 'abc001')
+        assert len(store.load_runs(contest_dir, 'a')) == 2
+        assert history.print_history(contest_dir, 'a')
+        lines = capsys.readouterr().out.splitlines()
+        assert lines[0].split()[0] == 'solution'
+        assert len(lines) == 3
+        assert lines[2].endswith('!')
+        assert not history.print_history(contest_dir, 'b')
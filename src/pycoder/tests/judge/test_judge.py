@@ -0,0 +1,332 @@
+from pycoder import code
+from pycoder import judge
+from pycoder import scrape
+from pycoder import taskinfo
+from pycoder import runner as runners
+from requests.cookies import RequestsCookieJar
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+import pytest
+import os
+
+
+def _make_task(root, src, cases):
+    task_dir = root / 'atcoder' / 'contests' / 'abc001' / 'a'
+    task_dir.mkdir(parents=True)
+    for name, (in_val, out_val) in cases.items():
+        case_dir = task_dir / 'tests' / name
+        case_dir.mkdir(parents=True)
+        (case_dir / 'in.txt').write_text(in_val)
+        (case_dir / 'out.txt').write_text(out_val)
+    (task_dir / 'main.py').write_text(src)
+    return task_dir
+
+
+class FakeResponse:
+    def __init__(self, url, status_code=200, text=''):
+        self.url = url
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.text = text
+
+    def raise_for_status(self):
+        pass
+
+
+CONTEST_SUBMIT_URL = judge.CONTEST_URL + 'abc001/submit'
+
+
+class FakeSession:
+    """提出ページへのPOSTを記録し、有効なcsrfトークンの場合のみ提出を受け付ける"""
+
+    def __init__(self, valid_token, rejected=None):
+        """
+        :param rejected: 無効なトークンの場合のレスポンス (省略時は提出ページへ戻す)
+        """
+        self.valid_token = valid_token
+        self.rejected = rejected
+        self.cookies = RequestsCookieJar()
+        self.requests = []
+
+    def get(self, url):
+        self.requests.append(('GET', url))
+        return FakeResponse(url, text='<input name="csrf_token" value="{}">'
+                            .format(self.valid_token))
+
+    def post(self, url, data):
+        self.requests.append(('POST', url))
+        if data['csrf_token'] != self.valid_token:
+            return self.rejected or FakeResponse(url)
+        assert data['data.TaskScreenName'] == 'arc001_a'
+        return FakeResponse(url.replace('/submit', '/submissions/me'))
+
+    def mount(self, prefix, adapter):
+        pass
+
+    def close(self):
+        pass
+
+
+class TestJudge:
+
+    def test_test_all_parallel(self, tmp_path, monkeypatch, capsys):
+        _make_task(tmp_path, 'print(int(input()) * 2)\n', {
+            '1': ('1\n', '2\n'),
+            '2': ('2\n', '4\n'),
+            '3': ('3\n', '7\n'),
+        })
+        monkeypatch.chdir(tmp_path)
+        assert not judge.test_all('abc001', 'a', jobs=3)
+        out = capsys.readouterr().out
+        # 結果はテストケースの順に表示される
+        assert out.index('case: 1') < out.index('case: 2') < out.index('case: 3')
+        assert out.count('OK') == 2
+        assert out.count('NG') == 1
+
+    def test_test_all_without_expected_output(self, tmp_path, monkeypatch):
+        task_dir = _make_task(tmp_path, 'print(int(input()) * 2)\n', {
+            '1': ('1\n', '2\n'),
+        })
+        case_dir = task_dir / 'tests' / 'gen-max'
+        case_dir.mkdir()
+        (case_dir / 'in.txt').write_text('100\n')
+        monkeypatch.chdir(tmp_path)
+        assert judge.test_all('abc001', 'a')
+
+    def test_test_all_without_cases(self, tmp_path, monkeypatch, capsys):
+        task_dir = _make_task(tmp_path, 'print(1)\n', {})
+        (task_dir / 'tests').mkdir()
+        monkeypatch.chdir(tmp_path)
+        # ケースが無い場合は通ったことにしない
+        assert not judge.test_all('abc001', 'a')
+        assert 'Test case is not found.' in capsys.readouterr().out
+
+    def test_test_all_not_exported(self, tmp_path, monkeypatch):
+        contest_dir = tmp_path / 'atcoder' / 'contests' / 'abc001'
+        template_path = tmp_path / 'template.py'
+        template_path.write_text('print(1)\n')
+        spec = scrape.ProblemSpec([], None)
+        contest = scrape.Contest(
+            {'a': '/contests/abc001/tasks/abc001_a'},
+            {'a': scrape.Problem({1: scrape.TestCase('1\n', '2\n')}, spec)})
+        code._write_contest(str(contest_dir) + '/', str(template_path),
+                            contest, export=False)
+        assert not (contest_dir / 'a' / 'tests').exists()
+
+        # テストの実行時に、データベースのケースを書き出して実行する
+        monkeypatch.chdir(tmp_path)
+        assert not judge.test_all('abc001', 'a')
+        assert (contest_dir / 'a' / 'tests' / '1' / 'out.txt').read_text() == \
+            '2\n'
+
+    @pytest.mark.skipif(not hasattr(os, 'fork'), reason='fork is required')
+    def test_test_all_fork_runner(self, tmp_path, monkeypatch, capsys):
+        src = '\n'.join([
+            'import sys',
+            'n = int(input())',
+            'if n < 0:',
+            '    sys.exit(3)',
+            'print(n * 2)',
+        ])
+        _make_task(tmp_path, src, {
+            '1': ('1\n', '2\n'),
+            '2': ('2\n', '5\n'),
+            '3': ('-1\n', '\n'),
+        })
+        monkeypatch.chdir(tmp_path)
+        assert not judge.test_all('abc001', 'a', jobs=2, runner='fork',
+                                  preload='json,decimal')
+        out = capsys.readouterr().out
+        assert 'case: 1 => \x1b[1m\x1b[32mOK' in out
+        assert 'NG' in out
+        assert 'RE' in out
+
+    @pytest.mark.parametrize('stored_token, expected_requests', [
+        ('token', ['POST']),
+        ('expired', ['POST', 'GET', 'POST']),
+        (None, ['GET', 'POST']),
+    ])
+    def test_submit_with_cached_task_info(self, tmp_path, monkeypatch,
+                                          stored_token, expected_requests):
+        task_dir = _make_task(tmp_path, 'print(1)\n', {})
+        taskinfo.save_task_info(str(task_dir.parent),
+                                {'a': {'screen_name': 'arc001_a'}})
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr('pycoder.auth.PYCODER_DIR', str(tmp_path))
+        monkeypatch.setattr('pycoder.auth.CSRF_TOKEN_PATH',
+                            str(tmp_path / 'csrf_token'))
+        if stored_token is not None:
+            (tmp_path / 'csrf_token').write_text(stored_token)
+
+        session = FakeSession('token')
+        with patch('pycoder.auth.check_cookies', lambda: session), \
+                patch('pycoder.auth.save_cookies_in_local', lambda _: None):
+            judge.submit('abc001', 'a')
+        assert [method for method, _ in session.requests] == expected_requests
+        assert (tmp_path / 'csrf_token').read_text() == 'token'
+
+    @pytest.mark.parametrize('rejected, expected_requests', [
+        # 4xxの場合はトークンを取得し直して提出し直す
+        (FakeResponse(CONTEST_SUBMIT_URL, status_code=403),
+         ['POST', 'GET', 'POST']),
+        # 受け付けられたか分からない場合は、二重に提出しないよう提出し直さない
+        (FakeResponse(judge.CONTEST_URL + 'abc001/submissions'), ['POST']),
+    ])
+    def test_submit_with_stored_token_not_accepted(
+            self, tmp_path, monkeypatch, capsys, rejected, expected_requests):
+        task_dir = _make_task(tmp_path, 'print(1)\n', {})
+        taskinfo.save_task_info(str(task_dir.parent),
+                                {'a': {'screen_name': 'arc001_a'}})
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr('pycoder.auth.PYCODER_DIR', str(tmp_path))
+        monkeypatch.setattr('pycoder.auth.CSRF_TOKEN_PATH',
+                            str(tmp_path / 'csrf_token'))
+        (tmp_path / 'csrf_token').write_text('expired')
+
+        session = FakeSession('token', rejected=rejected)
+        with patch('pycoder.auth.check_cookies', lambda: session), \
+                patch('pycoder.auth.save_cookies_in_local', lambda _: None):
+            judge.submit('abc001', 'a')
+        assert [method for method, _ in session.requests] == expected_requests
+        if expected_requests == ['POST']:
+            assert 'Could not confirm' in capsys.readouterr().out
+
+    @pytest.mark.parametrize('runner', ['subprocess', 'fork'])
+    def test_run_test_usage(self, tmp_path, runner):
+        if runner == 'fork' and not hasattr(os, 'fork'):
+            pytest.skip('fork is required')
+        src = 'a = [0] * (10 ** 7)\nprint(len(a))\n'
+        task_dir = _make_task(tmp_path, src, {'1': ('\n', '10000000\n')})
+        res = judge.run_test(str(task_dir / 'main.py'),
+                             str(task_dir / 'tests/1/in.txt'),
+                             str(task_dir / 'tests/1/out.txt'),
+                             runner=runners.create_runner(runner))
+        assert res.result == judge.TestResult.OK
+        assert res.usage.wall_time > 0
+        assert res.usage.user_time + res.usage.sys_time > 0
+        # 10**7要素のリストで80MB程度
+        assert res.usage.max_rss > 70 * 1024
+
+    @pytest.mark.parametrize('runner', ['subprocess', 'fork'])
+    def test_runner_timeout(self, tmp_path, runner):
+        if runner == 'fork' and not hasattr(os, 'fork'):
+            pytest.skip('fork is required')
+        task_dir = _make_task(tmp_path, 'while True:\n    pass\n',
+                              {'1': ('\n', '\n')})
+        res = runners.create_runner(runner).run(
+            str(task_dir / 'main.py'), str(task_dir / 'tests/1/in.txt'),
+            timeout=0.2)
+        assert res.timed_out
+        assert res.usage.wall_time >= 0.2
+
+    @pytest.mark.parametrize('runner', ['subprocess', 'fork'])
+    def test_run_test_output_limit_exceeded(self, tmp_path, runner):
+        if runner == 'fork' and not hasattr(os, 'fork'):
+            pytest.skip('fork is required')
+        src = 'import sys\nwhile True:\n    sys.stdout.write("x" * 65536)\n'
+        task_dir = _make_task(tmp_path, src, {'1': ('\n', 'x\n')})
+        res = judge.run_test(str(task_dir / 'main.py'),
+                             str(task_dir / 'tests/1/in.txt'),
+                             str(task_dir / 'tests/1/out.txt'),
+                             runner=runners.create_runner(runner),
+                             output_limit=1)
+        assert res.result == judge.TestResult.OLE
+        # 制限時間より前に打ち切られる
+        assert res.usage.wall_time < 2.0
+
+    @pytest.mark.skipif(not hasattr(os, 'fork'), reason='fork is required')
+    def test_fork_runner_threads(self, tmp_path, monkeypatch):
+        task_dir = _make_task(tmp_path, 'print(int(input()) * 2)\n',
+                              {'1': ('3\n', '6\n')})
+        fork_runner = runners.create_runner('fork')
+
+        # テストを実行するスレッドからはforkしない (fork serverでforkする)
+        def fail_fork():
+            raise AssertionError('forked in the calling process')
+        monkeypatch.setattr(runners.os, 'fork', fail_fork)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(
+                lambda _: fork_runner.run(str(task_dir / 'main.py'),
+                                          str(task_dir / 'tests/1/in.txt'),
+                                          timeout=2.0),
+                range(8)))
+        assert [res.output for res in results] == [b'6\n'] * 8
+
+    def test_run_test_keep_output(self, tmp_path):
+        task_dir = _make_task(tmp_path, 'print(int(input()) * 2)\n',
+                              {'1': ('3\n', '7\n')})
+        args = (str(task_dir / 'main.py'), str(task_dir / 'tests/1/in.txt'),
+                str(task_dir / 'tests/1/out.txt'))
+        res = judge.run_test(*args)
+        assert res.result == judge.TestResult.NG
+        assert res.actual_val is None
+        res = judge.run_test(*args, keep_output=True)
+        assert res.actual_val == '6'
+        assert res.input_val == '3'
+        assert res.expected_val == '7'
+
+    @pytest.mark.parametrize('runner', ['subprocess', 'fork'])
+    def test_run_test_memory_limit_exceeded(self, tmp_path, runner):
+        if runner == 'fork' and not hasattr(os, 'fork'):
+            pytest.skip('fork is required')
+        # 10**8要素のリストで800MB程度
+        src = 'a = [0] * (10 ** 8)\nprint(len(a))\n'
+        task_dir = _make_task(tmp_path, src, {'1': ('\n', '100000000\n')})
+        res = judge.run_test(str(task_dir / 'main.py'),
+                             str(task_dir / 'tests/1/in.txt'),
+                             str(task_dir / 'tests/1/out.txt'),
+                             runner=runners.create_runner(runner),
+                             limits=judge.Limits(2.0, 256))
+        assert res.result == judge.TestResult.MLE
+
+    @pytest.mark.parametrize('runner', ['subprocess', 'fork'])
+    def test_run_test_memory_error_text_is_not_mle(self, tmp_path, runner):
+        if runner == 'fork' and not hasattr(os, 'fork'):
+            pytest.skip('fork is required')
+        # 出力にMemoryErrorという文字列があっても、メモリ制限超過とはしない
+        src = 'import sys\nprint("MemoryError", file=sys.stderr)\nsys.exit(1)\n'
+        task_dir = _make_task(tmp_path, src, {'1': ('\n', '\n')})
+        res = judge.run_test(str(task_dir / 'main.py'),
+                             str(task_dir / 'tests/1/in.txt'),
+                             str(task_dir / 'tests/1/out.txt'),
+                             runner=runners.create_runner(runner),
+                             limits=judge.Limits(2.0, 256))
+        assert res.result == judge.TestResult.RE
+
+    def test_test_all_uses_task_limits(self, tmp_path, monkeypatch, capsys):
+        task_dir = _make_task(tmp_path, 'import time\ntime.sleep(0.3)\n',
+                              {'1': ('\n', '\n')})
+        taskinfo.save_task_info(str(task_dir.parent), {
+            'a': {'time_limit': 0.2, 'memory_limit': 1024},
+        })
+        monkeypatch.chdir(tmp_path)
+        assert not judge.test_all('abc001', 'a')
+        out = capsys.readouterr().out
+        assert 'limits: 0.20 s, 1024 MB' in out
+        assert 'TLE' in out
+        # 遅い環境向けに制限時間を延ばせる
+        assert judge.test_all('abc001', 'a', time_factor=5.0)
+
+    def test_test_matrix(self, tmp_path, monkeypatch, capsys):
+        _make_task(tmp_path, 'print(int(input()) * 2)\n', {
+            '1': ('1\n', '2\n'),
+            '2': ('2\n', '5\n'),
+        })
+        monkeypatch.chdir(tmp_path)
+        summaries = judge.test_matrix(
+            'abc001', 'a', ['python', 'python3', 'no-such-python'], jobs=2)
+        assert [s.interpreter for s in summaries] == ['python', 'python3']
+        assert [(s.passed, s.total) for s in summaries] == [(1, 2), (1, 2)]
+        out = capsys.readouterr().out
+        assert 'no-such-python is not found.' in out
+        lines = out.splitlines()
+        header = next(line for line in lines if line.startswith('case'))
+        assert header.split() == ['case', 'python', 'python3']
+        assert 'NG' in next(line for line in lines if line.startswith('2 '))
+
+    def test_choose_interpreter(self):
+        summaries = [judge.InterpreterSummary('python', 2, 2, 1.5),
+                     judge.InterpreterSummary('pypy3', 2, 2, 0.3),
+                     judge.InterpreterSummary('other', 1, 2, 0.1)]
+        assert judge.choose_interpreter(summaries).interpreter == 'pypy3'
+        assert judge.choose_interpreter([]) is None
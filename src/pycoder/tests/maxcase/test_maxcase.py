@@ -0,0 +1,70 @@
+from pycoder import maxcase
+from pycoder import store
+from pycoder import taskinfo
+import pytest
+
+
+CONSTRAINTS = [
+    '2 \\leq N \\leq 5',
+    '1 \\leq M \\leq 2 \\times 10^5',
+    '1 \\leq A_i \\leq 10^{9}',
+    '1 \\leq u_i < v_i \\leq N',
+    '入力は全て整数である。',
+]
+INPUT_FORMAT = 'N M\nA_1 A_2 \\ldots A_N\nu_1 v_1\n\\vdots\nu_N v_N\n'
+
+
+class TestMaxcase:
+
+    @pytest.mark.parametrize('expr, expected', [
+        ('2 \\times 10^5', 200000),
+        ('10^{18}', 10 ** 18),
+        ('-10^9', -10 ** 9),
+        ('N-1', 4),
+        ('|S|', 3),
+    ])
+    def test_eval_expr(self, expr, expected):
+        assert maxcase.eval_expr(expr, {'N': 5, 'S': 3}) == expected
+
+    def test_generate_max(self):
+        expected = '\n'.join([
+            '5 200000',
+            ' '.join(['1000000000'] * 5),
+            *['4 5'] * 5,
+        ]) + '\n'
+        assert maxcase.generate(CONSTRAINTS, INPUT_FORMAT, 'max') == expected
+
+    def test_generate_min(self):
+        lines = maxcase.generate(CONSTRAINTS, INPUT_FORMAT, 'min').splitlines()
+        assert lines[0] == '5 200000'
+        assert lines[1] == '1 1 1 1 1'
+        assert lines[2:] == ['1 2'] * 5
+
+    def test_generate_random(self):
+        lines = maxcase.generate(CONSTRAINTS, INPUT_FORMAT, 'random').splitlines()
+        values = list(map(int, lines[1].split()))
+        assert len(values) == 5
+        assert all(1 <= v <= 10 ** 9 for v in values)
+
+    def test_generate_string(self):
+        constraints = ['S は長さ 6 の英小文字からなる文字列である。']
+        assert maxcase.generate(constraints, 'S\n', 'max') == 'aaaaaa\n'
+
+    def test_generate_unknown_variable(self):
+        with pytest.raises(ValueError):
+            maxcase.generate(CONSTRAINTS, 'N\nB_1 \\ldots B_N\n')
+
+    def test_save_max_cases(self, tmp_path, monkeypatch):
+        contest_dir = tmp_path / 'atcoder' / 'contests' / 'abc001'
+        (contest_dir / 'a' / 'tests').mkdir(parents=True)
+        taskinfo.save_task_info(str(contest_dir), {'a': {
+            'constraints': CONSTRAINTS, 'input_format': INPUT_FORMAT}})
+        monkeypatch.chdir(tmp_path)
+        assert maxcase.save_max_cases('abc001', 'a', ['max']) == ['gen-max']
+        case_dir = contest_dir / 'a' / 'tests' / 'gen-max'
+        assert (case_dir / 'in.txt').read_text().startswith('5 200000\n')
+        assert not (case_dir / 'out.txt').exists()
+        # 書き出し直しても消えないよう、データベースにも保存する
+        cases = store.load_cases(str(contest_dir), 'a')
+        assert [(case.name, case.output) for case in cases] == [
+            ('gen-max', None)]
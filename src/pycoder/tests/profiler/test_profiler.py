@@ -0,0 +1,66 @@
+from pycoder import profiler
+import os
+import pytest
+
+SRC = '''def slow(n):
+    s = 0
+    for i in range(n):
+        s += i * i
+    return s
+
+
+n = int(input())
+a = [list(range(100)) for _ in range(1000)]
+print(slow(n))
+'''
+
+
+def _make_task(root, src, cases):
+    task_dir = root / 'atcoder' / 'contests' / 'abc001' / 'a'
+    for name, in_val in cases.items():
+        case_dir = task_dir / 'tests' / name
+        case_dir.mkdir(parents=True)
+        (case_dir / 'in.txt').write_text(in_val)
+    (task_dir / 'main.py').write_text(src)
+    return task_dir
+
+
+class TestProfiler:
+
+    def test_profile_script(self, tmp_path):
+        task_dir = _make_task(tmp_path, SRC, {'1': '300000\n'})
+        res = profiler.profile_script(str(task_dir / 'main.py'),
+                                      str(task_dir / 'tests' / '1' / 'in.txt'),
+                                      memory=True)
+        assert res.returncode == 0
+        assert res.functions[0].name == 'main.py:1(slow)'
+        assert res.functions[0].ncalls == 1
+        assert any(a.location == 'main.py:9' for a in res.allocations)
+        if res.line_samples:
+            assert max(res.line_samples, key=res.line_samples.get) in (3, 4)
+
+    def test_profile_script_error(self, tmp_path):
+        task_dir = _make_task(tmp_path, 'raise ValueError("boom")\n',
+                              {'1': '\n'})
+        res = profiler.profile_script(str(task_dir / 'main.py'),
+                                      str(task_dir / 'tests' / '1' / 'in.txt'),
+                                      lines=False)
+        assert res.returncode == 1
+        assert 'ValueError: boom' in res.output
+
+    def test_select_input(self, tmp_path, monkeypatch):
+        _make_task(tmp_path, SRC, {'1': '1\n', 'gen-max': '1000000\n'})
+        monkeypatch.chdir(tmp_path)
+        assert profiler._select_input('abc001', 'a', None).endswith(
+            os.path.join('gen-max', 'in.txt'))
+        assert profiler._select_input('abc001', 'a', 1).endswith(
+            os.path.join('1', 'in.txt'))
+        assert profiler._select_input('abc001', 'a', 'none') is None
+
+    def test_profile(self, tmp_path, monkeypatch, capsys):
+        _make_task(tmp_path, SRC, {'1': '1000\n'})
+        monkeypatch.chdir(tmp_path)
+        assert profiler.profile('abc001', 'a')
+        out = capsys.readouterr().out
+        assert '[functions]' in out
+        assert 'main.py:1(slow)' in out
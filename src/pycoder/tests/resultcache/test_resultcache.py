@@ -0,0 +1,80 @@
+from pycoder import judge
+from pycoder import resultcache
+import json
+import os
+
+
+def _make_task(root):
+    task_dir = root / 'atcoder' / 'contests' / 'abc001' / 'a'
+    for name, (in_val, out_val) in {'1': ('1\n', '2\n'),
+                                    '2': ('2\n', '4\n')}.items():
+        case_dir = task_dir / 'tests' / name
+        case_dir.mkdir(parents=True)
+        (case_dir / 'in.txt').write_text(in_val)
+        (case_dir / 'out.txt').write_text(out_val)
+    (task_dir / 'main.py').write_text('print(int(input()) * 2)\n')
+    return task_dir
+
+
+class TestResultCache:
+
+    def test_case_key(self, tmp_path):
+        main_path = tmp_path / 'main.py'
+        in_path = tmp_path / 'in.txt'
+        out_path = tmp_path / 'out.txt'
+        main_path.write_text('print(1)\n')
+        in_path.write_text('1\n')
+        out_path.write_text('1\n')
+
+        def key(settings=None):
+            return resultcache.case_key(
+                resultcache.settings_key(str(main_path), settings or {}),
+                str(in_path), str(out_path))
+
+        base = key()
+        assert key() == base
+        assert key({'limits': [3.0, None]}) != base
+        out_path.write_text('2\n')
+        assert key() != base
+        out_path.unlink()
+        assert key() != base
+
+    def test_test_all_reuses_results(self, tmp_path, monkeypatch, capsys):
+        task_dir = _make_task(tmp_path)
+        monkeypatch.chdir(tmp_path)
+        assert judge.test_all('abc001', 'a')
+        assert '(cached)' not in capsys.readouterr().out
+
+        assert judge.test_all('abc001', 'a')
+        assert capsys.readouterr().out.count('(cached)') == 2
+
+        # 変更したケースだけを実行し直す
+        (task_dir / 'tests/2/out.txt').write_text('5\n')
+        assert not judge.test_all('abc001', 'a')
+        out = capsys.readouterr().out
+        assert out.count('(cached)') == 1
+        assert 'NG' in out
+
+        # 解答を変えると全ケースを実行し直す
+        (task_dir / 'main.py').write_text('print(int(input()) * 2)\n\n')
+        judge.test_all('abc001', 'a')
+        assert '(cached)' not in capsys.readouterr().out
+
+        judge.test_all('abc001', 'a', use_cache=False)
+        assert '(cached)' not in capsys.readouterr().out
+
+    def test_save_cache_drops_old_entries(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(resultcache, 'MAX_ENTRIES', 2)
+        cache = {str(i): {'result': 'OK', 'usage': None, 'time': i}
+                 for i in range(3)}
+        resultcache.save_cache(str(tmp_path), 'a', cache)
+        assert set(resultcache.load_cache(str(tmp_path), 'a')) == {'1', '2'}
+        assert os.listdir(str(tmp_path / resultcache.CACHE_DIR_NAME)) == ['a.json']
+
+    def test_load_broken_cache(self, tmp_path):
+        cache_dir = tmp_path / resultcache.CACHE_DIR_NAME
+        cache_dir.mkdir()
+        (cache_dir / 'a.json').write_text('{')
+        assert resultcache.load_cache(str(tmp_path), 'a') == {}
+        (cache_dir / 'a.json').write_text(json.dumps({}))
+        assert resultcache.load_cache(str(tmp_path), 'a') == {}
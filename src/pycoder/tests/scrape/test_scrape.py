@@ -1,5 +1,50 @@
 from pycoder import scrape
+from requests.cookies import RequestsCookieJar
+from unittest.mock import patch
+import os
 import pytest
+import time
+
+
+def _read_source(name):
+    with open(os.path.join(os.path.dirname(__file__), 'source', name)) as f:
+        return f.read()
+
+
+PROB_PAGE = '''<html><body>
+<span class="lang-ja">
+<section><h3>問題文</h3><pre>{}</pre></section>
+<section><h3>入力例 1</h3><pre>{}
+</pre></section>
+<section><h3>出力例 1</h3><pre>{}
+</pre></section>
+</span>
+</body></html>'''
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+        self.ok = True
+
+
+class FakeSession:
+    def __init__(self, pages):
+        self.pages = pages
+        self.cookies = RequestsCookieJar()
+
+    def get(self, url):
+        page = self.pages[url]
+        if isinstance(page, Exception):
+            raise page
+        return FakeResponse(page)
+
+    def mount(self, prefix, adapter):
+        pass
+
+    def close(self):
+        pass
+
 
 class TestCode:
 
@@ -8,3 +53,197 @@ class TestCode:
         expected = 'https://atcoder.jp/contests/abc123/tasks'
         assert tasks_url == expected
 
+    def test_fetch_sample_test_cases(self):
+        prob_urls = {
+            p: 'https://atcoder.jp/contests/abc123/tasks/abc123_' + p
+            for p in 'abcdef'
+        }
+        pages = {
+            url: PROB_PAGE.format(p, p + '_in', p + '_out')
+            for p, url in prob_urls.items()
+        }
+        session = FakeSession(pages)
+        with patch('pycoder.auth.check_cookies', lambda: session), \
+                patch('pycoder.auth.save_cookies_in_local', lambda _: None):
+            actual = scrape.fetch_sample_test_cases(prob_urls, max_workers=3)
+        assert list(actual.keys()) == list('abcdef')
+        for p in 'abcdef':
+            assert actual[p] == {1: scrape.TestCase(p + '_in\n', p + '_out\n')}
+
+    def test_fetch_contests(self):
+        tasks_page = ('<table><tbody>'
+                      '<tr><td><a href="/contests/{0}/tasks/{0}_a">A</a></td></tr>'
+                      '<tr><td><a href="/contests/{0}/tasks/{0}_b">B</a></td></tr>'
+                      '</tbody></table>')
+        pages = {}
+        for contest in ('abc001', 'abc002', 'abc003'):
+            pages[scrape._get_tasks_url(contest)] = tasks_page.format(contest)
+            for p in 'ab':
+                url = '{}{}/tasks/{}_{}'.format(scrape.CONTEST_URL, contest,
+                                                contest, p)
+                pages[url] = PROB_PAGE.format(p, contest + p, p)
+        pages[scrape.CONTEST_URL + 'abc002/tasks/abc002_b'] = \
+            ConnectionError('reset')
+        session = FakeSession(pages)
+        results = {}
+        with patch('pycoder.auth.check_cookies', lambda: session), \
+                patch('pycoder.auth.save_cookies_in_local', lambda _: None):
+            scrape.fetch_contests(
+                ['abc001', 'abc002', 'abc003'],
+                lambda contest, result: results.setdefault(contest, result),
+                max_workers=2, requests_per_second=1000)
+        assert set(results) == {'abc001', 'abc002', 'abc003'}
+        assert isinstance(results['abc002'], ConnectionError)
+        contest = results['abc003']
+        assert list(contest.prob_paths) == ['a', 'b']
+        assert list(contest.problems) == ['a', 'b']
+        assert contest.problems['b'].sample_test_cases == {
+            1: scrape.TestCase('abc003b\n', 'b\n')}
+
+    def test_rate_limiter(self):
+        limiter = scrape.RateLimiter(20, burst=3)
+        start = time.monotonic()
+        for _ in range(3):
+            limiter.acquire()
+        assert time.monotonic() - start < 0.04
+        for _ in range(4):
+            limiter.acquire()
+        # バースト後は1秒あたり20回 (4回で0.2秒) に抑えられる
+        assert time.monotonic() - start >= 0.19
+
+    def test_extract_prob_paths(self):
+        html = _read_source('tasks.html')
+        expected = {
+            'a': '/contests/abc160/tasks/abc160_a',
+            'b': '/contests/abc160/tasks/abc160_b',
+            'c': '/contests/abc160/tasks/arc012_c',
+        }
+        assert scrape.extract_prob_paths(html) == expected
+
+    def test_extract_sample_test_cases_from_prob_page(self):
+        html = _read_source('prob.html')
+        expected = {
+            1: scrape.TestCase('sippuu\n', 'Yes\n'),
+            2: scrape.TestCase('iphone\n', 'No\n'),
+            3: scrape.TestCase('<a&b>\n1 23\n', 'No\n'),
+        }
+        assert scrape.extract_sample_test_cases_from_prob_page(html) == expected
+
+    def test_extract_problem_spec_from_prob_page(self):
+        html = _read_source('prob.html')
+        spec = scrape.extract_problem_spec_from_prob_page(html)
+        assert spec.constraints == [
+            'S は長さ 6 の英小文字からなる文字列である。',
+            '入力の大きさ < 10^5',
+        ]
+        assert spec.input_format == 'S\n'
+        assert spec.time_limit == 2.0
+        assert spec.memory_limit == 1024
+
+    @pytest.mark.parametrize('html, expected', [
+        ('<p>実行時間制限: 4 sec / メモリ制限: 1024 MB</p>', (4.0, 1024)),
+        ('<p>Time Limit: 2.5 sec / Memory Limit: 256 MiB</p>', (2.5, 256)),
+        ('<p>実行時間制限: 2 sec / メモリ制限: 2 GB</p>', (2.0, 2048)),
+        ('<p>問題文</p>', (None, None)),
+    ])
+    def test_extract_limits_from_prob_page(self, html, expected):
+        assert scrape.extract_limits_from_prob_page(html) == expected
+
+    @pytest.mark.parametrize('name', ['prob.html', 'tasks.html'])
+    def test_same_result_as_html5lib(self, name):
+        """以前の実装 (BeautifulSoup + html5lib) と同じ結果になること"""
+        bs4 = pytest.importorskip('bs4')
+        pytest.importorskip('html5lib')
+        html = _read_source(name)
+        soup = bs4.BeautifulSoup(html, 'html5lib')
+        if name == 'tasks.html':
+            expected = {}
+            for tr in soup.find('tbody').find_all('tr'):
+                item = tr.find('td').find('a')
+                expected[item.contents[0].lower()] = item.get('href')
+            assert scrape.extract_prob_paths(html) == expected
+            return
+
+        for tag, class_ in [('span', 'lang-en'), ('div', 'io-style')]:
+            for elem in soup.find_all(tag, class_=class_):
+                elem.extract()
+        expected = []
+        for sec in soup.find_all('section'):
+            if sec.find('h3').get_text() == '問題文':
+                continue
+            pre = sec.find('pre')
+            if pre is not None:
+                expected.append(pre.get_text())
+        actual = scrape.extract_sample_test_cases_from_prob_page(html)
+        assert [v for case in actual.values() for v in case] == expected
+
+    def test_extract_start_time(self):
+        html = ("<small class='contest-duration'>コンテスト時間: "
+                "<a href='#'><time class='fixtime-full'>"
+                "2025-04-05 21:00:00+0900</time></a> ～ "
+                "<a href='#'><time class='fixtime-full'>"
+                "2025-04-05 22:40:00+0900</time></a></small>")
+        start = scrape.extract_start_time(html)
+        assert start.isoformat() == '2025-04-05T21:00:00+09:00'
+        assert scrape.extract_start_time('<html></html>') is None
+
+    def test_next_poll_delay(self):
+        for attempt in range(10):
+            delay = scrape.next_poll_delay(attempt)
+            expected = min(scrape.START_POLL_MIN * 2 ** attempt,
+                           scrape.START_POLL_MAX)
+            assert expected / 2 <= delay <= expected
+
+    def test_sleep_until(self):
+        from datetime import datetime, timezone
+        target = datetime.fromtimestamp(time.time() + 0.1, timezone.utc)
+        scrape.sleep_until(target)
+        assert 0 <= time.time() - target.timestamp() < 0.05
+        # 過ぎた時刻はすぐに戻る
+        start = time.monotonic()
+        scrape.sleep_until(target)
+        assert time.monotonic() - start < 0.01
+
+    def test_fetch_contest_at_start(self, monkeypatch):
+        contest_url = scrape.CONTEST_URL + 'abc400'
+        tasks_url = scrape._get_tasks_url('abc400')
+        prob_url = contest_url + '/tasks/abc400_a'
+        visible = ('<table><tbody><tr><td>'
+                   '<a href="/contests/abc400/tasks/abc400_a">A</a>'
+                   '</td></tr></tbody></table>')
+        pages = {
+            contest_url: ("<time class='fixtime-full'>"
+                          "2020-01-01 21:00:00+0900</time>"),
+            # 公開されるまでは問題一覧ページに問題が無い
+            tasks_url: ['<html></html>', ConnectionError('reset'), visible],
+            prob_url: PROB_PAGE.format('a', '1', '2'),
+        }
+
+        requested = []
+
+        class PollingSession(FakeSession):
+            def get(self, url):
+                requested.append(url)
+                page = self.pages[url]
+                if isinstance(page, list):
+                    page = page.pop(0) if len(page) > 1 else page[0]
+                if isinstance(page, Exception):
+                    raise page
+                return FakeResponse(page)
+
+        monkeypatch.setattr(scrape, 'START_POLL_MIN', 0.01)
+        session = PollingSession(pages)
+        with patch('pycoder.auth.check_cookies', lambda: session), \
+                patch('pycoder.auth.save_cookies_in_local', lambda _: None):
+            contest = scrape.fetch_contest_at_start('abc400', max_workers=2)
+        assert list(contest.prob_paths) == ['a']
+        assert contest.problems['a'].sample_test_cases == {
+            1: scrape.TestCase('1\n', '2\n')}
+        # 開始済みのコンテストでは、接続を確立するためのリクエストを送らない
+        assert requested.count(contest_url) == 1
+
+        pages[contest_url] = '<html></html>'
+        with patch('pycoder.auth.check_cookies', lambda: session), \
+                patch('pycoder.auth.save_cookies_in_local', lambda _: None):
+            with pytest.raises(ValueError):
+                scrape.fetch_contest_at_start('abc400')
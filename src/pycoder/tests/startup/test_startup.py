@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+
+import pycoder
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(pycoder.__file__)))
+
+# pycoder.main の読み込みにかける時間 (fireの読み込みを除く) の上限
+# 実行環境の速さに左右されないよう、同じ環境でのfire単体の読み込み時間に対する比で決める
+STARTUP_BUDGET_RATIO = 1.0
+
+# 読み込み時間を計る回数 (実行環境の負荷による揺れを除くため、最も速かった回で判定する)
+REPEAT = 5
+
+# pc test では読み込まないモジュール (ネットワーク・htmlの解析にだけ使う)
+DEFERRED_MODULES = ('requests', 'urllib3', 'bs4', 'html5lib', 'html.parser',
+                    'webbrowser', 'pycoder.scrape', 'pycoder.htmlscan')
+
+
+def _import_times(module):
+    """python -X importtime で module を読み込んだ際の、各モジュールの読み込み時間
+    :return {モジュール名: 依存するモジュールを含めた読み込み時間 [us]}
+    """
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env, check=True)
+    times = {}
+    for line in proc.stderr.decode().splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestStartup:
+
+    def test_deferred_modules(self):
+        times = _import_times('pycoder.main')
+        assert 'pycoder.judge' in times
+        for module in DEFERRED_MODULES:
+            assert module not in times
+
+    def test_startup_budget(self):
+        elapsed = min(
+            (times['pycoder.main'] - times.get('fire', 0)) / 1000
+            for times in (_import_times('pycoder.main')
+                          for _ in range(REPEAT)))
+        baseline = min(_import_times('fire')['fire'] / 1000
+                       for _ in range(REPEAT))
+        print('pycoder.main: {:.1f} ms, fire: {:.1f} ms'.format(elapsed,
+                                                              baseline))
+        assert elapsed < baseline * STARTUP_BUDGET_RATIO
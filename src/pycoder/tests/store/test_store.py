@@ -0,0 +1,69 @@
+from pycoder import judge
+from pycoder import store
+from pycoder import taskinfo
+import json
+import os
+
+
+def _contest_dir(root, contest='abc001'):
+    contest_dir = root / 'atcoder' / 'contests' / contest
+    contest_dir.mkdir(parents=True)
+    return str(contest_dir) + '/'
+
+
+class TestStore:
+
+    def test_locate(self):
+        assert store.locate('./atcoder/contests/abc160/') == (
+            os.path.join('atcoder', 'pycoder.db'), 'abc160')
+
+    def test_task_info(self, tmp_path):
+        contest_dir = _contest_dir(tmp_path)
+        assert store.load_task_info(contest_dir) is None
+        info = {'a': {'screen_name': 'abc001_a', 'time_limit': 2.0},
+                'b': {'screen_name': 'abc001_b'}}
+        store.save_task_info(contest_dir, info)
+        assert store.load_task_info(contest_dir) == info
+        # 保存済みの問題は置き換える
+        store.save_task_info(contest_dir, {'a': {'screen_name': 'x'}})
+        assert store.load_task_info(contest_dir)['a'] == {'screen_name': 'x'}
+
+    def test_cases(self, tmp_path):
+        contest_dir = _contest_dir(tmp_path)
+        assert store.load_cases(contest_dir, 'a') == []
+        large = b'1 ' * store.COMPRESS_THRESHOLD
+        cases = [store.Case('2', large, b'3\n'),
+                 store.Case('1', b'1\n', large),
+                 store.Case('3', b'5\n', None)]
+        store.save_cases(contest_dir, 'a', cases)
+        assert store.load_cases(contest_dir, 'a') == sorted(cases)
+        assert store.load_cases(contest_dir, 'b') == []
+
+    def test_export_cases(self, tmp_path):
+        contest_dir = _contest_dir(tmp_path)
+        store.save_cases(contest_dir, 'a', [store.Case('1', b'1\n', b'2\n'),
+                                            store.Case('2', b'3\n', None)])
+        assert store.export_cases(contest_dir, 'a') == ['1', '2']
+        tests_dir = tmp_path / 'atcoder' / 'contests' / 'abc001' / 'a' / 'tests'
+        assert (tests_dir / '1' / 'in.txt').read_bytes() == b'1\n'
+        assert (tests_dir / '1' / 'out.txt').read_bytes() == b'2\n'
+        assert not (tests_dir / '2' / 'out.txt').exists()
+
+    def test_get_test_case_dirs_exports(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        contest_dir = _contest_dir(tmp_path)
+        store.save_cases(contest_dir, 'a', [store.Case('1', b'1\n', b'2\n')])
+        dirs = judge.get_test_case_dirs('abc001', 'a')
+        assert [name for name, _ in dirs] == ['1']
+        assert os.path.exists(os.path.join(dirs[0][1], 'in.txt'))
+
+    def test_legacy_task_info(self, tmp_path):
+        contest_dir = _contest_dir(tmp_path)
+        assert taskinfo.load_task_info(contest_dir) == {}
+        with open(contest_dir + taskinfo.TASK_INFO_FILE_NAME, 'w') as f:
+            json.dump({'a': {'screen_name': 'abc001_a'}}, f)
+        assert taskinfo.load_task_info(contest_dir) == {
+            'a': {'screen_name': 'abc001_a'}}
+        taskinfo.save_task_info(contest_dir, {'a': {'screen_name': 'new'}})
+        assert taskinfo.load_task_info(contest_dir) == {
+            'a': {'screen_name': 'new'}}
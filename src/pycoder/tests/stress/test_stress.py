@@ -0,0 +1,80 @@
+from pycoder import stress
+from pycoder import judge
+from pycoder import store
+from pycoder import taskinfo
+import pytest
+
+
+def _make_task(root, files):
+    task_dir = root / 'atcoder' / 'contests' / 'abc001' / 'a'
+    (task_dir / 'tests').mkdir(parents=True)
+    for name, src in files.items():
+        (task_dir / name).write_text(src)
+    return task_dir
+
+
+GEN = 'import sys\nprint(int(sys.argv[1]) % 10)\n'
+NAIVE = 'n = int(input())\nprint(sum(range(n + 1)))\n'
+
+
+class TestStress:
+
+    def test_stress_test_saves_counterexample(self, tmp_path, monkeypatch):
+        main = 'n = int(input())\nprint(n * (n + 1) // 2 if n < 7 else 0)\n'
+        task_dir = _make_task(tmp_path, {
+            'main.py': main, 'gen.py': GEN, 'naive.py': NAIVE})
+        monkeypatch.chdir(tmp_path)
+        counterexample = stress.stress_test('abc001', 'a', iterations=50,
+                                            jobs=2)
+        assert counterexample.result == judge.TestResult.NG
+        assert counterexample.seed % 10 >= 7
+        case_dir = task_dir / 'tests' / '1'
+        assert (case_dir / 'in.txt').read_text() == counterexample.input_val
+        n = int(counterexample.input_val)
+        assert (case_dir / 'out.txt').read_text() == str(n * (n + 1) // 2) + '\n'
+        # 書き出し直しても消えないよう、データベースにも保存する
+        assert [case.name for case in store.load_cases(
+            str(task_dir.parent), 'a')] == ['1']
+
+    def test_stress_test_no_counterexample(self, tmp_path, monkeypatch):
+        main = 'n = int(input())\nprint(n * (n + 1) // 2)\n'
+        task_dir = _make_task(tmp_path, {
+            'main.py': main, 'gen.py': GEN, 'naive.py': NAIVE})
+        monkeypatch.chdir(tmp_path)
+        assert stress.stress_test('abc001', 'a', iterations=10, jobs=2) is None
+        assert list((task_dir / 'tests').iterdir()) == []
+
+    def test_stress_test_without_tests_dir(self, tmp_path, monkeypatch):
+        main = 'print(0)\n'
+        task_dir = _make_task(tmp_path, {
+            'main.py': main, 'gen.py': GEN, 'naive.py': NAIVE})
+        (task_dir / 'tests').rmdir()
+        # データベースにだけ保存したケースとは別の名前で保存する
+        store.save_cases(str(task_dir.parent), 'a',
+                         [store.Case('1', b'1\n', b'1\n')])
+        monkeypatch.chdir(tmp_path)
+        assert stress.stress_test('abc001', 'a', iterations=10) is not None
+        assert sorted(p.name for p in (task_dir / 'tests').iterdir()) == [
+            '1', '2']
+
+    def test_stress_test_uses_task_time_limit(self, tmp_path, monkeypatch):
+        main = 'import time\ntime.sleep(1)\n'
+        task_dir = _make_task(tmp_path, {
+            'main.py': main, 'gen.py': GEN, 'naive.py': NAIVE})
+        taskinfo.save_task_info(str(task_dir.parent),
+                                {'a': {'time_limit': 0.2}})
+        monkeypatch.chdir(tmp_path)
+        counterexample = stress.stress_test('abc001', 'a', iterations=10)
+        assert counterexample.result == judge.TestResult.TLE
+
+    def test_stress_test_naive_failure(self, tmp_path, monkeypatch, capsys):
+        task_dir = _make_task(tmp_path, {
+            'main.py': 'print(0)\n', 'gen.py': GEN,
+            'naive.py': 'raise ValueError("broken")\n'})
+        monkeypatch.chdir(tmp_path)
+        with pytest.raises(SystemExit):
+            stress.stress_test('abc001', 'a', iterations=10, jobs=2)
+        out = capsys.readouterr().out
+        assert 'naive.py failed (seed: ' in out
+        assert 'broken' in out
+        assert list((task_dir / 'tests').iterdir()) == []
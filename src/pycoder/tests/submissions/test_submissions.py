@@ -0,0 +1,139 @@
+from pycoder import submissions
+from requests.cookies import RequestsCookieJar
+from unittest.mock import patch
+import pytest
+
+AC_HTML = ("<td class='text-center'><span class='label label-success' "
+           "data-toggle='tooltip' title='正解'>AC</span></td>"
+           "<td class='text-right'>21 ms</td>"
+           "<td class='text-right'>3648 KB</td>")
+JUDGING_HTML = ("<td colspan='3' class='text-center waiting-judge' data-id='2'>"
+                "<span class='label label-default'>3/14 </span></td>")
+WJ_HTML = ("<td colspan='3' class='text-center waiting-judge' data-id='2'>"
+           "<span class='label label-default' title='ジャッジ待ち'>WJ</span></td>")
+SUBMISSIONS_PAGE = '''<table><tbody>
+<tr><td>2020-01-01</td><td class="text-right submission-score" data-id="3">0</td></tr>
+<tr><td>2020-01-01</td><td class="text-right submission-score" data-id="2">0</td></tr>
+<tr><td>2020-01-01</td><td class="text-right submission-score" data-id="1">100</td></tr>
+</tbody></table>'''
+
+
+class FakeResponse:
+    def __init__(self, text='', data=None):
+        self.text = text
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
+class FakeSession:
+    """状況確認用のjsonへのリクエストごとに、statusesを順に返す"""
+
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.cookies = RequestsCookieJar()
+        self.requests = []
+
+    def get(self, url, params=None):
+        self.requests.append((url, params))
+        if not url.endswith('/status/json'):
+            return FakeResponse(SUBMISSIONS_PAGE)
+        statuses = self.statuses.pop(0) if len(self.statuses) > 1 \
+            else self.statuses[0]
+        result = {sid: {'Html': html, 'Score': '0'}
+                  for sid, html in statuses.items()
+                  if sid in params['sids[]']}
+        return FakeResponse(data={'Result': result, 'Interval': 100})
+
+    def mount(self, prefix, adapter):
+        pass
+
+    def close(self):
+        pass
+
+
+class TestSubmissions:
+
+    @pytest.mark.parametrize('html, expected', [
+        (AC_HTML, submissions.SubmissionStatus('AC', 21, 3648)),
+        (JUDGING_HTML, submissions.SubmissionStatus('3/14')),
+        (WJ_HTML, submissions.SubmissionStatus('WJ')),
+    ])
+    def test_parse_status(self, html, expected):
+        status = submissions.parse_status(html)
+        assert status == expected
+        assert status.finished == (expected.status == 'AC')
+
+    @pytest.mark.parametrize(('status', 'expected'), [
+        ('WJ', True),
+        ('WR', True),
+        ('3/14', True),
+        ('3/14 TLE', True),
+        ('AC', False),
+        ('', False),
+    ])
+    def test_judging(self, status, expected):
+        assert submissions.SubmissionStatus(status).judging == expected
+
+    def test_next_interval(self):
+        # ジャッジ待ちが長く続いても、短い間隔で確認し続ける
+        interval = submissions.MIN_POLL_INTERVAL
+        for _ in range(20):
+            interval = submissions.next_interval(interval, judging=True)
+        assert interval == submissions.MIN_POLL_INTERVAL
+
+        interval = submissions.next_interval(interval, judging=False)
+        assert interval > submissions.MIN_POLL_INTERVAL
+        for _ in range(20):
+            interval = submissions.next_interval(interval, judging=False)
+        assert interval == submissions.MAX_POLL_INTERVAL
+        assert submissions.next_interval(
+            interval, judging=True) == submissions.MIN_POLL_INTERVAL
+        # サーバーが指定する間隔より短くはしない
+        assert submissions.next_interval(
+            interval, judging=True, server_interval=1.5) == 1.5
+
+    def test_wait_for_verdicts(self, monkeypatch):
+        sleeps = []
+        monkeypatch.setattr(submissions.time, 'sleep', sleeps.append)
+        session = FakeSession([
+            {'1': WJ_HTML, '2': WJ_HTML},
+            {'1': WJ_HTML, '2': JUDGING_HTML},
+            {'1': JUDGING_HTML, '2': AC_HTML},
+            {'1': AC_HTML},
+        ])
+        finished = []
+        with patch('pycoder.auth.check_cookies', lambda: session):
+            latest = submissions.wait_for_verdicts(
+                'abc001', [1, 2],
+                on_finished=lambda sid, status: finished.append(sid))
+        assert finished == [2, 1]
+        assert latest[1] == submissions.SubmissionStatus('AC', 21, 3648)
+        # 2つの提出は1回のリクエストでまとめて確認し、終わった提出は確認しない
+        assert [params['sids[]'] for _, params in session.requests] == [
+            ['1', '2'], ['1', '2'], ['1', '2'], ['1']]
+        assert len(sleeps) == 3
+
+    def test_wait_for_verdicts_timeout(self, monkeypatch):
+        monkeypatch.setattr(submissions.time, 'sleep', lambda _: None)
+        session = FakeSession([{'1': WJ_HTML}])
+        with patch('pycoder.auth.check_cookies', lambda: session):
+            latest = submissions.wait_for_verdicts('abc001', [1], timeout=0)
+        assert not latest[1].finished
+
+    def test_wait_and_print_without_submissions(self, capsys):
+        session = FakeSession([])
+        with patch('pycoder.auth.check_cookies', lambda: session):
+            assert not submissions.wait_and_print('abc001', [])
+        assert capsys.readouterr().out == 'No submission is being judged.\n'
+        assert session.requests == []
+
+    def test_fetch_pending_submission_ids(self):
+        session = FakeSession([{'1': AC_HTML, '2': JUDGING_HTML,
+                                '3': WJ_HTML}])
+        with patch('pycoder.auth.check_cookies', lambda: session):
+            assert submissions.fetch_pending_submission_ids('abc001') == [3, 2]
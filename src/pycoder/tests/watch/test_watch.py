@@ -0,0 +1,96 @@
+from pycoder import judge
+from pycoder import watch
+import pytest
+import os
+import sys
+import time
+
+
+def _make_task(root):
+    task_dir = root / 'atcoder' / 'contests' / 'abc001' / 'a'
+    for name, (in_val, out_val) in {'1': ('1\n', '2\n'),
+                                    '2': ('2\n', '4\n')}.items():
+        case_dir = task_dir / 'tests' / name
+        case_dir.mkdir(parents=True)
+        (case_dir / 'in.txt').write_text(in_val)
+        (case_dir / 'out.txt').write_text(out_val)
+    (task_dir / 'main.py').write_text('print(int(input()) * 2)\n')
+    return task_dir
+
+
+def _touch(path, text):
+    path.write_text(text)
+    # 更新時刻の精度が粗いファイルシステムでも変更を検知できるようにする
+    stat = os.stat(str(path))
+    os.utime(str(path), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+class TestWatch:
+
+    def test_affected_cases(self, tmp_path):
+        task_dir = str(_make_task(tmp_path)) + '/'
+        old = watch.take_snapshot(task_dir)
+        assert watch.affected_cases(task_dir, old, old) == set()
+
+        _touch(tmp_path / 'atcoder/contests/abc001/a/tests/2/out.txt', '5\n')
+        new = watch.take_snapshot(task_dir)
+        assert watch.affected_cases(task_dir, old, new) == {'2'}
+
+        _touch(tmp_path / 'atcoder/contests/abc001/a/main.py', 'print(1)\n')
+        assert watch.affected_cases(
+            task_dir, new, watch.take_snapshot(task_dir)) is None
+
+    def test_test_all_prints_only_changed_verdicts(self, tmp_path,
+                                                   monkeypatch, capsys):
+        task_dir = _make_task(tmp_path)
+        monkeypatch.chdir(tmp_path)
+        verdicts = {}
+        assert judge.test_all('abc001', 'a', verdicts=verdicts)
+        assert capsys.readouterr().out.count(' => ') == 2
+
+        (task_dir / 'tests/2/out.txt').write_text('5\n')
+        assert not judge.test_all('abc001', 'a', name=['2'], verdicts=verdicts)
+        out = capsys.readouterr().out
+        assert 'case: 2 => ' in out
+        assert 'case: 1 => ' not in out
+        assert verdicts == {'1': judge.TestResult.OK,
+                            '2': judge.TestResult.NG}
+
+        # 判定が変わらなければ表示しない
+        judge.test_all('abc001', 'a', verdicts=verdicts)
+        assert ' => ' not in capsys.readouterr().out
+
+    @pytest.mark.skipif(not hasattr(os, 'fork'), reason='fork is required')
+    def test_test_run_cancel(self, tmp_path, monkeypatch):
+        task_dir = _make_task(tmp_path)
+        (task_dir / 'main.py').write_text('import time\ntime.sleep(10)\n')
+        monkeypatch.chdir(tmp_path)
+        start = time.monotonic()
+        run = watch._TestRun('abc001', 'a', None, {}, {})
+        assert run.poll() is None
+        run.cancel()
+        assert time.monotonic() - start < 5
+        assert not os.path.exists(run.result_path)
+
+    @pytest.mark.skipif(not hasattr(os, 'fork'), reason='fork is required')
+    def test_test_run_result(self, tmp_path, monkeypatch):
+        _make_task(tmp_path)
+        monkeypatch.chdir(tmp_path)
+        run = watch._TestRun('abc001', 'a', {'1'}, {}, {})
+        result = None
+        while result is None:
+            time.sleep(0.05)
+            result = run.poll()
+        assert result == {'1': judge.TestResult.OK}
+
+    @pytest.mark.skipif(not sys.platform.startswith('linux'),
+                        reason='inotify is only available on Linux')
+    def test_inotify_watcher(self, tmp_path):
+        watcher = watch._InotifyWatcher()
+        try:
+            watcher.add(str(tmp_path))
+            assert not watcher.wait(0.01)
+            (tmp_path / 'main.py').write_text('print(1)\n')
+            assert watcher.wait(1.0)
+        finally:
+            watcher.close()
@@ -0,0 +1,280 @@
+"""main.pyとテストケースの変更を監視し、保存のたびにテストを実行し直す.
+
+Linuxではinotifyで変更を待ち、それ以外の環境では一定間隔でファイルの更新時刻を確認する。
+テストは別プロセスで実行し、実行中に新しい変更があれば中断して実行し直す。
+"""
+import ctypes
+import ctypes.util
+import importlib
+import json
+import os
+import select
+import signal
+import sys
+import tempfile
+import time
+import traceback
+from typing import Dict, Optional, Set, Tuple
+
+from . import judge
+from .pycolor import pprint
+
+# inotifyが使えない場合に、変更の有無を確認する間隔 [sec]
+POLL_INTERVAL = 0.2
+
+# 変更を検知してから、保存が終わるのを待つ時間 [sec]
+# (エディタによっては1回の保存で複数回書き込む)
+DEBOUNCE = 0.05
+
+# パス -> (更新時刻 [ns], 大きさ)
+Snapshot = Dict[str, Tuple[int, int]]
+
+
+def take_snapshot(task_dir: str) -> Snapshot:
+    """main.pyとテストケースのファイルの状態を記録する
+    :param task_dir: 問題のディレクトリ
+    """
+    paths = [os.path.join(task_dir, 'main.py')]
+    for root, _, files in os.walk(os.path.join(task_dir, 'tests')):
+        paths.extend(os.path.join(root, file_name) for file_name in files)
+    snapshot = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+def affected_cases(task_dir: str, old: Snapshot,
+                   new: Snapshot) -> Optional[Set[str]]:
+    """変更の影響を受けるテストケースを求める
+    :param task_dir: 問題のディレクトリ
+    :param old: 変更前の状態
+    :param new: 変更後の状態
+    :return 実行し直すケース名 (main.pyが変わった場合は全ケースを表すNone)
+    """
+    changed = {path for path in old.keys() | new.keys()
+               if old.get(path) != new.get(path)}
+    if os.path.join(task_dir, 'main.py') in changed:
+        return None
+    tests_dir = os.path.join(task_dir, 'tests')
+    return {os.path.relpath(path, tests_dir).split(os.sep)[0]
+            for path in changed}
+
+
+def _merge_cases(a: Optional[Set[str]],
+                 b: Optional[Set[str]]) -> Optional[Set[str]]:
+    if a is None or b is None:
+        return None
+    return a | b
+
+
+class _PollingWatcher:
+    """一定間隔で起きて、呼び出し元に状態を確認させる
+    """
+
+    def add(self, path: str):
+        pass
+
+    def wait(self, timeout: float) -> bool:
+        """
+        :return 変更があった可能性があるかどうか
+        """
+        time.sleep(timeout)
+        return True
+
+    def close(self):
+        pass
+
+
+class _InotifyWatcher:
+    """inotifyでディレクトリ内の変更を待つ
+    """
+
+    IN_MODIFY = 0x002
+    IN_ATTRIB = 0x004
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM
+            | IN_MOVED_TO | IN_CREATE | IN_DELETE)
+
+    def __init__(self):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.watched: Set[str] = set()
+
+    def add(self, path: str):
+        if path in self.watched:
+            return
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path),
+                                         self.MASK)
+        if wd >= 0:
+            self.watched.add(path)
+
+    def wait(self, timeout: float) -> bool:
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+        # 溜まったイベントは読み捨て、変更内容はスナップショットで調べる
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+def _create_watcher():
+    if sys.platform.startswith('linux'):
+        try:
+            return _InotifyWatcher()
+        except (OSError, AttributeError, TypeError):
+            pass
+    return _PollingWatcher()
+
+
+def _watch_dirs(watcher, task_dir: str):
+    """問題のディレクトリとテストケースのディレクトリを監視対象にする
+    inotifyはサブディレクトリを監視しないため、追加されたケースのディレクトリも加える。
+    """
+    watcher.add(task_dir)
+    for root, _, _ in os.walk(os.path.join(task_dir, 'tests')):
+        watcher.add(root)
+
+
+class _TestRun:
+    """テストを子プロセスで実行する
+    子プロセスは新しいプロセスグループを作るため、テスト対象のスクリプトごと中断できる。
+    """
+
+    def __init__(self, contest, task, cases: Optional[Set[str]],
+                 verdicts: Dict[str, judge.TestResult], options):
+        self.cases = cases
+        fd, self.result_path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        sys.stdout.flush()
+        self.pid = os.fork()
+        if self.pid == 0:
+            self._run_in_child(contest, task, verdicts, options)
+        try:
+            os.setpgid(self.pid, self.pid)
+        except OSError:
+            # 子プロセス側で設定済み
+            pass
+
+    def _run_in_child(self, contest, task, verdicts, options):
+        code = 0
+        try:
+            os.setpgid(0, 0)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            judge.test_all(contest, task, name=self.cases, verdicts=verdicts,
+                           **options)
+            with open(self.result_path, 'w') as f:
+                json.dump({name: res.name for name, res in verdicts.items()}, f)
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(code)
+
+    def poll(self) -> Optional[Dict[str, judge.TestResult]]:
+        """
+        :return 終了していれば各ケースの判定結果 (失敗した場合は空のdict), 実行中はNone
+        """
+        pid, status = os.waitpid(self.pid, os.WNOHANG)
+        if pid == 0:
+            return None
+        try:
+            with open(self.result_path, 'r') as f:
+                return {name: judge.TestResult[res]
+                        for name, res in json.load(f).items()}
+        except ValueError:
+            return {}
+        finally:
+            os.remove(self.result_path)
+
+    def cancel(self):
+        try:
+            os.killpg(self.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        os.waitpid(self.pid, 0)
+        os.remove(self.result_path)
+
+
+def _print_status(verdicts: Dict[str, judge.TestResult]):
+    passed = sum(res == judge.TestResult.OK for res in verdicts.values())
+    color = 'green' if passed == len(verdicts) else 'red'
+    pprint('[watch] {}/{} cases passed. Waiting for changes...'.format(
+        passed, len(verdicts)), color=color)
+
+
+def watch(contest, task, **options):
+    """main.pyとテストケースを監視し、変更のたびにテストを実行する
+    main.pyが変わった場合は全ケースを、テストケースだけが変わった場合はそのケースだけを実行し、
+    判定が変わったケースだけを表示する。Ctrl-Cで終了する。
+    :param options: judge.test_all に渡すオプション
+    """
+    task_dir = judge.get_task_dir(contest, task)
+    if not os.path.exists(os.path.join(task_dir, 'main.py')):
+        print('{} is not found.'.format(task_dir + 'main.py'))
+        exit(1)
+    # forkした各実行で読み込み直さないよう、先に読み込んでおく
+    preload = options.get('preload')
+    if isinstance(preload, str):
+        preload = [m for m in preload.split(',') if m]
+    for module_name in preload or ():
+        importlib.import_module(module_name)
+
+    watcher = _create_watcher()
+    verdicts: Dict[str, judge.TestResult] = {}
+    snapshot = take_snapshot(task_dir)
+    run: Optional[_TestRun] = _TestRun(contest, task, None, verdicts, options)
+    try:
+        while True:
+            _watch_dirs(watcher, task_dir)
+            changed = watcher.wait(POLL_INTERVAL)
+            if run is not None:
+                result = run.poll()
+                if result is not None:
+                    verdicts = result
+                    run = None
+                    _print_status(verdicts)
+            if not changed:
+                continue
+
+            time.sleep(DEBOUNCE)
+            new_snapshot = take_snapshot(task_dir)
+            cases = affected_cases(task_dir, snapshot, new_snapshot)
+            snapshot = new_snapshot
+            if cases is not None and not cases:
+                continue
+            if run is not None:
+                # 実行中のテストは中断し、対象だったケースも合わせて実行し直す
+                run.cancel()
+                cases = _merge_cases(cases, run.cases)
+                pprint('[watch] cancelled', color='yellow')
+            existing = {name for name, _ in
+                        judge.get_test_case_dirs(contest, task)}
+            verdicts = {name: res for name, res in verdicts.items()
+                        if name in existing}
+            run = _TestRun(contest, task, cases, verdicts, options)
+    except KeyboardInterrupt:
+        if run is not None:
+            run.cancel()
+    finally:
+        watcher.close()